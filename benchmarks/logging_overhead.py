@@ -0,0 +1,84 @@
+"""Measure logging overhead per interaction on the calling thread.
+
+Compares the previous synchronous setup (eager ``redact_sensitive_data``
+in f-strings, ``RotatingFileHandler`` written from the hotkey thread)
+with :func:`lma.utils.setup_logging` (queued records, redaction in the
+formatter). Each simulated interaction issues the log calls of one
+multimodal request. Run with::
+
+    python benchmarks/logging_overhead.py [interactions]
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from lma import utils  # noqa: E402
+from lma.security import redact_sensitive_data  # noqa: E402
+
+CONFIG = {"logging": {"level": "INFO", "redact_sensitive": True}}
+TRANSCRIPT = "please summarise this page and keep my token: abc123 out of it " * 4
+RESPONSE = "Here is a summary of the document you are looking at. " * 20
+
+
+def legacy_interaction(logger: logging.Logger) -> None:
+    logger.info("Processing multimodal input (screenshot + voice)")
+    logger.info("Screenshot captured: /tmp/shot.png")
+    logger.info("Recording audio")
+    logger.info(f"Transcribed text: {redact_sensitive_data(TRANSCRIPT, CONFIG)}")
+    logger.debug(f"Prompt: {redact_sensitive_data(TRANSCRIPT + RESPONSE, CONFIG)}")
+    logger.info("Sending prompt to LLM")
+    logger.info(f"Response sent: {redact_sensitive_data(RESPONSE, CONFIG)}")
+
+
+def queued_interaction(logger: logging.Logger) -> None:
+    logger.info("Processing multimodal input (screenshot + voice)")
+    logger.info("Screenshot captured: %s", "/tmp/shot.png")
+    logger.info("Recording audio")
+    logger.info("Transcribed text: %s", TRANSCRIPT)
+    logger.debug("Prompt: %s", TRANSCRIPT + RESPONSE)
+    logger.info("Sending prompt to LLM")
+    logger.info("Response sent: %s", RESPONSE)
+
+
+def measure(fn, logger: logging.Logger, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn(logger)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    os.chdir(tempfile.mkdtemp(prefix="lma-bench-"))
+
+    legacy = logging.getLogger("bench.legacy")
+    handler = RotatingFileHandler("legacy.log", maxBytes=10 * 1024 * 1024, backupCount=1)
+    handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    legacy.addHandler(handler)
+    legacy.setLevel(logging.INFO)
+    legacy.propagate = False
+
+    queued = utils.setup_logging(CONFIG)
+
+    legacy_us = measure(legacy_interaction, legacy, count)
+    queued_us = measure(queued_interaction, queued, count)
+    drain_start = time.perf_counter()
+    utils.shutdown_logging()
+    drain_us = (time.perf_counter() - drain_start) / count * 1e6
+
+    print(f"interactions:             {count}")
+    print(f"sync + eager redaction:   {legacy_us:8.1f} us/interaction (caller thread)")
+    print(f"queued + lazy redaction:  {queued_us:8.1f} us/interaction (caller thread)")
+    print(f"background writer drain:  {drain_us:8.1f} us/interaction (listener thread)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measure text injection speed of each keyboard strategy.
+
+Types the same text with every available strategy of
+:class:`lma.keyboard_injector.KeyboardInjector` (``pyautogui.write``,
+``xdotool type``, ``ydotool type`` and clipboard paste) and reports
+characters per second. Paste includes the delay before the original
+clipboard is restored, since the call blocks for it.
+
+The text goes to the focused window: open an empty editor, start the
+benchmark and focus the editor during the countdown. Run with::
+
+    python benchmarks/text_injection.py [chars] [countdown_s]
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from lma.keyboard_injector import KeyboardInjector  # noqa: E402
+
+SENTENCE = "The quick brown fox jumps over the lazy dog, 0123456789. "
+STRATEGIES = ("pyautogui", "xdotool", "ydotool", "paste")
+
+
+def sample(chars: int) -> str:
+    text = (SENTENCE * (chars // len(SENTENCE) + 1))[:chars]
+    return text.rstrip() + "\n"
+
+
+def main() -> None:
+    chars = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    countdown = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    injector = KeyboardInjector()
+    text = sample(chars)
+
+    print(f"Focus an empty text editor; typing starts in {countdown:.0f}s.")
+    time.sleep(countdown)
+    print(f"characters: {len(text)}")
+    for method in STRATEGIES:
+        injector.method = method
+        if method not in injector.strategies(text)[:1]:
+            print(f"{method:10} unavailable")
+            continue
+        start = time.perf_counter()
+        used = injector.type_text(text)
+        elapsed = time.perf_counter() - start
+        if used != method:
+            print(f"{method:10} failed (fell back to {used})")
+            continue
+        print(f"{method:10} {elapsed:8.3f} s  {len(text) / elapsed:10.0f} chars/s")
+        time.sleep(0.5)  # let the editor catch up before the next run
+
+
+if __name__ == "__main__":
+    main()
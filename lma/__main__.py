@@ -1,29 +1,184 @@
 #!/usr/bin/env python3
-"""Main entry point for the Linux Multimodal Assistant."""
+"""Main entry point for the Linux Multimodal Assistant.
 
+The hotkey service is driven by an asyncio event loop. Hotkey presses,
+config file changes and signals arrive from other threads or the OS
+and are turned into tasks on the loop; each interaction's blocking
+pipeline (recording, transcription, HTTP, TTS) runs on a worker thread
+awaited by its task. The loop is where interactions are timed out and
+cancelled, and it sleeps in the kernel while nothing happens.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import signal
 import sys
+import threading
 import time
-import signal
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
 
 from .assistant import Assistant
+from .cancel import CancelToken, current_token
+from .config import Config, ConfigError, ConfigWatcher
 from .hotkey_listener import HotkeyListener
+from .profiling import InteractionProfiler
 from .utils import load_config
 
 
 class MultimodalAssistant:
-    """Main application coordinator."""
+    """Main application coordinator.
+
+    Recognized ``runtime`` config keys are ``interaction_timeout_s``
+    (an interaction still running after this long is cancelled; time
+    spent waiting for the user in a confirmation dialog does not count;
+    default 120, ``0`` for no limit), ``max_concurrent`` (interactions
+    whose pipelines run at once, default 4) and ``shutdown_timeout_s``
+    (how long shutdown waits for cancelled interactions, default 5).
+    """
 
     def __init__(self, config_path: str = "config.json") -> None:
-        self.config = load_config(config_path)
-        self.assistant = Assistant(config_path)
+        self.config_path = config_path
+        self.config = Config.load(config_path)
+        self.assistant = Assistant(config_path, config=self.config)
         self.hotkey_listener: Optional[HotkeyListener] = None
+        self.config_watcher: Optional[ConfigWatcher] = None
+        self.profiler = InteractionProfiler.from_config(self.config)
         self.running = False
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.tasks: Set["asyncio.Task[Any]"] = set()
+        self.tokens: Set[CancelToken] = set()
+        self._stopping: Optional[asyncio.Event] = None
+        self._stopped = False
+        self._pool_lock = threading.Lock()
+        self.pool = self._make_pool()
+
+    def _runtime(self) -> Dict[str, Any]:
+        return self.config.get("runtime", {})
+
+    def _make_pool(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=self._runtime().get("max_concurrent", 4), thread_name_prefix="lma-action"
+        )
+
+    def reload_config(self) -> None:
+        """Re-read the config file and rebuild only what changed."""
+        try:
+            config = Config.load(self.config_path, strict=True)
+        except ConfigError as e:
+            self.assistant.logger.error(f"Ignoring config change: {e}")
+            self.assistant.notifier.send(f"Config not reloaded: {e}")
+            return
+
+        changed = self.assistant.apply_config(config)
+        self.config = config
+        if "profiling" in changed:
+            self.profiler.reconfigure(config)
+        if "runtime" in changed:
+            # Running interactions finish on the old pool
+            with self._pool_lock:
+                old, self.pool = self.pool, self._make_pool()
+            old.shutdown(wait=False)
+        if "hotkeys" in changed and self.running:
+            self._start_hotkeys()
+
+    def _start_hotkeys(self) -> None:
+        """(Re)create the hotkey listener from the current configuration."""
+        if self.hotkey_listener:
+            self.hotkey_listener.stop()
+            self.hotkey_listener = None
+
+        hotkeys = self.config.get("hotkeys", {})
+        if not hotkeys:
+            self.assistant.logger.warning("No hotkeys configured")
+            self.assistant.notifier.error("No hotkeys configured in config.json")
+            return
+
+        self.hotkey_listener = HotkeyListener(
+            {k: v for k, v in hotkeys.items() if k != "allow_custom"}, self.handle_hotkey
+        )
+        self.hotkey_listener.start()
+        self.assistant.logger.info(f"Hotkeys registered: {list(hotkeys.keys())}")
 
+        # Log hotkey mappings for user reference
+        for action, key_combination in hotkeys.items():
+            if action != "allow_custom":  # Skip non-hotkey config
+                self.assistant.logger.info(f"  {action}: {key_combination}")
+
+    # Events from other threads ---------------------------------------
     def handle_hotkey(self, action: str) -> None:
-        """Handle hotkey activation with proper workflow differentiation."""
+        """Handle hotkey activation with proper workflow differentiation.
+
+        Called on the hotkey listener's thread. The action becomes a
+        task on the event loop so the listener stays responsive; a
+        later hotkey press cancels it (see :meth:`Assistant.interrupt`).
+        """
         self.assistant.logger.info(f"Hotkey activated: {action}")
-        
+        if self.loop is None or self.loop.is_closed():
+            # Not running under the event loop: run the action directly.
+            threading.Thread(target=self._run_action, args=(action,), name=f"lma-{action}", daemon=True).start()
+            return
+        self.loop.call_soon_threadsafe(self._spawn, self._interaction(action))
+
+    def _config_changed(self) -> None:
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._spawn, self._reload())
+
+    # Tasks on the event loop -----------------------------------------
+    def _spawn(self, coro: Any) -> None:
+        if self._stopping is not None and self._stopping.is_set():
+            coro.close()
+            return
+        task = self.loop.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _reload(self) -> None:
+        await self.loop.run_in_executor(None, self.reload_config)
+
+    async def _interaction(self, action: str) -> None:
+        """Run one hotkey action on a worker thread, with timeout and cancellation."""
+        token = CancelToken()
+        context = contextvars.copy_context()
+        context.run(current_token.set, token)
+        self.tokens.add(token)
+        with self._pool_lock:
+            future = self.loop.run_in_executor(self.pool, context.run, self._run_action, action)
+        timeout = self._runtime().get("interaction_timeout_s", 120) or None
+        start = time.monotonic()
+        try:
+            while True:
+                remaining = None
+                if timeout is not None:
+                    # Time spent waiting for the user does not count
+                    remaining = timeout - (time.monotonic() - start - token.user_wait_s)
+                    if remaining <= 0:
+                        break
+                    if token.awaiting_user:
+                        remaining = max(remaining, 1.0)
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), remaining)
+                    return
+                except asyncio.TimeoutError:
+                    continue
+            self.assistant.logger.warning(f"{action} still running after {timeout}s; cancelling it")
+            self.assistant.notifier.error(f"{action} timed out")
+            token.cancel()
+        except asyncio.CancelledError:
+            token.cancel()
+            raise
+        finally:
+            self.tokens.discard(token)
+
+    def _run_action(self, action: str) -> None:
+        with self.profiler.profile(action) as dump:
+            self._dispatch(action)
+        if dump is not None:
+            self.assistant.logger.info(f"Profile of {action} written to {dump}")
+
+    def _dispatch(self, action: str) -> None:
         try:
             if action == "activate":
                 # Full multimodal capture (screenshot + audio) - Ctrl+Alt+A
@@ -42,31 +197,42 @@ class MultimodalAssistant:
             self.assistant.logger.error(error_msg)
             self.assistant.notifier.error(f"Processing failed: {str(e)}")
 
+    # Lifecycle --------------------------------------------------------
     def start(self) -> None:
-        """Start the assistant service."""
+        """Start the assistant service and block until it is stopped."""
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    async def run(self) -> None:
+        """Run the service until SIGINT or SIGTERM (or :meth:`stop`)."""
+        self.loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
         self.assistant.logger.info("Starting Linux Multimodal Assistant")
-        
+
+        # Shutdown is driven by signals delivered to the loop
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self.loop.add_signal_handler(signum, self._signal_handler, signum)
+        # kill -USR1 <pid> profiles the next interaction(s)
+        self.loop.add_signal_handler(signal.SIGUSR1, lambda: self.profiler.arm(self.profiler.signal_count))
+
+        self.running = True
+
         # Set up hotkey listener
+        self._start_hotkeys()
         hotkeys = self.config.get("hotkeys", {})
-        if hotkeys:
-            self.hotkey_listener = HotkeyListener(hotkeys, self.handle_hotkey)
-            self.hotkey_listener.start()
-            self.assistant.logger.info(f"Hotkeys registered: {list(hotkeys.keys())}")
-            
-            # Log hotkey mappings for user reference
-            for action, key_combination in hotkeys.items():
-                if action != "allow_custom":  # Skip non-hotkey config
-                    self.assistant.logger.info(f"  {action}: {key_combination}")
-        else:
-            self.assistant.logger.warning("No hotkeys configured")
-            self.assistant.notifier.error("No hotkeys configured in config.json")
 
-        # Set up signal handlers for graceful shutdown
-        signal.signal(signal.SIGINT, self._signal_handler)
-        signal.signal(signal.SIGTERM, self._signal_handler)
+        # Watch config.json so edits apply without a restart
+        watch = self.config.get("config", {})
+        if watch.get("watch", True):
+            self.config_watcher = ConfigWatcher(
+                self.config_path, self._config_changed, interval=watch.get("poll_interval_s", 1.0)
+            )
+            self.config_watcher.start()
 
-        self.running = True
-        
         # Welcome message
         welcome_msg = "Linux Multimodal Assistant is running! Available hotkeys:\n"
         hotkey_descriptions = {
@@ -83,39 +249,159 @@ class MultimodalAssistant:
         
         self.assistant.logger.info("Assistant is running. Press Ctrl+C to stop.")
         print(welcome_msg)
-        
+
         try:
-            # Main loop
-            while self.running:
-                time.sleep(0.1)
-        except KeyboardInterrupt:
-            pass
+            await self._stopping.wait()
         finally:
-            self.stop()
+            await self._shutdown()
 
-    def stop(self) -> None:
-        """Stop the assistant service."""
+    async def _shutdown(self) -> None:
         self.assistant.logger.info("Stopping Linux Multimodal Assistant")
         self.running = False
-        
+        self._stopping.set()
+        if self.hotkey_listener:
+            self.hotkey_listener.stop()
+            self.hotkey_listener = None
+        if self.config_watcher:
+            self.config_watcher.stop()
+            self.config_watcher = None
+        for token in list(self.tokens):
+            token.cancel()
+        pending = [t for t in self.tasks if t is not asyncio.current_task()]
+        if pending:
+            await asyncio.wait(pending, timeout=self._runtime().get("shutdown_timeout_s", 5.0))
+        for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGUSR1):
+            self.loop.remove_signal_handler(signum)
+
+    def stop(self) -> None:
+        """Stop the assistant service.
+
+        From another thread while the loop runs, this asks the loop to
+        shut down; otherwise it releases the remaining resources.
+        """
+        loop = self.loop
+        if loop is not None and loop.is_running() and self._stopping is not None:
+            loop.call_soon_threadsafe(self._stopping.set)
+            return
+        if self._stopped:
+            return
+        self._stopped = True
+        self.running = False
         if self.hotkey_listener:
             self.hotkey_listener.stop()
+        if self.config_watcher:
+            self.config_watcher.stop()
+        self.pool.shutdown(wait=False)
+        self.assistant.close()
 
-    def _signal_handler(self, signum, frame):
+    def _signal_handler(self, signum: int) -> None:
         """Handle shutdown signals."""
         self.assistant.logger.info(f"Received signal {signum}, shutting down...")
-        self.stop()
+        self._stopping.set()
 
 
-def main() -> None:
-    """Main entry point."""
+def _run_assistant(args: argparse.Namespace) -> None:
     try:
-        app = MultimodalAssistant()
+        app = MultimodalAssistant(args.config)
         app.start()
     except Exception as e:
         print(f"Error starting assistant: {e}", file=sys.stderr)
         sys.exit(1)
 
 
+def _run_transcribe(args: argparse.Namespace) -> None:
+    from . import transcribe
+    from .batch_transcribe import run_batch
+
+    # Probing is explicit here (--probe), and runs before workers fork.
+    transcribe.configure(load_config(args.config), probe=False)
+    if args.probe:
+        print(json.dumps(transcribe.probe_backends(), indent=2))
+        if not args.inputs:
+            return
+    if not args.inputs:
+        print("No input files given", file=sys.stderr)
+        sys.exit(2)
+
+    summary = run_batch(args.inputs, args.output, jobs=args.jobs, resume=not args.no_resume)
+    if summary["failed"]:
+        sys.exit(1)
+
+
+def _run_batch(args: argparse.Namespace) -> None:
+    from .batch import run_batch
+
+    stats = run_batch(
+        load_config(args.config),
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        resume=not args.no_resume,
+    )
+    if stats["failed"]:
+        sys.exit(1)
+
+
+def _run_replay(args: argparse.Namespace) -> None:
+    from .replay import replay_traces
+
+    summary = replay_traces(
+        load_config(args.config),
+        args.traces,
+        output=args.output,
+        llm=args.llm,
+        recorded_transcript=args.recorded_transcript,
+    )
+    if summary["mismatched"] or summary["failed"]:
+        sys.exit(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Return the command line parser for the ``lma`` command."""
+    parser = argparse.ArgumentParser(prog="lma", description="Linux Multimodal Assistant")
+    parser.add_argument("--config", default="config.json", help="path to config.json")
+    parser.set_defaults(func=_run_assistant)
+    sub = parser.add_subparsers(dest="command")
+
+    run = sub.add_parser("run", help="start the hotkey-driven assistant (default)")
+    run.set_defaults(func=_run_assistant)
+
+    tr = sub.add_parser("transcribe", help="transcribe audio files in bulk")
+    tr.add_argument("inputs", nargs="*", help="audio files, directories or glob patterns")
+    tr.add_argument("-o", "--output", default="transcripts.jsonl", help="JSONL output file")
+    tr.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    tr.add_argument("--no-resume", action="store_true", help="re-transcribe files already in the output")
+    tr.add_argument("--probe", action="store_true", help="benchmark transcription backends first")
+    tr.set_defaults(func=_run_transcribe)
+
+    batch = sub.add_parser("batch", help="run JSONL prompts concurrently through the LLM client")
+    batch.add_argument("input", help="JSONL file with prompt/image/id objects")
+    batch.add_argument("-o", "--output", default="results.jsonl", help="JSONL output file")
+    batch.add_argument("-c", "--concurrency", type=int, default=None, help="max in-flight requests")
+    batch.add_argument("--no-resume", action="store_true", help="re-run requests already in the output")
+    batch.set_defaults(func=_run_batch)
+
+    replay = sub.add_parser("replay", help="re-run recorded interaction traces and compare the results")
+    replay.add_argument("traces", nargs="+", help="trace archives or directories containing them")
+    replay.add_argument("-o", "--output", default=None, help="JSONL file for per-trace comparisons")
+    replay.add_argument(
+        "--llm",
+        choices=("recorded", "live", "local"),
+        default="recorded",
+        help="answer with the recorded response (default), the configured backends or the local model",
+    )
+    replay.add_argument(
+        "--recorded-transcript", action="store_true", help="reuse recorded transcripts instead of transcribing"
+    )
+    replay.set_defaults(func=_run_replay)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Main entry point."""
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""Bounded storage for screenshots, recordings and other artifacts.
+
+Every interaction leaves files behind (a screenshot, a WAV recording).
+:class:`ArtifactStore` hands out paths for new artifacts and keeps the
+directories that hold them within configured size and age limits,
+evicting the least recently used files first. A background janitor
+thread enforces the limits periodically so a long-running daemon never
+fills the disk.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _tmpfs_root() -> Optional[Path]:
+    """Return a RAM-backed directory usable for artifacts, if any."""
+    for candidate in (os.environ.get("XDG_RUNTIME_DIR"), "/dev/shm"):
+        if candidate and os.path.isdir(candidate) and os.access(candidate, os.W_OK):
+            return Path(candidate) / "lma"
+    return None
+
+
+class ArtifactStore:
+    """Hand out artifact paths and enforce retention limits on them.
+
+    Parameters
+    ----------
+    directories:
+        Mapping of artifact kind (``"screenshots"``, ``"audio"``) to the
+        directory holding it.
+    max_bytes:
+        Upper bound for the combined size of all managed files. ``0``
+        disables the size limit.
+    max_age:
+        Files older than this many seconds are removed. ``0`` disables
+        the age limit.
+    interval:
+        Seconds between janitor passes.
+
+    Only files whose names match the artifact naming scheme of their
+    kind (see :attr:`PATTERNS`) are ever removed, so pointing a kind at
+    a shared directory such as the working directory is safe.
+    """
+
+    PATTERNS = {"screenshots": ("shot_*", "clipboard_*"), "audio": ("audio_*",)}
+
+    def __init__(
+        self,
+        directories: Dict[str, Path],
+        max_bytes: int = 200 * 1024 * 1024,
+        max_age: float = 24 * 3600,
+        interval: float = 300,
+    ) -> None:
+        self.directories = {kind: Path(path) for kind, path in directories.items()}
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.interval = interval
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self._access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ArtifactStore":
+        """Build a store from the ``artifacts`` section of ``config``."""
+        cfg = config.get("artifacts", {})
+        screenshots = Path(config.get("screenshot_dir", "."))
+        audio = Path(cfg["audio_dir"]) if cfg.get("audio_dir") else Path(tempfile.gettempdir()) / "lma-audio"
+
+        if cfg.get("use_tmpfs", False):
+            root = _tmpfs_root()
+            if root is not None:
+                screenshots = root / "screenshots"
+                audio = root / "audio"
+
+        return cls(
+            {"screenshots": screenshots, "audio": audio},
+            max_bytes=int(cfg.get("max_size_mb", 200) * 1024 * 1024),
+            max_age=float(cfg.get("max_age_hours", 24)) * 3600,
+            interval=float(cfg.get("janitor_interval_s", 300)),
+        )
+
+    # ------------------------------------------------------------------
+    def directory(self, kind: str) -> str:
+        """Return (and create) the directory used for ``kind`` artifacts."""
+        path = self.directories[kind]
+        path.mkdir(parents=True, exist_ok=True)
+        return str(path)
+
+    def new_path(self, kind: str, suffix: str, prefix: Optional[str] = None) -> str:
+        """Return a fresh, unique file path for a ``kind`` artifact."""
+        directory = self.directory(kind)
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix=f"{prefix or kind}_{ts}_", dir=directory)
+        os.close(fd)
+        self.touch(path)
+        return path
+
+    def touch(self, path: str) -> None:
+        """Mark ``path`` as recently used so LRU eviction spares it."""
+        with self._lock:
+            self._access[path] = time.time()
+
+    # ------------------------------------------------------------------
+    def _scan(self) -> List[Tuple[str, int, float, float]]:
+        """Return ``(path, size, mtime, last_access)`` for managed files."""
+        files = []
+        for kind, directory in self.directories.items():
+            patterns = self.PATTERNS.get(kind, (f"{kind}_*",))
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not any(fnmatch.fnmatch(entry.name, p) for p in patterns):
+                    continue
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                last = max(st.st_mtime, self._access.get(entry.path, 0.0))
+                files.append((entry.path, st.st_size, st.st_mtime, last))
+        return files
+
+    def _remove(self, path: str, size: int) -> bool:
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        self._access.pop(path, None)
+        self.evicted_files += 1
+        self.evicted_bytes += size
+        return True
+
+    def cleanup(self) -> int:
+        """Enforce the age and size limits once. Returns files removed."""
+        removed = 0
+        now = time.time()
+        with self._lock:
+            files = self._scan()
+            kept = []
+            for path, size, mtime, last in files:
+                if self.max_age and now - mtime > self.max_age:
+                    removed += self._remove(path, size)
+                else:
+                    kept.append((path, size, last))
+
+            total = sum(size for _, size, _ in kept)
+            if self.max_bytes and total > self.max_bytes:
+                for path, size, _ in sorted(kept, key=lambda item: item[2]):
+                    if total <= self.max_bytes:
+                        break
+                    if self._remove(path, size):
+                        removed += 1
+                        total -= size
+
+            # Forget access times of files that no longer exist.
+            live = {path for path, _, _ in kept}
+            for path in list(self._access):
+                if path not in live and not os.path.exists(path):
+                    del self._access[path]
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current usage and cumulative eviction counters."""
+        with self._lock:
+            files = self._scan()
+        per_kind = {}
+        for kind, directory in self.directories.items():
+            prefix = str(directory) + os.sep
+            sizes = [size for path, size, _, _ in files if path.startswith(prefix)]
+            per_kind[kind] = {"files": len(sizes), "bytes": sum(sizes)}
+        return {
+            "files": len(files),
+            "bytes": sum(size for _, size, _, _ in files),
+            "max_bytes": self.max_bytes,
+            "evicted_files": self.evicted_files,
+            "evicted_bytes": self.evicted_bytes,
+            "directories": per_kind,
+        }
+
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        """Start the background janitor thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="lma-janitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the janitor thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.cleanup()
+            except Exception:
+                pass
+            self._stop.wait(self.interval)
@@ -2,143 +2,457 @@
 
 from __future__ import annotations
 
-import subprocess
+import functools
+import hashlib
+import mimetypes
+import os
 import re
-from typing import Optional
+import threading
+from concurrent.futures import Future
+from contextlib import nullcontext
+from dataclasses import asdict
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Set, Tuple
 
-from . import mic_capture, transcribe, screenshot, clipboard
+from . import audio_preprocess, mic_capture, transcribe, screenshot, clipboard
 from .llm_client import LLMClient
-from .utils import load_config, compress_image, setup_logging
-from .security import sanitize_text, extract_commands, is_safe_command, requires_confirmation, sanitize_input, redact_sensitive_data, validate_coordinates
+from .cancel import CancelToken, current_token
+from .artifacts import ArtifactStore
+from . import governor
+from .memory import MemoryManager
+from .trace import Trace, TraceRecorder
+from .executor import CommandExecutor, CommandResult
+from .config import Config, changed_sections
+from .utils import compress_image, setup_logging, update_logging
+from .security import (
+    CLICK_PATTERNS,
+    HOTKEY_PATTERNS,
+    MOVE_PATTERNS,
+    TYPE_PATTERNS,
+    extract_commands,
+    sanitize_input,
+    sanitize_text,
+    validate_coordinates,
+)
+from .policy import CONFIRM, DENY, CommandPolicy
 from .notifier import Notifier
 from .mouse_controller import MouseController
 from .keyboard_injector import KeyboardInjector
 
 
+def _traced(kind: str) -> Callable[[Callable[..., Optional[str]]], Callable[..., Optional[str]]]:
+    """Record the decorated interaction handler as a trace of ``kind``."""
+
+    def decorate(method: Callable[..., Optional[str]]) -> Callable[..., Optional[str]]:
+        @functools.wraps(method)
+        def wrapper(self: "Assistant") -> Optional[str]:
+            if self.tracer is None:
+                return method(self)
+            self.tracer.begin(kind)
+            try:
+                return method(self)
+            finally:
+                path = self.tracer.end()
+                if path is not None:
+                    self.logger.info(f"Trace saved: {path}")
+
+        return wrapper
+
+    return decorate
+
+
 class Assistant:
     """Coordinate user input, transcription and LLM querying."""
 
-    def __init__(self, config_path: str = "config.json") -> None:
-        self.config = load_config(config_path)
+    def __init__(self, config_path: str = "config.json", config: Optional[Config] = None) -> None:
+        self.config = config if config is not None else Config.load(config_path)
         self.logger = setup_logging(self.config)
         self.llm = LLMClient(self.config)
         self.notifier = Notifier(self.config)  # Pass config for TTS
         self.mouse = MouseController()
-        self.keyboard = KeyboardInjector()
+        self.keyboard = KeyboardInjector(self.config)
+        self.screens = screenshot.ScreenshotCache.from_config(self.config)
+        self.artifacts = ArtifactStore.from_config(self.config)
+        governor.configure(self.config)
+        transcribe.configure(self.config)
+        self.policy = CommandPolicy.from_config(self.config)
+        clipboard.configure(self.config)
+        # Only images copied after startup (and after the last request) are used
+        self._clipboard_digest = self._clipboard_image_digest()
+        self.executor = CommandExecutor(
+            self.config.get("executor", {}),
+            on_output=self._log_command_output,
+            on_complete=self._report_command,
+        )
+        if self.config.get("artifacts", {}).get("janitor", True):
+            self.artifacts.start()
+        self.mic = self._start_mic(self.config)
+        self.memory = self._start_memory(self.config)
+        self.tracer = TraceRecorder.from_config(self.config)
+        self._token = CancelToken()
+        self._token_lock = threading.Lock()
+
+    def interrupt(self) -> CancelToken:
+        """Cancel the interaction in progress and return a token for a new one.
+
+        The old interaction's LLM request, speech and shell commands are
+        aborted through its token; every ``handle_*`` method calls this
+        first, so a new hotkey press barges in on the previous answer.
+        The new token is the one the event loop set in :data:`current_token`
+        for this interaction, if any.
+        """
+        token = current_token.get() or CancelToken()
+        with self._token_lock:
+            old, self._token = self._token, token
+        if old is not token and not old.cancelled:
+            old.cancel()
+        self.memory.wake()
+        return self._token
+
+    def _trace(self) -> Optional[Trace]:
+        """The trace being recorded for this thread's interaction, if any."""
+        return self.tracer.current if self.tracer is not None else None
+
+    def _stage(self, name: str) -> ContextManager[Any]:
+        trace = self._trace()
+        return trace.stage(name) if trace is not None else nullcontext()
+
+    def _note(self, key: str, value: Any) -> None:
+        trace = self._trace()
+        if trace is not None:
+            trace.set(key, value)
 
+    def _action(self, kind: str, **details: Any) -> None:
+        trace = self._trace()
+        if trace is not None:
+            trace.action(kind, **details)
+
+    def _superseded(self, token: CancelToken) -> bool:
+        if token.cancelled:
+            self.logger.info("Interaction superseded by newer input")
+            return True
+        return False
+
+    @_traced("multimodal")
     def handle_multimodal_input(self) -> Optional[str]:
         """Handle full multimodal input (screenshot + voice) - Ctrl+Alt+A."""
         self.logger.info("Processing multimodal input (screenshot + voice)")
+        token = self.interrupt()
+        self._preload_llm(with_image=True)
         
-        # Capture screenshot first
-        shot = screenshot.take_screenshot(self.config)
+        # An image copied since the last request is sent instead of a
+        # screenshot; otherwise capture the screen
+        capture = self._clipboard_image() or self._capture_screen()
+        shot = capture.path if capture else None
+        region = capture.region if capture else None
+        on_screen = capture.on_screen if capture else True
         if shot:
-            compress_image(shot, 80)
-            self.logger.info(f"Screenshot captured: {shot}")
+            shot = self._reuse_unchanged_screen(shot, region)
+            self.logger.info(f"Screenshot captured: {shot} (region: {region})")
+            trace = self._trace()
+            if trace is not None:
+                trace.attach("screenshot", shot)
         else:
             self.logger.warning("Screenshot capture failed")
 
         # Record audio
         self.logger.info("Recording audio")
-        audio = mic_capture.record_audio()
+        audio = self._record_audio()
+        if self._superseded(token):
+            return None
         if not audio:
             self.logger.error("Audio capture failed")
             self.notifier.error("Audio capture failed")
             return None
 
         # Transcribe audio
-        text = transcribe.transcribe_audio(audio)
+        text = self._transcribe(audio)
+        if self._superseded(token):
+            return None
         if not text:
             self.logger.error("Transcription failed")
             self.notifier.error("Transcription failed")
             return None
 
-        self.logger.info(f"Transcribed text: {redact_sensitive_data(text, self.config)}")
+        self.logger.info("Transcribed text: %s", text)
 
         # Get clipboard content
-        clip = clipboard.get_clipboard()
+        clip = self._read_clipboard()
         prompt = text
         if clip:
             prompt = f"{text}\n\nContext: {clip}"
 
-        # Send to LLM with image
-        response = self._query_llm(prompt, image_path=shot)
-        return self._process_response(response)
+        # Send to LLM
+        response = self._query_llm(prompt, image_path=shot, token=token)
+        return self._process_response(response, region=region, token=token, on_screen=on_screen)
 
+    @_traced("voice")
     def handle_voice_only(self) -> Optional[str]:
         """Handle voice-only input (no screenshot) - Ctrl+Alt+M."""
         self.logger.info("Processing voice-only input")
+        token = self.interrupt()
+        self._preload_llm(with_image=False)
         
         # Record audio
         self.logger.info("Recording audio")
-        audio = mic_capture.record_audio()
+        audio = self._record_audio()
+        if self._superseded(token):
+            return None
         if not audio:
             self.logger.error("Audio capture failed")
             self.notifier.error("Audio capture failed")
             return None
 
         # Transcribe audio
-        text = transcribe.transcribe_audio(audio)
+        text = self._transcribe(audio)
+        if self._superseded(token):
+            return None
         if not text:
             self.logger.error("Transcription failed")
             self.notifier.error("Transcription failed")
             return None
 
-        self.logger.info(f"Transcribed text: {redact_sensitive_data(text, self.config)}")
+        self.logger.info("Transcribed text: %s", text)
 
         # Send to LLM without image
-        response = self._query_llm(text)
-        return self._process_response(response)
+        response = self._query_llm(text, token=token)
+        return self._process_response(response, token=token)
 
+    @_traced("text_selection")
     def handle_text_selection(self) -> Optional[str]:
         """Handle text selection processing - Ctrl+Alt+V."""
         self.logger.info("Processing text selection")
+        token = self.interrupt()
+        self._preload_llm(with_image=False)
         
-        # Get selected text
-        selected_text = clipboard.get_clipboard()
+        # Get selected text: the highlighted text, else the clipboard
+        selected_text = None
+        if self.config.get("clipboard", {}).get("use_primary", True):
+            selected_text = self._read_clipboard("primary")
+        if not selected_text:
+            selected_text = self._read_clipboard()
         if not selected_text:
             self.logger.warning("No text selected")
             self.notifier.error("No text selected or clipboard is empty")
             return None
 
         # Get additional voice command for what to do with the text
-        self.notifier.send("Selected text captured. Please provide a voice command for what to do with it.")
+        # Wait for the prompt to be spoken so it is not recorded
+        self.notifier.send(
+            "Selected text captured. Please provide a voice command for what to do with it.", token
+        ).result()
         
-        audio = mic_capture.record_audio()
+        audio = self._record_audio()
+        if self._superseded(token):
+            return None
         if not audio:
             self.logger.error("Audio capture failed")
             self.notifier.error("Audio capture failed")
             return None
 
-        command = transcribe.transcribe_audio(audio)
+        command = self._transcribe(audio)
+        if self._superseded(token):
+            return None
         if not command:
             self.logger.error("Transcription failed")
             self.notifier.error("Transcription failed")
             return None
 
-        self.logger.info(f"Voice command: {redact_sensitive_data(command, self.config)}")
+        self.logger.info("Voice command: %s", command)
 
         # Combine command with selected text
         prompt = f"{command}\n\nText to process: {selected_text}"
         
         # Send to LLM
-        response = self._query_llm(prompt)
-        processed_response = self._process_response(response)
+        response = self._query_llm(prompt, token=token)
+        processed_response = self._process_response(response, token=token)
         
         # Replace clipboard with the response
         if processed_response:
             clipboard.set_clipboard(processed_response)
-            self.notifier.send("Clipboard updated with processed text")
+            self.notifier.send("Clipboard updated with processed text", token)
         
         return processed_response
 
-    def _query_llm(self, prompt: str, image_path: Optional[str] = None) -> str:
-        """Query the LLM with sanitized input."""
+    def _reuse_unchanged_screen(self, shot: str, region: Optional[screenshot.Region] = None) -> str:
+        """Swap ``shot`` for an earlier, identical capture of the same ``region``.
+
+        Returns the path to use. Only done when ``screenshot.dedup`` is
+        enabled.
+        """
+        cfg = self.config.get("screenshot", {})
+        if not cfg.get("dedup", False):
+            compress_image(shot, 80)
+            return shot
+
+        cached = self.screens.match(shot, region)
+        if cached is None:
+            compress_image(shot, 80)
+            return shot
+
+        self.logger.info(f"Screen unchanged; reusing {cached.path}")
+        self.artifacts.touch(cached.path)
+        if cached.path != shot:
+            try:
+                os.remove(shot)
+            except OSError:
+                pass
+        return cached.path
+
+    def _start_memory(self, config: Dict[str, Any]) -> MemoryManager:
+        """Track releasable resources and start the idle checker."""
+        cfg = config.get("memory", {})
+        idle = cfg.get("idle_s", {})
+        memory = MemoryManager.from_config(config)
+        memory.register(
+            "transcription",
+            transcribe.unload_models,
+            reload=transcribe.warm_up,
+            is_loaded=lambda: bool(transcribe.loaded_models()),
+            idle_after=idle.get("transcription", 1800),
+        )
+        memory.register(
+            "llm",
+            lambda: self.llm.release_idle_state(),
+            is_loaded=lambda: self.llm.holds_idle_state(),
+            size=lambda: self.llm.payload_bytes(),
+            idle_after=idle.get("llm", 600),
+        )
+        # The query cache is persisted on every insert, so its in-memory
+        # index can be dropped; it is read back before its next use.
+        memory.register(
+            "query_cache",
+            lambda: self.llm.cache.clear(),
+            reload=lambda: self.llm.cache.load() if self.llm.cache is not None else None,
+            is_loaded=lambda: bool(self.llm.cache and self.llm.cache.path and self.llm.cache.loaded),
+            size=lambda: self.llm.cache.memory_bytes(),
+            idle_after=idle.get("query_cache", 3600),
+        )
+        if cfg.get("enabled", True):
+            memory.start()
+        return memory
+
+    def _start_mic(self, config: Dict[str, Any]) -> Optional[mic_capture.ResidentMic]:
+        """Open the resident microphone when ``audio.resident_mic`` is set."""
+        if not config.get("audio", {}).get("resident_mic", False):
+            return None
+        mic = mic_capture.ResidentMic.from_config(config)
+        if not mic.start():
+            self.logger.warning("Resident microphone unavailable; recording per request")
+            return None
+        return mic
+
+    def _capture_screen(self) -> Optional[screenshot.Capture]:
+        """Capture the configured screen region into the artifact store."""
+        with self._stage("capture"):
+            capture = screenshot.capture(
+                self.config,
+                directory=self.artifacts.directory("screenshots"),
+                cursor=self.mouse.position(),
+            )
+        if capture is not None and capture.region is not None:
+            self._note("region", asdict(capture.region))
+        return capture
+
+    def _read_clipboard(self, selection: str = "clipboard") -> Optional[str]:
+        clip = clipboard.get_clipboard(selection)
+        self._note("clipboard", clip)
+        return clip
+
+    def _clipboard_image_digest(self) -> Optional[str]:
+        """Digest of the image on the clipboard now, if any."""
+        if not self.config.get("clipboard", {}).get("images", True):
+            return None
+        image = clipboard.get_image()
+        return hashlib.sha1(image[1]).hexdigest() if image is not None else None
+
+    def _clipboard_image(self) -> Optional[screenshot.Capture]:
+        """Save an image copied since the last request as this request's image.
+
+        Each clipboard image is used once, and one already on the
+        clipboard at startup is not used, so an image copied long ago
+        does not replace the screenshot. The capture is marked as not
+        on screen, so click and move actions are not taken from it.
+        """
+        if not self.config.get("clipboard", {}).get("images", True):
+            return None
+        image = clipboard.get_image()
+        if image is None:
+            return None
+        mime, data = image
+        digest = hashlib.sha1(data).hexdigest()
+        if digest == self._clipboard_digest:
+            return None
+        self._clipboard_digest = digest
+        suffix = mimetypes.guess_extension(mime) or ".img"
+        path = self.artifacts.new_path("screenshots", suffix, prefix="clipboard")
+        with open(path, "wb") as fh:
+            fh.write(data)
+        self._note("image_source", "clipboard")
+        return screenshot.Capture(path, None, on_screen=False)
+
+    def _record_audio(self) -> Optional[str]:
+        """Record the user's voice into a file managed by the artifact store."""
+        with self._stage("record"):
+            path = self._record_audio_to(self.artifacts.new_path("audio", ".wav"))
+        trace = self._trace()
+        if trace is not None:
+            trace.attach("audio", path)
+        return path
+
+    def _record_audio_to(self, path: str) -> Optional[str]:
+        duration = self.config.get("audio", {}).get("duration", 5)
+        if self.mic is not None:
+            recorded = self.mic.record(duration, path=path)
+            if recorded:
+                return recorded
+            self.logger.warning("Resident microphone stalled; reopening the device")
+        return mic_capture.record_audio(duration=duration, path=path)
+
+    def _transcribe(self, audio: str) -> str:
+        """Trim and clean ``audio`` before handing it to the transcriber."""
+        with self._stage("transcribe"), governor.get_governor().critical("transcribe"):
+            text = self._transcribe_file(audio)
+        self._note("transcript", text)
+        return text
+
+    def _transcribe_file(self, audio: str) -> str:
+        self.memory.touch("transcription")
+        if self.config.get("audio", {}).get("preprocess", True):
+            result = audio_preprocess.preprocess_audio(audio, self.config)
+            if result is not None:
+                self.logger.info(
+                    f"Audio preprocessed: {result.original_seconds:.2f}s -> {result.seconds:.2f}s "
+                    f"({result.seconds_removed:.2f}s removed)"
+                )
+                if result.seconds == 0:
+                    self.logger.warning("No speech detected in recording")
+                    return ""
+                audio = result.path
+        return transcribe.transcribe_audio(audio)
+
+    def _preload_llm(self, with_image: bool) -> None:
+        """Start loading the local model while input is still being captured."""
+        mode = self.llm.config.get("mode", "gpt-4o")
+        if mode == "local" or (mode == "auto" and not with_image):
+            if self.llm.preload(with_image=with_image) is not None:
+                self.logger.info("Preloading local model")
+
+    def _query_llm(
+        self, prompt: str, image_path: Optional[str] = None, token: Optional[CancelToken] = None
+    ) -> str:
+        """Query the LLM with sanitized input; ``token`` aborts the request."""
         sanitized_prompt = sanitize_input(prompt, self.config)
+        self.memory.touch("llm")
+        self.memory.touch("query_cache")
+        
+        self._note("prompt", sanitized_prompt)
+        self._note("image", bool(image_path))
         
         self.logger.info("Sending prompt to LLM")
         try:
-            response = self.llm.send_prompt(sanitized_prompt, image_path=image_path)
+            with self._stage("llm"), governor.get_governor().critical("llm"):
+                response = self.llm.send_prompt(sanitized_prompt, image_path=image_path, token=token)
+            self._note("response", response)
             return response
         except Exception as e:
             error_msg = f"LLM query failed: {str(e)}"
@@ -146,110 +460,167 @@ class Assistant:
             self.notifier.error("Failed to get response from AI")
             return ""
 
-    def _process_response(self, response: str) -> Optional[str]:
-        """Process and handle LLM response, including security checks and automation."""
-        if not response:
+    def _process_response(
+        self,
+        response: str,
+        region: Optional[screenshot.Region] = None,
+        token: Optional[CancelToken] = None,
+        on_screen: bool = True,
+    ) -> Optional[str]:
+        """Process and handle LLM response, including security checks and automation.
+
+        ``region`` describes the screenshot the response refers to, so
+        coordinates in it can be mapped back to the screen; when the
+        image was not of the screen (``on_screen`` unset), coordinates
+        are not acted on. Nothing is acted on once ``token`` has been
+        cancelled.
+        """
+        if not response or (token is not None and self._superseded(token)):
             return None
+        with self._stage("process"):
+            final, speech = self._act_on_response(response, region, token, on_screen)
+        # Speech runs on the notifier's worker; its stage lasts until it ends.
+        with self._stage("speak"):
+            try:
+                speech.result()
+            except Exception as e:
+                self.logger.warning(f"Speaking the response failed: {e}")
+        self._note("final", final)
+        return final
 
+    def _act_on_response(
+        self,
+        response: str,
+        region: Optional[screenshot.Region],
+        token: Optional[CancelToken],
+        on_screen: bool = True,
+    ) -> Tuple[Optional[str], "Future[None]"]:
+        """Act on ``response`` and start speaking it.
+
+        Returns the final text (``None`` if superseded) and the future of
+        the spoken response.
+        """
         # Sanitize the response
         sanitized_response = sanitize_text(response)
         
         # Check for automation commands first
-        self._handle_automation_commands(sanitized_response)
+        self._handle_automation_commands(sanitized_response, region, on_screen)
         
-        # Check for shell commands
+        # Check for shell commands. They are steps of one answer, so they
+        # run in order; commands needing confirmation keep their place.
         commands = extract_commands(sanitized_response)
+        steps: List[Tuple[str, Optional["Future[bool]"]]] = []
         if commands:
             self.logger.info(f"Found {len(commands)} potential commands in response")
             
             for cmd in commands:
-                if not is_safe_command(cmd, self.config):
-                    self.logger.warning(f"Unsafe command detected: {cmd}")
+                verdict = self.policy.check(cmd)
+                if verdict.action == DENY:
+                    self.logger.warning(f"Unsafe command detected: {cmd} ({verdict.reason})")
                     continue
                 
-                if requires_confirmation(cmd, self.config):
-                    if not self.notifier.confirm(
+                if verdict.action == CONFIRM:
+                    # Ask without blocking; the answers are collected below
+                    steps.append((cmd, self.notifier.confirm_async(
                         f"Execute command: {cmd}?",
-                        "Security Confirmation"
-                    ):
-                        self.logger.info(f"User denied command execution: {cmd}")
-                        continue
+                        "Security Confirmation",
+                        token,
+                    )))
+                    continue
                 
-                # Execute the command
-                self._execute_shell_command(cmd)
+                steps.append((cmd, None))
+
+        if steps and all(answer is None for _, answer in steps):
+            # Nothing to confirm: start the commands while the answer is spoken
+            self._execute_shell_commands([cmd for cmd, _ in steps], token)
+            steps = []
 
-        # Send the response to user
-        self.notifier.send(sanitized_response)
-        self.logger.info(f"Response sent: {redact_sensitive_data(sanitized_response, self.config)}")
+        # Send the response to user while any confirmations are open
+        speech = self.notifier.send(sanitized_response, token)
+        self.logger.info("Response sent: %s", sanitized_response)
+
+        approved_steps = []
+        for cmd, answer in steps:
+            if answer is not None:
+                approved = answer.result()
+                self._action("confirm", command=cmd, approved=approved)
+                if not approved:
+                    self.logger.info(f"User denied command execution: {cmd}")
+                    continue
+            approved_steps.append(cmd)
+        if approved_steps:
+            if token is not None and self._superseded(token):
+                return None, speech
+            self._execute_shell_commands(approved_steps, token)
         
-        return sanitized_response
+        return sanitized_response, speech
 
-    def _handle_automation_commands(self, response: str) -> None:
-        """Handle mouse and keyboard automation commands from LLM response."""
+    def _screen_point(self, x: int, y: int, region: Optional[screenshot.Region]) -> Optional[Tuple[int, int]]:
+        """Map image coordinates from a response to a valid screen position."""
+        if region is not None:
+            x, y = region.to_screen(x, y)
+        left, top, width, height = self.mouse.screen_bounds()
+        self._note("screen_bounds", [left, top, width, height])
+        if validate_coordinates(x, y, width, height, left, top):
+            return x, y
+        return None
+
+    def _handle_automation_commands(
+        self, response: str, region: Optional[screenshot.Region] = None, on_screen: bool = True
+    ) -> None:
+        """Handle mouse and keyboard automation commands from LLM response.
+
+        Mouse actions are skipped unless the response refers to an image
+        of the screen (``on_screen``).
+        """
         
-        # Look for mouse click commands: "click at (x, y)" or "click coordinates x,y"
-        click_patterns = [
-            r'click\s+(?:at\s+)?\(?(\d+),\s*(\d+)\)?',
-            r'click\s+coordinates\s+(\d+),\s*(\d+)',
-            r'move\s+to\s+(\d+),\s*(\d+)\s+and\s+click'
-        ]
+        click_patterns, move_patterns = CLICK_PATTERNS, MOVE_PATTERNS
+        if not on_screen:
+            if any(re.search(p, response, re.IGNORECASE) for p in click_patterns + move_patterns):
+                self.logger.warning("Ignoring mouse actions: the image was not a screenshot")
+            click_patterns, move_patterns = [], []
         
         for pattern in click_patterns:
             matches = re.finditer(pattern, response, re.IGNORECASE)
             for match in matches:
                 try:
                     x, y = int(match.group(1)), int(match.group(2))
-                    if validate_coordinates(x, y):
-                        self.logger.info(f"Executing mouse click at ({x}, {y})")
-                        self.mouse.move(x, y)
+                    point = self._screen_point(x, y, region)
+                    if point:
+                        self.logger.info(f"Executing mouse click at {point} (image ({x}, {y}))")
+                        self.mouse.move(*point)
                         self.mouse.click()
+                        self._action("click", x=point[0], y=point[1])
                     else:
                         self.logger.warning(f"Invalid coordinates: ({x}, {y})")
                 except (ValueError, IndexError):
                     continue
         
-        # Look for mouse move commands: "move to (x, y)" or "move mouse to x,y"
-        move_patterns = [
-            r'move\s+(?:mouse\s+)?to\s+\(?(\d+),\s*(\d+)\)?',
-            r'move\s+cursor\s+to\s+(\d+),\s*(\d+)'
-        ]
-        
         for pattern in move_patterns:
             matches = re.finditer(pattern, response, re.IGNORECASE)
             for match in matches:
                 try:
                     x, y = int(match.group(1)), int(match.group(2))
-                    if validate_coordinates(x, y):
-                        self.logger.info(f"Moving mouse to ({x}, {y})")
-                        self.mouse.move(x, y)
+                    point = self._screen_point(x, y, region)
+                    if point:
+                        self.logger.info(f"Moving mouse to {point} (image ({x}, {y}))")
+                        self.mouse.move(*point)
+                        self._action("move", x=point[0], y=point[1])
                     else:
                         self.logger.warning(f"Invalid coordinates: ({x}, {y})")
                 except (ValueError, IndexError):
                     continue
         
-        # Look for typing commands: "type text 'hello world'" or "enter text: hello world"
-        type_patterns = [
-            r'type\s+(?:text\s+)?["\']([^"\']+)["\']',
-            r'enter\s+text:\s*(.+?)(?:\n|$)',
-            r'input\s+text\s+["\']([^"\']+)["\']'
-        ]
-        
-        for pattern in type_patterns:
+        for pattern in TYPE_PATTERNS:
             matches = re.finditer(pattern, response, re.IGNORECASE)
             for match in matches:
                 text_to_type = match.group(1).strip()
                 if text_to_type:
-                    self.logger.info(f"Typing text: {redact_sensitive_data(text_to_type, self.config)}")
+                    self.logger.info("Typing text: %s", text_to_type)
                     self.keyboard.type_text(text_to_type)
+                    self._action("type", text=text_to_type)
         
-        # Look for hotkey commands: "press ctrl+c" or "send hotkey alt+tab"
-        hotkey_patterns = [
-            r'press\s+((?:\w+\+)*\w+)',
-            r'send\s+hotkey\s+((?:\w+\+)*\w+)',
-            r'use\s+keyboard\s+shortcut\s+((?:\w+\+)*\w+)'
-        ]
-        
-        for pattern in hotkey_patterns:
+        for pattern in HOTKEY_PATTERNS:
             matches = re.finditer(pattern, response, re.IGNORECASE)
             for match in matches:
                 hotkey = match.group(1).strip()
@@ -258,39 +629,113 @@ class Assistant:
                     keys = [key.strip().lower() for key in hotkey.split('+')]
                     self.logger.info(f"Sending hotkey: {hotkey}")
                     self.keyboard.send_hotkey(*keys)
+                    self._action("hotkey", keys=keys)
 
-    def _execute_shell_command(self, command: str) -> None:
-        """Execute a shell command safely."""
-        self.logger.info(f"Executing shell command: {command}")
-        
-        try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=30,  # 30 second timeout
-                check=False
-            )
-            
-            if result.returncode == 0:
-                if result.stdout:
-                    output = result.stdout.strip()
-                    self.logger.info(f"Command output: {output}")
-                    self.notifier.send(f"Command executed successfully: {output}")
-                else:
-                    self.notifier.send("Command executed successfully")
-            else:
-                error_msg = result.stderr.strip() if result.stderr else f"Command failed with code {result.returncode}"
-                self.logger.error(f"Command failed: {error_msg}")
-                self.notifier.error(f"Command failed: {error_msg}")
-                
-        except subprocess.TimeoutExpired:
-            self.logger.error(f"Command timed out: {command}")
+    def _execute_shell_commands(
+        self, commands: List[str], token: Optional[CancelToken] = None
+    ) -> "Future[List[CommandResult]]":
+        """Start one response's commands in order in the background.
+
+        Results are reported as each command finishes; a failure stops
+        the commands after it.
+        """
+        for command in commands:
+            self.logger.info(f"Executing shell command: {command}")
+            self._action("command", command=command)
+        return self.executor.submit_sequence(commands, token)
+
+    def _log_command_output(self, command: str, line: str) -> None:
+        self.logger.info("[%s] %s", command, line)
+        # Shown as it arrives; the notification service batches the lines
+        self.notifier.show(f"{command}: {line}")
+
+    def _report_command(self, result: CommandResult) -> None:
+        """Notify the user about a finished shell command."""
+        if result.cancelled:
+            self.logger.info(f"Command cancelled: {result.command}")
+        elif result.error is not None:
+            self.logger.error(f"Command execution error: {result.error}")
+            self.notifier.error(f"Command execution error: {result.error}")
+        elif result.timed_out:
+            self.logger.error(f"Command timed out: {result.command}")
             self.notifier.error("Command execution timed out")
-        except Exception as e:
-            self.logger.error(f"Command execution error: {str(e)}")
-            self.notifier.error(f"Command execution error: {str(e)}")
+        elif result.returncode == 0:
+            if result.output:
+                suffix = " (output truncated)" if result.truncated else ""
+                self.notifier.send(f"Command executed successfully: {result.output}{suffix}")
+            else:
+                self.notifier.send("Command executed successfully")
+        else:
+            error_msg = result.output or f"Command failed with code {result.returncode}"
+            self.logger.error(f"Command failed: {error_msg}")
+            self.notifier.error(f"Command failed: {error_msg}")
+
+    def apply_config(self, config: Dict[str, Any]) -> Set[str]:
+        """Switch to ``config``, rebuilding only subsystems whose section changed.
+
+        Warm state such as loaded models, HTTP connections and caches is
+        kept for every section that did not change. Returns the names of
+        the changed top-level sections.
+        """
+        changed = changed_sections(self.config, config)
+        self.config = config
+
+        if "llm" in changed:
+            self.llm.reconfigure(config)
+        if "query_cache" in changed:
+            self.llm.configure_cache(config)
+        if changed & {"tts", "notifications"}:
+            self.notifier.reconfigure(config)
+        if "keyboard" in changed:
+            self.keyboard.reconfigure(config)
+        if "security" in changed:
+            self.policy = CommandPolicy.from_config(config)
+            if self.llm.cache is not None:
+                self.llm.cache.policy = self.policy
+        if "executor" in changed:
+            self.executor.reconfigure(config.get("executor", {}))
+        if "logging" in changed:
+            update_logging(config)
+        if "screenshot" in changed:
+            self.screens = screenshot.ScreenshotCache.from_config(config)
+        if changed & {"artifacts", "screenshot_dir"}:
+            self.artifacts.stop()
+            self.artifacts = ArtifactStore.from_config(config)
+            if config.get("artifacts", {}).get("janitor", True):
+                self.artifacts.start()
+        if "cpu" in changed:
+            governor.configure(config)
+            transcribe.unload_models()  # reloaded with the new thread count
+        if "transcription" in changed:
+            transcribe.configure(config)
+        if "clipboard" in changed:
+            clipboard.configure(config)
+        if "trace" in changed:
+            self.tracer = TraceRecorder.from_config(config)
+        if "memory" in changed:
+            self.memory.stop()
+            self.memory = self._start_memory(config)
+        if "audio" in changed:
+            if self.mic is not None:
+                self.mic.stop()
+            self.mic = self._start_mic(config)
+
+        if changed:
+            self.logger.info(f"Configuration reloaded; changed sections: {sorted(changed)}")
+        return changed
+
+    def close(self) -> None:
+        """Release background resources held by the assistant."""
+        self._token.cancel()
+        self.notifier.close()
+        self.executor.shutdown()
+        self.artifacts.stop()
+        self.memory.stop()
+        self.logger.info(f"Memory usage: {self.memory.report()}")
+        self.logger.info(f"CPU usage: {governor.get_governor().report()}")
+        if self.mic is not None:
+            self.mic.stop()
+        self.logger.info(f"Artifact usage: {self.artifacts.stats()}")
 
     # Backward compatibility method
     def run_once(self) -> Optional[str]:
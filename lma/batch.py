@@ -0,0 +1,154 @@
+"""Concurrent batch runner for prompts stored as JSONL.
+
+Each input line is an object with a ``prompt`` and optionally an
+``image`` path and an ``id``. Prompts are sanitized and routed exactly
+like hotkey requests (:meth:`LLMClient.asend_prompt`), with a cap on
+in-flight requests and per-backend token-bucket rate limits. Every
+result is appended to the output JSONL as soon as it completes, so a
+killed run can be resumed by skipping ids that already succeeded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator, Optional, Set, TextIO, Tuple
+
+from .llm_client import AsyncTokenBucket, LLMClient
+from .security import sanitize_input
+
+
+def read_requests(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ``(id, request)`` pairs from the JSONL file at ``path``.
+
+    Requests without an ``id`` are identified by their line number.
+    Blank lines and lines that are not JSON objects are skipped.
+    """
+
+    with open(path, "r", encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(request, dict) and request.get("prompt"):
+                yield str(request.get("id", lineno)), request
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Return ids that already have a successful result in ``path``."""
+    done: Set[str] = set()
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not record.get("error"):
+                    done.add(str(record.get("id")))
+    except OSError:
+        pass
+    return done
+
+
+def configure_rate_limits(client: LLMClient, config: Dict[str, Any]) -> None:
+    """Install token buckets from ``batch.rate_limits`` on ``client``.
+
+    The section maps backend names (``openai``, ``local``) to
+    ``{"rate": requests_per_second, "burst": n}``.
+    """
+
+    for backend, limit in config.get("batch", {}).get("rate_limits", {}).items():
+        if limit and limit.get("rate"):
+            client.rate_limits[backend] = AsyncTokenBucket(limit["rate"], limit.get("burst"))
+
+
+async def _run_one(
+    client: LLMClient, config: Dict[str, Any], req_id: str, request: Dict[str, Any]
+) -> Dict[str, Any]:
+    record: Dict[str, Any] = {"id": req_id, "started": time.time()}
+    start = time.perf_counter()
+    try:
+        prompt = sanitize_input(request["prompt"], config)
+        record["response"] = await client.asend_prompt(prompt, image_path=request.get("image"))
+        if not record["response"]:
+            record["error"] = "empty response"
+    except Exception as exc:
+        record["error"] = str(exc) or type(exc).__name__
+    record["latency_s"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+async def run_batch_async(
+    config: Dict[str, Any],
+    input_path: str,
+    output_path: str,
+    concurrency: Optional[int] = None,
+    resume: bool = True,
+    client: Optional[LLMClient] = None,
+    progress: Optional[TextIO] = sys.stderr,
+) -> Dict[str, Any]:
+    """Run every request in ``input_path`` and append results to ``output_path``.
+
+    ``concurrency`` defaults to ``batch.concurrency`` (8). Returns a
+    summary with counts and wall time.
+    """
+
+    client = client or LLMClient(config)
+    configure_rate_limits(client, config)
+    concurrency = concurrency or config.get("batch", {}).get("concurrency", 8)
+    done = completed_ids(output_path) if resume else set()
+
+    queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue(maxsize=concurrency * 2)
+    stats = {"completed": 0, "failed": 0, "skipped": 0}
+    start = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as out:
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                record = await _run_one(client, config, *item)
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                stats["completed"] += 1
+                stats["failed"] += bool(record.get("error"))
+                if progress is not None:
+                    elapsed = time.perf_counter() - start
+                    progress.write(
+                        f"[{stats['completed']}] {record['id']} {record['latency_s']:.2f}s "
+                        f"({stats['completed'] / elapsed:.2f} req/s)\n"
+                    )
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        try:
+            for req_id, request in read_requests(input_path):
+                if req_id in done:
+                    stats["skipped"] += 1
+                    continue
+                await queue.put((req_id, request))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            await client.aclose()
+
+    stats["wall_seconds"] = round(time.perf_counter() - start, 2)
+    if progress is not None:
+        progress.write(json.dumps(stats) + "\n")
+    return stats
+
+
+def run_batch(config: Dict[str, Any], input_path: str, output_path: str, **kwargs: Any) -> Dict[str, Any]:
+    """Synchronous wrapper around :func:`run_batch_async`."""
+    return asyncio.run(run_batch_async(config, input_path, output_path, **kwargs))
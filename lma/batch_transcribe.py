@@ -0,0 +1,176 @@
+"""Offline batch transcription of recorded audio files.
+
+Files are fanned out to a pool of worker processes. Each worker loads
+its transcription model once (see :func:`lma.transcribe.warm_up`) and
+keeps it warm for every file it is given. Results are streamed to a
+JSONL file in completion order, so an interrupted run can be resumed
+by skipping files that already have a successful result.
+"""
+
+from __future__ import annotations
+
+import glob
+import json
+import os
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO
+
+from . import transcribe
+
+AUDIO_EXTENSIONS = {".wav", ".flac", ".mp3", ".ogg", ".m4a", ".opus", ".webm"}
+
+
+def collect_files(inputs: Iterable[str]) -> List[str]:
+    """Expand directories and glob patterns in ``inputs`` to audio files."""
+    files: List[str] = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files.extend(
+                    os.path.join(root, name)
+                    for name in names
+                    if Path(name).suffix.lower() in AUDIO_EXTENSIONS
+                )
+        else:
+            matches = glob.glob(item, recursive=True)
+            files.extend(m for m in matches if os.path.isfile(m))
+    return sorted(dict.fromkeys(os.path.abspath(f) for f in files))
+
+
+def completed_paths(output: str) -> Set[str]:
+    """Return files that already have a successful result in ``output``."""
+    done: Set[str] = set()
+    try:
+        with open(output, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # truncated last line of a killed run
+                if not record.get("error"):
+                    done.add(record.get("path"))
+    except OSError:
+        pass
+    return done
+
+
+def _audio_seconds(path: str) -> Optional[float]:
+    try:
+        with wave.open(path, "rb") as wf:
+            return wf.getnframes() / float(wf.getframerate())
+    except Exception:
+        return None
+
+
+def _init_worker(threads: int) -> None:
+    """Pool initializer: bound native threads and load the model once."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    transcribe.warm_up()
+
+
+def transcribe_file(path: str) -> Dict[str, Any]:
+    """Transcribe one file and return its JSONL record."""
+    start = time.perf_counter()
+    record: Dict[str, Any] = {"path": path, "audio_seconds": _audio_seconds(path)}
+    try:
+        text = transcribe.transcribe_audio(path)
+        record["text"] = text
+        if not text:
+            record["error"] = "no transcription"
+    except Exception as exc:  # pragma: no cover - transcribe_audio swallows errors
+        record["error"] = str(exc)
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    record["worker"] = os.getpid()
+    return record
+
+
+def _results(files: List[str], jobs: int) -> Iterator[Dict[str, Any]]:
+    if jobs <= 1:
+        transcribe.warm_up()
+        for path in files:
+            yield transcribe_file(path)
+        return
+
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    transcribe.wait_for_probe()  # no probe thread may be running across fork()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(transcribe_file, path) for path in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_batch(
+    inputs: Iterable[str],
+    output: str,
+    jobs: Optional[int] = None,
+    resume: bool = True,
+    progress: Optional[TextIO] = sys.stderr,
+) -> Dict[str, Any]:
+    """Transcribe every audio file in ``inputs`` and append to ``output``.
+
+    Parameters
+    ----------
+    inputs:
+        Directories and/or glob patterns.
+    output:
+        JSONL file receiving one record per file, in completion order.
+    jobs:
+        Worker processes; defaults to the number of CPUs.
+    resume:
+        Skip files that already have a successful record in ``output``.
+    progress:
+        Stream for progress lines, or ``None`` to stay quiet.
+
+    Returns
+    -------
+    dict
+        Summary with file counts, audio seconds and throughput.
+    """
+
+    files = collect_files(inputs)
+    skipped = 0
+    if resume:
+        done = completed_paths(output)
+        skipped = sum(1 for f in files if f in done)
+        files = [f for f in files if f not in done]
+
+    jobs = jobs or os.cpu_count() or 1
+    jobs = min(jobs, max(1, len(files)))
+    start = time.perf_counter()
+    finished = failed = 0
+    audio_total = 0.0
+
+    with open(output, "a", encoding="utf-8") as out:
+        for record in _results(files, jobs):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            finished += 1
+            failed += bool(record.get("error"))
+            audio_total += record.get("audio_seconds") or 0.0
+            if progress is not None:
+                elapsed = time.perf_counter() - start
+                progress.write(
+                    f"[{finished}/{len(files)}] {finished / elapsed:.2f} files/s, "
+                    f"{audio_total / elapsed:.1f}x realtime - {os.path.basename(record['path'])}\n"
+                )
+                progress.flush()
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "files": finished,
+        "failed": failed,
+        "skipped": skipped,
+        "jobs": jobs,
+        "audio_seconds": round(audio_total, 2),
+        "wall_seconds": round(elapsed, 2),
+        "files_per_second": round(finished / elapsed, 3) if elapsed else 0.0,
+        "realtime_factor": round(audio_total / elapsed, 2) if elapsed else 0.0,
+    }
+    if progress is not None:
+        progress.write(json.dumps(summary) + "\n")
+    return summary
@@ -0,0 +1,119 @@
+"""Cancellation tokens for barge-in.
+
+Every interaction gets a :class:`CancelToken`. When the user starts a
+new one, the previous token is cancelled, which runs the callbacks that
+the LLM client, the notifier and the command executor registered
+against it: HTTP sockets are shut down, speech processes are killed
+and running commands are terminated, so the old interaction stops
+within milliseconds instead of finishing in the background.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+
+
+class Cancelled(Exception):
+    """Raised when work is abandoned because its token was cancelled."""
+
+
+class CancelToken:
+    """Thread-safe, one-shot cancellation flag with callbacks."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self._user_waits = 0
+        self._user_since = 0.0
+        self._user_s = 0.0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Cancel the token and run every registered callback once."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run ``callback`` on cancellation (now, if already cancelled).
+
+        Returns a function that unregisters the callback, to be called
+        once the guarded work has finished.
+        """
+
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise Cancelled()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or ``timeout`` elapses; return :attr:`cancelled`."""
+        return self._event.wait(timeout)
+
+    @contextmanager
+    def user_wait(self) -> Iterator[None]:
+        """Mark the enclosed block as waiting for the user, e.g. in a dialog.
+
+        Interaction timeouts do not count this time (see
+        :attr:`user_wait_s`). Overlapping waits count once.
+        """
+        with self._lock:
+            if not self._user_waits:
+                self._user_since = time.monotonic()
+            self._user_waits += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._user_waits -= 1
+                if not self._user_waits:
+                    self._user_s += time.monotonic() - self._user_since
+
+    @property
+    def awaiting_user(self) -> bool:
+        """Whether a :meth:`user_wait` block is open."""
+        with self._lock:
+            return self._user_waits > 0
+
+    @property
+    def user_wait_s(self) -> float:
+        """Seconds spent in :meth:`user_wait` blocks so far."""
+        with self._lock:
+            if self._user_waits:
+                return self._user_s + time.monotonic() - self._user_since
+            return self._user_s
+
+
+# Token of the interaction running in the current context. The event
+# loop sets it before handing an interaction to a worker thread, so it
+# can cancel that interaction on timeout or shutdown;
+# :meth:`lma.assistant.Assistant.interrupt` adopts it.
+current_token: "ContextVar[Optional[CancelToken]]" = ContextVar("lma_current_token", default=None)
@@ -1,26 +1,280 @@
 """Clipboard management utilities.
 
-Functions in this module will interact with the system clipboard to
-retrieve and set text or other data formats. Future implementations may
-use `pyperclip` or platform specific commands.
+Reads and writes go through a native command-line backend chosen once
+by :func:`configure`: ``wl-paste``/``wl-copy`` under Wayland and
+``xclip`` under X11 (``xsel`` for text only), with ``pyperclip`` as the
+last resort. Every call has a timeout and a size cap, so a clipboard
+owner that never answers cannot stall the hotkey path. Backends that
+accept MIME types also give access to images, and the PRIMARY
+selection (the currently highlighted text) can be read instead of the
+clipboard.
 """
 
+from __future__ import annotations
 
-def get_clipboard() -> str:
-    """Return the current clipboard contents."""
+import os
+import shutil
+import signal
+import subprocess
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+IMAGE_TYPES = ("image/png", "image/jpeg", "image/webp", "image/bmp", "image/gif")
+
+_timeout = 1.0
+_max_bytes = 1024 * 1024
+_max_image_bytes = 20 * 1024 * 1024
+_backend: Optional["Backend"] = None
+
+
+def _run_capped(cmd: List[str], limit: int, timeout: float) -> Optional[bytes]:
+    """Run ``cmd`` and return at most ``limit + 1`` bytes of its output.
+
+    Returns ``None`` if the command fails or does not finish within
+    ``timeout`` seconds. Output longer than ``limit`` is cut off and the
+    command killed; callers detect it by the length.
+    """
+    try:
+        proc = subprocess.Popen(
+            cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+    except OSError:
+        return None
+    expired = threading.Event()
+
+    def kill() -> None:
+        # The whole group: a helper still holding the pipe would block read().
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def expire() -> None:
+        expired.set()
+        kill()
+
+    timer = threading.Timer(timeout, expire)
+    timer.start()
+    try:
+        data = proc.stdout.read(limit + 1)
+    finally:
+        timer.cancel()
+        if proc.poll() is None:
+            kill()
+        proc.stdout.close()
+        proc.wait()
+    if expired.is_set():
+        return None
+    if len(data) <= limit and proc.returncode != 0:
+        return None
+    return data
+
+
+class Backend:
+    """Command lines of one clipboard tool.
+
+    ``selection`` is ``"clipboard"`` or ``"primary"``; ``mime`` is a MIME
+    type or X target, ``None`` meaning text.
+    """
+
+    name = "none"
+
+    def read_cmd(self, selection: str, mime: Optional[str]) -> Optional[List[str]]:
+        return None
+
+    def write_cmd(self, selection: str, mime: Optional[str]) -> Optional[List[str]]:
+        return None
+
+    def types_cmd(self, selection: str) -> Optional[List[str]]:
+        return None
+
+    def read(self, selection: str, mime: Optional[str], limit: int) -> Optional[bytes]:
+        cmd = self.read_cmd(selection, mime)
+        return _run_capped(cmd, limit, _timeout) if cmd else None
+
+    def write(self, data: bytes, selection: str, mime: Optional[str]) -> bool:
+        cmd = self.write_cmd(selection, mime)
+        if not cmd:
+            return False
+        try:
+            # The tools fork a server process that keeps the selection;
+            # its stdout must not be our pipe or run() would wait for it.
+            result = subprocess.run(
+                cmd, input=data, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=_timeout
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+        return result.returncode == 0
+
+    def types(self, selection: str) -> List[str]:
+        cmd = self.types_cmd(selection)
+        out = _run_capped(cmd, 64 * 1024, _timeout) if cmd else None
+        return out.decode("utf-8", "replace").split() if out else []
+
+
+class WaylandBackend(Backend):
+    name = "wl-clipboard"
+
+    def read_cmd(self, selection: str, mime: Optional[str]) -> List[str]:
+        primary = ["--primary"] if selection == "primary" else []
+        return ["wl-paste", "--no-newline", *primary, "--type", mime or "text"]
+
+    def write_cmd(self, selection: str, mime: Optional[str]) -> List[str]:
+        primary = ["--primary"] if selection == "primary" else []
+        return ["wl-copy", *primary, *(["--type", mime] if mime else [])]
+
+    def types_cmd(self, selection: str) -> List[str]:
+        return ["wl-paste", "--list-types", *(["--primary"] if selection == "primary" else [])]
+
+
+class XclipBackend(Backend):
+    name = "xclip"
+
+    def read_cmd(self, selection: str, mime: Optional[str]) -> List[str]:
+        return ["xclip", "-selection", selection, "-o", "-t", mime or "UTF8_STRING"]
+
+    def write_cmd(self, selection: str, mime: Optional[str]) -> List[str]:
+        return ["xclip", "-selection", selection, "-i", *(["-t", mime] if mime else [])]
+
+    def types_cmd(self, selection: str) -> List[str]:
+        return ["xclip", "-selection", selection, "-o", "-t", "TARGETS"]
+
+
+class XselBackend(Backend):
+    name = "xsel"
+
+    def read_cmd(self, selection: str, mime: Optional[str]) -> Optional[List[str]]:
+        return ["xsel", f"--{selection}", "--output"] if mime is None else None
+
+    def write_cmd(self, selection: str, mime: Optional[str]) -> Optional[List[str]]:
+        return ["xsel", f"--{selection}", "--input"] if mime is None else None
+
+
+class PyperclipBackend(Backend):
+    """Text-only clipboard through ``pyperclip`` (no timeout, no PRIMARY)."""
+
+    name = "pyperclip"
+
+    def __init__(self, module: Any) -> None:
+        self.pyperclip = module
+
+    def read(self, selection: str, mime: Optional[str], limit: int) -> Optional[bytes]:
+        if selection != "clipboard" or mime is not None:
+            return None
+        try:
+            return (self.pyperclip.paste() or "").encode("utf-8")[: limit + 1]
+        except Exception:
+            return None
+
+    def write(self, data: bytes, selection: str, mime: Optional[str]) -> bool:
+        if selection != "clipboard" or mime is not None:
+            return False
+        try:
+            self.pyperclip.copy(data.decode("utf-8", "replace"))
+            return True
+        except Exception:
+            return False
+
+
+def select_backend(preferred: str = "auto") -> Backend:
+    """Return the clipboard backend for this session.
+
+    ``preferred`` names a backend (``"wl-clipboard"``, ``"xclip"``,
+    ``"xsel"``, ``"pyperclip"``); ``"auto"`` picks by display server and
+    installed tools.
+    """
+    native = {
+        "wl-clipboard": (WaylandBackend, "wl-paste"),
+        "xclip": (XclipBackend, "xclip"),
+        "xsel": (XselBackend, "xsel"),
+    }
+    if preferred in native:
+        order = [preferred]
+    elif os.environ.get("WAYLAND_DISPLAY"):
+        order = ["wl-clipboard", "xclip", "xsel"]  # XWayland tools as a fallback
+    else:
+        order = ["xclip", "xsel", "wl-clipboard"]
+    for name in order:
+        cls, tool = native[name]
+        if shutil.which(tool):
+            return cls()
     try:
         import pyperclip
 
-        return pyperclip.paste() or ""
+        return PyperclipBackend(pyperclip)
     except Exception:
+        return Backend()
+
+
+def configure(config: Dict[str, Any]) -> Backend:
+    """Apply the ``clipboard`` config section and choose the backend once."""
+    global _backend, _timeout, _max_bytes, _max_image_bytes
+    cfg = config.get("clipboard", {})
+    _timeout = cfg.get("timeout_s", 1.0)
+    _max_bytes = int(cfg.get("max_text_kb", 1024) * 1024)
+    _max_image_bytes = int(cfg.get("max_image_mb", 20) * 1024 * 1024)
+    _backend = select_backend(cfg.get("backend", "auto"))
+    return _backend
+
+
+def backend() -> Backend:
+    """The configured backend (chosen with defaults on first use)."""
+    if _backend is None:
+        configure({})
+    return _backend
+
+
+def get_clipboard(selection: str = "clipboard") -> str:
+    """Return the text in ``selection``, truncated to the size cap."""
+    data = backend().read(selection, None, _max_bytes)
+    if not data:
         return ""
+    return data[:_max_bytes].decode("utf-8", "ignore")
+
+
+def get_selection() -> str:
+    """Return the highlighted text (the PRIMARY selection)."""
+    return get_clipboard("primary")
 
 
-def set_clipboard(text: str) -> None:
+def set_clipboard(text: str, selection: str = "clipboard") -> None:
     """Set the clipboard contents."""
-    try:
-        import pyperclip
+    backend().write(text.encode("utf-8"), selection, None)
 
-        pyperclip.copy(text)
-    except Exception:
-        pass
+
+def targets(selection: str = "clipboard") -> List[str]:
+    """Return the MIME types (X targets) ``selection`` is offered as."""
+    return backend().types(selection)
+
+
+def get_image(selection: str = "clipboard") -> Optional[Tuple[str, bytes]]:
+    """Return ``(mime, data)`` if ``selection`` holds an image within the cap."""
+    offered = targets(selection)
+    for mime in IMAGE_TYPES:
+        if mime in offered:
+            data = backend().read(selection, mime, _max_image_bytes)
+            if data and len(data) <= _max_image_bytes:
+                return mime, data
+            return None
+    return None
+
+
+def snapshot(selection: str = "clipboard") -> Optional[Tuple[Optional[str], bytes]]:
+    """Capture the contents of ``selection`` for :func:`restore`.
+
+    Images are kept as images; anything else is kept as text.
+    """
+    image = get_image(selection)
+    if image is not None:
+        return image
+    data = backend().read(selection, None, _max_bytes)
+    return (None, data) if data is not None and len(data) <= _max_bytes else None
+
+
+def restore(saved: Optional[Tuple[Optional[str], bytes]], selection: str = "clipboard") -> None:
+    """Put contents captured by :func:`snapshot` back."""
+    if saved is None:
+        return
+    mime, data = saved
+    backend().write(data, selection, mime)
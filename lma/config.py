@@ -0,0 +1,341 @@
+"""Validated configuration and live reloading.
+
+:class:`Config` is the parsed ``config.json``. It stays a ``dict`` so
+every module keeps reading it with ``config.get(...)``, but it is
+checked against :data:`SCHEMA` on load, so a wrong type is reported
+with its key path instead of failing later inside a subsystem.
+:class:`ConfigWatcher` notices edits to the file (with inotify where
+available, polling otherwise) so the running assistant can rebuild
+only the sections that changed.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from .utils import load_config
+
+_NUMBER = (int, float)
+
+# Expected types of known keys. Unknown keys are accepted unchanged.
+SCHEMA: Dict[str, Any] = {
+    "hotkeys": {"*": (str, bool)},
+    "llm": {
+        "mode": ("gpt-4o", "local", "auto"),
+        "openai_api_key": str,
+        "local_endpoint": str,
+        "primary_local_model": str,
+        "fallback_model": str,
+        "keep_alive": (str, int, float),
+        "preload_on_hotkey": bool,
+        "preload_timeout": _NUMBER,
+        "latency_target_s": _NUMBER,
+        "short_latency_target_s": _NUMBER,
+        "short_prompt_chars": int,
+        "long_prompt_chars": int,
+        "fallback_vision": bool,
+        "max_error_rate": _NUMBER,
+        "retry_after_s": _NUMBER,
+        "hedge": dict,
+    },
+    "tts": {"enabled": bool, "engine": str, "fallback": str, "voice": str},
+    "notifications": {"coalesce_ms": int, "min_interval_ms": int, "timeout_ms": int, "max_lines": int},
+    "security": {
+        "allow_commands": list,
+        "confirm_required": list,
+        "deny_commands": list,
+        "argument_rules": dict,
+        "sanitize_inputs": bool,
+        "policy_cache_size": int,
+    },
+    "query_cache": {
+        "enabled": bool,
+        "match": ("exact", "similar"),
+        "threshold": _NUMBER,
+        "max_entries": int,
+        "ttl_s": _NUMBER,
+        "image_distance": int,
+        "path": str,
+    },
+    "clipboard": {
+        "backend": ("auto", "wl-clipboard", "xclip", "xsel", "pyperclip"),
+        "timeout_s": _NUMBER,
+        "max_text_kb": _NUMBER,
+        "max_image_mb": _NUMBER,
+        "use_primary": bool,
+        "images": bool,
+    },
+    "keyboard": {
+        "method": ("auto", "xdotool", "ydotool", "paste", "pyautogui"),
+        "paste_threshold": int,
+        "paste_keys": list,
+        "restore_delay_s": _NUMBER,
+    },
+    "executor": {"max_workers": int, "timeout": _NUMBER, "max_output_bytes": int},
+    "logging": {"level": str, "redact_sensitive": bool, "max_size_mb": _NUMBER, "format": ("json", "text")},
+    "screenshot_dir": str,
+    "screenshot": {
+        "mode": ("full", "monitor", "window", "cursor"),
+        "cursor_region": list,
+        "max_width": int,
+        "dedup": bool,
+        "dedup_threshold": int,
+        "dedup_history": int,
+    },
+    "audio": {
+        "duration": _NUMBER,
+        "resident_mic": bool,
+        "pre_roll_ms": int,
+        "ring_seconds": _NUMBER,
+        "samplerate": int,
+        "preprocess": bool,
+        "trim_silence": bool,
+        "silence_threshold_db": _NUMBER,
+        "silence_floor_db": _NUMBER,
+        "normalize": bool,
+        "denoise": bool,
+    },
+    "transcription": {"probe_on_startup": bool, "reprobe": bool, "ranking_path": str},
+    "batch": {"concurrency": int, "rate_limits": dict},
+    "artifacts": {
+        "max_size_mb": _NUMBER,
+        "max_age_hours": _NUMBER,
+        "janitor_interval_s": _NUMBER,
+        "use_tmpfs": bool,
+        "audio_dir": str,
+        "janitor": bool,
+    },
+    "cpu": {
+        "enabled": bool,
+        "reserve_cores": int,
+        "threads": dict,
+        "nice": dict,
+        "background_wait_s": _NUMBER,
+        "confine_commands": bool,
+    },
+    "memory": {
+        "enabled": bool,
+        "ceiling_mb": _NUMBER,
+        "interval_s": _NUMBER,
+        "prewarm": bool,
+        "idle_s": dict,
+    },
+    "profiling": {
+        "interactions": int,
+        "signal_interactions": int,
+        "dir": str,
+        "top": int,
+        "sample_interval_ms": _NUMBER,
+    },
+    "trace": {"enabled": bool, "dir": str, "max_traces": int},
+    "config": {"watch": bool, "poll_interval_s": _NUMBER},
+    "runtime": {"interaction_timeout_s": _NUMBER, "max_concurrent": int, "shutdown_timeout_s": _NUMBER},
+}
+
+
+class ConfigError(ValueError):
+    """Raised when a configuration file is unreadable or invalid."""
+
+
+def _type_ok(value: Any, expected: Any) -> bool:
+    if isinstance(expected, tuple) and all(isinstance(e, str) for e in expected):
+        return value in expected  # enumerated choices
+    types = expected if isinstance(expected, tuple) else (expected,)
+    # bool is an int subclass but never a valid number here
+    if isinstance(value, bool) and bool not in types:
+        return False
+    return isinstance(value, types)
+
+
+def validate(data: Dict[str, Any]) -> List[str]:
+    """Return a list of ``"key.path: problem"`` strings for ``data``."""
+    errors = []
+    for key, expected in SCHEMA.items():
+        if key not in data:
+            continue
+        value = data[key]
+        if not isinstance(expected, dict):
+            if not _type_ok(value, expected):
+                errors.append(f"{key}: unexpected value {value!r}")
+            continue
+        if not isinstance(value, dict):
+            errors.append(f"{key}: expected an object")
+            continue
+        for sub, sub_value in value.items():
+            sub_expected = expected.get(sub, expected.get("*"))
+            if sub_expected is not None and not _type_ok(sub_value, sub_expected):
+                errors.append(f"{key}.{sub}: unexpected value {sub_value!r}")
+    return errors
+
+
+def changed_sections(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+    """Return the top-level keys whose values differ between two configs."""
+    return {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+
+
+class Config(dict):
+    """Configuration dictionary validated against :data:`SCHEMA`."""
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None, path: Optional[str] = None) -> None:
+        super().__init__(data or {})
+        self.path = path
+        errors = validate(self)
+        if errors:
+            raise ConfigError("Invalid configuration: " + "; ".join(errors))
+
+    @classmethod
+    def load(cls, path: str = "config.json", strict: bool = False) -> "Config":
+        """Load and validate ``path``.
+
+        With ``strict`` unset a missing or malformed file yields an empty
+        configuration, like :func:`lma.utils.load_config`. With ``strict``
+        set (used when reloading) a malformed file raises
+        :class:`ConfigError` so a half-written edit cannot wipe the
+        running configuration.
+        """
+
+        if not strict:
+            return cls(load_config(path), path)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"Cannot read {path}: {e}") from e
+        if not isinstance(data, dict):
+            raise ConfigError(f"{path}: top level must be an object")
+        return cls(data, path)
+
+
+
+# ----------------------------------------------------------------------
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_EVENT = struct.Struct("iIII")
+
+
+def _inotify() -> Optional[Any]:
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class ConfigWatcher:
+    """Call ``on_change`` whenever the config file at ``path`` changes.
+
+    Linux inotify is used through ``ctypes`` when available; the parent
+    directory is watched so editors that replace the file atomically
+    are handled. Otherwise the file's modification time is polled
+    every ``interval`` seconds. Bursts of events are debounced.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        on_change: Callable[[], None],
+        interval: float = 1.0,
+        debounce: float = 0.2,
+        use_inotify: bool = True,
+    ) -> None:
+        self.path = Path(path).resolve()
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="lma-config-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _fire(self) -> None:
+        try:
+            self.on_change()
+        except Exception:
+            pass
+
+    def _run(self) -> None:
+        libc = _inotify() if self.use_inotify else None
+        fd = -1
+        if libc is not None:
+            fd = libc.inotify_init1(_IN_NONBLOCK)
+            mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY
+            if fd < 0 or libc.inotify_add_watch(fd, str(self.path.parent).encode(), mask) < 0:
+                if fd >= 0:
+                    os.close(fd)
+                fd = -1
+        try:
+            if fd >= 0:
+                self._run_inotify(fd)
+            else:
+                self._run_polling()
+        finally:
+            if fd >= 0:
+                os.close(fd)
+
+    def _run_inotify(self, fd: int) -> None:
+        name = self.path.name.encode()
+        while not self._stop.is_set():
+            ready, _, _ = select.select([fd], [], [], self.interval)
+            if not ready:
+                continue
+            if self._drain(fd, name):
+                # Let the writer finish, then swallow the rest of the burst.
+                self._stop.wait(self.debounce)
+                self._drain(fd, name)
+                self._fire()
+
+    @staticmethod
+    def _drain(fd: int, name: bytes) -> bool:
+        matched = False
+        while True:
+            try:
+                data = os.read(fd, 4096)
+            except BlockingIOError:
+                return matched
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT.unpack_from(data, offset)
+                event_name = data[offset + _EVENT.size : offset + _EVENT.size + length].rstrip(b"\0")
+                matched = matched or event_name == name
+                offset += _EVENT.size + length
+
+    def _run_polling(self) -> None:
+        last = self._signature()
+        while not self._stop.wait(self.interval):
+            current = self._signature()
+            if current != last:
+                self._stop.wait(self.debounce)
+                last = self._signature()
+                self._fire()
@@ -0,0 +1,202 @@
+"""Background execution of approved shell commands.
+
+Commands extracted from an LLM response run in worker threads so the
+rest of the pipeline (including the spoken answer) does not wait for
+them. The commands of one response are steps that may depend on each
+other, so they run in order on a single worker and stop at the first
+failure; commands from different interactions run concurrently. Each
+command's output is streamed line by line as it is produced (a line
+longer than a read is passed on in pieces), only a bounded number of
+bytes of it is kept in memory, and every result is reported as soon as
+that command finishes.
+"""
+
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .cancel import CancelToken
+from .governor import get_governor
+
+# Most characters read from a command at once, so a line without a
+# newline is never held in memory whole.
+_READ_CHARS = 8192
+
+
+@dataclass
+class CommandResult:
+    """Outcome of a single shell command."""
+
+    command: str
+    returncode: Optional[int]
+    output: str
+    truncated: bool = False
+    timed_out: bool = False
+    error: Optional[str] = None
+    duration: float = 0.0
+    cancelled: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not (self.timed_out or self.cancelled) and self.error is None
+
+
+class CommandExecutor:
+    """Run shell commands concurrently with streamed, size-capped output.
+
+    Parameters
+    ----------
+    config:
+        The ``executor`` config section: ``max_workers`` (4),
+        ``timeout`` seconds per command (30) and ``max_output_bytes``
+        of UTF-8 output kept per command (64 KiB).
+    on_output:
+        Called as ``on_output(command, line)`` for every output line
+        (in pieces for lines longer than a read).
+    on_complete:
+        Called with the :class:`CommandResult` when a command finishes.
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        on_output: Optional[Callable[[str, str], None]] = None,
+        on_complete: Optional[Callable[[CommandResult], None]] = None,
+    ) -> None:
+        self.on_output = on_output
+        self.on_complete = on_complete
+        self.pool: Optional[ThreadPoolExecutor] = None
+        self._workers = 0
+        self.reconfigure(config or {})
+
+    def reconfigure(self, config: Dict[str, Any]) -> None:
+        """Apply new limits; the worker pool is only rebuilt if its size changes."""
+        self.timeout = config.get("timeout", 30)
+        self.max_output = config.get("max_output_bytes", 64 * 1024)
+        workers = config.get("max_workers", 4)
+        if self.pool is None or self._workers != workers:
+            self._workers = workers
+            old, self.pool = self.pool, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lma-cmd")
+            if old is not None:
+                old.shutdown(wait=False)
+
+    def submit(self, command: str, token: Optional[CancelToken] = None) -> "Future[CommandResult]":
+        """Start ``command`` in the background and return its future.
+
+        Cancelling ``token`` kills the command (or skips it if it has not
+        started yet).
+        """
+        return self.pool.submit(self._run_and_report, command, token)
+
+    def submit_sequence(
+        self, commands: Sequence[str], token: Optional[CancelToken] = None
+    ) -> "Future[List[CommandResult]]":
+        """Run ``commands`` one after another on a single worker.
+
+        A command that fails, times out or is cancelled stops the rest.
+        The future's result lists the commands that ran.
+        """
+        return self.pool.submit(self._run_sequence, list(commands), token)
+
+    def _run_sequence(self, commands: List[str], token: Optional[CancelToken]) -> List[CommandResult]:
+        results = []
+        for command in commands:
+            result = self._run_and_report(command, token)
+            results.append(result)
+            if not result.ok:
+                break
+        return results
+
+    def run(self, command: str, token: Optional[CancelToken] = None) -> CommandResult:
+        """Run ``command`` to completion in the calling thread."""
+        start = time.monotonic()
+        if token is not None and token.cancelled:
+            return CommandResult(command, None, "", cancelled=True)
+        try:
+            proc = subprocess.Popen(
+                command,
+                shell=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL,
+                text=True,
+                errors="replace",
+                bufsize=1,
+                start_new_session=True,
+                env=get_governor().env("commands"),
+            )
+        except Exception as e:
+            return CommandResult(command, None, "", error=str(e))
+        get_governor().place(proc.pid, "commands")
+
+        timed_out = threading.Event()
+        cancelled = threading.Event()
+
+        def kill(reason: threading.Event) -> None:
+            reason.set()
+            # The command runs under a shell, so signal its whole group.
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except OSError:
+                proc.kill()
+
+        timer = threading.Timer(self.timeout, kill, (timed_out,))
+        timer.daemon = True
+        timer.start()
+        unregister = token.on_cancel(lambda: kill(cancelled)) if token is not None else None
+
+        chunks = []
+        kept = 0
+        truncated = False
+        try:
+            assert proc.stdout is not None
+            while True:
+                line = proc.stdout.readline(_READ_CHARS)
+                if not line:
+                    break
+                if kept < self.max_output:
+                    if self.on_output is not None:
+                        self.on_output(command, line.rstrip("\n"))
+                    data = line.encode("utf-8", "replace")
+                    chunk = data[: self.max_output - kept]
+                    chunks.append(chunk)
+                    kept += len(chunk)
+                    truncated = truncated or len(chunk) < len(data)
+                else:
+                    # Keep draining so the child never blocks on a full pipe.
+                    truncated = True
+            proc.wait()
+        finally:
+            timer.cancel()
+            if unregister is not None:
+                unregister()
+
+        return CommandResult(
+            command,
+            proc.returncode,
+            b"".join(chunks).decode("utf-8", "ignore").strip(),
+            truncated=truncated,
+            timed_out=timed_out.is_set(),
+            duration=time.monotonic() - start,
+            cancelled=cancelled.is_set(),
+        )
+
+    def _run_and_report(self, command: str, token: Optional[CancelToken] = None) -> CommandResult:
+        result = self.run(command, token)
+        if self.on_complete is not None:
+            try:
+                self.on_complete(result)
+            except Exception:
+                pass
+        return result
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop accepting commands; optionally wait for running ones."""
+        self.pool.shutdown(wait=wait)
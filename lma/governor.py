@@ -0,0 +1,292 @@
+"""CPU sharing between transcription, the local LLM, TTS and helpers.
+
+On a machine without a GPU, faster-whisper, a local Ollama model and
+Piper all want every core, and left at their library defaults they
+oversubscribe the CPU and slow each other down. :class:`CPUGovernor`
+turns the ``cpu`` config section into a plan:
+
+* a thread count per subsystem, passed to faster-whisper
+  (``cpu_threads``), Ollama (``options.num_thread``) and, through
+  ``OMP_NUM_THREADS`` and the BLAS equivalents, to in-process numeric
+  libraries and spawned helpers;
+* a CPU affinity and nice level per subsystem, applied to helper
+  processes when they are spawned. Transcription, the LLM and shell
+  commands the user asked for may use every core, while TTS and
+  background helpers are kept to the reserved cores so they do not
+  compete with the next request (``confine_commands`` treats shell
+  commands as helpers too);
+* an ordering rule: while an interactive stage on the critical path
+  (transcription, the LLM call) runs, background jobs such as the
+  backend probe and memory sweeps wait for it to finish.
+
+:meth:`CPUGovernor.report` shows the plan, how long each critical stage
+held the CPU and how busy each core has been.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:  # optional dependency
+    from threadpoolctl import threadpool_limits
+except Exception:  # pragma: no cover
+    threadpool_limits = None
+
+SUBSYSTEMS = ("transcription", "llm", "tts", "helpers", "commands")
+_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def available_cores() -> List[int]:
+    """Return the CPUs this process may run on."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return list(range(os.cpu_count() or 1))
+
+
+def _cpu_times() -> Dict[str, Tuple[int, int]]:
+    """Return ``{cpuN: (busy, total)}`` jiffies from ``/proc/stat``."""
+    times = {}
+    try:
+        with open("/proc/stat", "r", encoding="ascii") as fh:
+            for line in fh:
+                fields = line.split()
+                if not fields or not fields[0].startswith("cpu") or fields[0] == "cpu":
+                    continue
+                values = [int(v) for v in fields[1:]]
+                idle = values[3] + (values[4] if len(values) > 4 else 0)
+                times[fields[0]] = (sum(values) - idle, sum(values))
+    except (OSError, ValueError, IndexError):
+        pass
+    return times
+
+
+class CPUGovernor:
+    """Threads, cores and priorities for each subsystem.
+
+    Parameters
+    ----------
+    cores:
+        CPUs to plan for; defaults to this process's affinity.
+    reserve:
+        Cores set aside for TTS and helper processes. Defaults to one
+        core when there are more than two.
+    threads:
+        Per-subsystem thread count overrides.
+    nice:
+        Per-subsystem nice level overrides (only lowering priority is
+        attempted; raising it needs privileges).
+    background_wait:
+        Longest time a background job waits for the critical path.
+    confine_commands:
+        Run shell commands the user asked for like helpers: on the
+        reserved cores at the helpers' nice level. Off by default, so
+        commands get the whole machine at normal priority.
+    enabled:
+        When unset, library defaults are left alone and nothing waits.
+    """
+
+    def __init__(
+        self,
+        cores: Optional[List[int]] = None,
+        reserve: Optional[int] = None,
+        threads: Optional[Dict[str, int]] = None,
+        nice: Optional[Dict[str, int]] = None,
+        background_wait: float = 5.0,
+        confine_commands: bool = False,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.cores = sorted(cores) if cores else available_cores()
+        count = len(self.cores)
+        if reserve is None:
+            reserve = 1 if count > 2 else 0
+        reserve = min(max(0, reserve), count - 1)
+        side = self.cores[count - reserve :] if reserve else self.cores
+        main = max(1, count - reserve)
+        self._threads = {"transcription": main, "llm": main, "tts": len(side), "helpers": len(side)}
+        self._affinity = {"transcription": self.cores, "llm": self.cores, "tts": side, "helpers": side}
+        self._nice = {"transcription": 0, "llm": 0, "tts": 0, "helpers": 10}
+        self._nice.update(nice or {})
+        if confine_commands:
+            self._threads["commands"] = self._threads["helpers"]
+            self._affinity["commands"] = side
+            self._nice.setdefault("commands", self._nice["helpers"])
+        else:
+            self._threads["commands"] = main
+            self._affinity["commands"] = self.cores
+            self._nice.setdefault("commands", 0)
+        self._threads.update(threads or {})
+        self.background_wait = background_wait
+
+        self._cond = threading.Condition()
+        self._critical: Dict[str, int] = defaultdict(int)
+        self._critical_s: Dict[str, float] = defaultdict(float)
+        self._waited_s = 0.0
+        self._placed: Dict[str, int] = defaultdict(int)
+        self._last_times = _cpu_times()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CPUGovernor":
+        """Build a governor from the ``cpu`` section of ``config``."""
+        cfg = config.get("cpu", {})
+        return cls(
+            reserve=cfg.get("reserve_cores"),
+            threads=cfg.get("threads"),
+            nice=cfg.get("nice"),
+            background_wait=cfg.get("background_wait_s", 5.0),
+            confine_commands=cfg.get("confine_commands", False),
+            enabled=cfg.get("enabled", True),
+        )
+
+    # Plan -------------------------------------------------------------
+    def threads(self, subsystem: str) -> Optional[int]:
+        """Thread count for ``subsystem``, or ``None`` for the library default."""
+        return self._threads[subsystem] if self.enabled else None
+
+    def affinity(self, subsystem: str) -> List[int]:
+        return self._affinity[subsystem]
+
+    def env(self, subsystem: str) -> Optional[Dict[str, str]]:
+        """Environment for a helper process of ``subsystem`` (``None`` to inherit).
+
+        Thread counts the user has set in the environment are kept.
+        """
+        if not self.enabled:
+            return None
+        env = dict(os.environ)
+        for var in _THREAD_VARS:
+            env.setdefault(var, str(self._threads[subsystem]))
+        return env
+
+    def place(self, pid: int, subsystem: str) -> None:
+        """Apply ``subsystem``'s affinity and nice level to process ``pid``."""
+        if not self.enabled:
+            return
+        try:
+            os.sched_setaffinity(pid, self._affinity[subsystem])
+        except (AttributeError, OSError):
+            pass
+        nice = self._nice[subsystem]
+        if nice > 0:
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, nice)
+            except (AttributeError, OSError):
+                pass
+        with self._cond:
+            self._placed[subsystem] += 1
+
+    def apply_process_limits(self) -> None:
+        """Limit the thread pools of numeric libraries in this process.
+
+        Environment variables only affect libraries loaded afterwards
+        (and are only set when the user has not set them); pools that
+        are already running are resized with ``threadpoolctl`` when it
+        is installed.
+        """
+        if not self.enabled:
+            return
+        count = self._threads["transcription"]
+        for var in _THREAD_VARS:
+            os.environ.setdefault(var, str(count))
+        if threadpool_limits is not None:
+            try:
+                threadpool_limits(limits=count)
+            except Exception:
+                pass
+
+    # Ordering ---------------------------------------------------------
+    @contextmanager
+    def critical(self, stage: str) -> Iterator[None]:
+        """Mark ``stage`` of an interaction as running on the critical path."""
+        start = time.perf_counter()
+        with self._cond:
+            self._critical[stage] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._critical[stage] -= 1
+                self._critical_s[stage] += time.perf_counter() - start
+                self._cond.notify_all()
+
+    @property
+    def busy(self) -> bool:
+        """Whether a critical stage is running."""
+        with self._cond:
+            return any(self._critical.values())
+
+    def background(self, timeout: Optional[float] = None) -> bool:
+        """Wait until no critical stage runs; call before background work.
+
+        Waits at most ``timeout`` (default :attr:`background_wait`)
+        seconds so background work is delayed, never starved. Returns
+        whether the critical path was idle.
+        """
+        if not self.enabled:
+            return True
+        timeout = self.background_wait if timeout is None else timeout
+        start = time.perf_counter()
+        with self._cond:
+            idle = self._cond.wait_for(lambda: not any(self._critical.values()), timeout)
+            self._waited_s += time.perf_counter() - start
+        return idle
+
+    # Reporting --------------------------------------------------------
+    def report(self) -> Dict[str, Any]:
+        """Return the plan and how the cores have been used.
+
+        ``core_busy_pct`` is each core's utilization since the previous
+        report (or since the governor was created).
+        """
+        now = _cpu_times()
+        busy = {}
+        for cpu, (b, t) in now.items():
+            b0, t0 = self._last_times.get(cpu, (0, 0))
+            if t > t0:
+                busy[cpu] = round(100.0 * (b - b0) / (t - t0), 1)
+        self._last_times = now
+        usage = os.times()
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "cores": self.cores,
+                "plan": {
+                    name: {
+                        "threads": self._threads[name],
+                        "cores": self._affinity[name],
+                        "nice": self._nice[name],
+                        "processes": self._placed[name],
+                    }
+                    for name in SUBSYSTEMS
+                },
+                "critical_s": {k: round(v, 3) for k, v in self._critical_s.items()},
+                "background_waited_s": round(self._waited_s, 3),
+                "process_cpu_s": round(usage.user + usage.system, 3),
+                "children_cpu_s": round(usage.children_user + usage.children_system, 3),
+                "core_busy_pct": busy,
+            }
+
+
+_governor: Optional[CPUGovernor] = None
+
+
+def configure(config: Dict[str, Any]) -> CPUGovernor:
+    """Apply the ``cpu`` config section to the process-wide governor."""
+    global _governor
+    _governor = CPUGovernor.from_config(config)
+    _governor.apply_process_limits()
+    return _governor
+
+
+def get_governor() -> CPUGovernor:
+    """Return the process-wide governor, with defaults until configured."""
+    global _governor
+    if _governor is None:
+        _governor = CPUGovernor()
+    return _governor
@@ -1,29 +1,109 @@
 """Keyboard event injection utilities.
 
-This module will allow the assistant to programmatically type text or
-send keyboard shortcuts. Future implementations may rely on `pyautogui`
-or `pynput`.
+Text is injected with one of several strategies chosen by its length.
+``pyautogui.write`` sends one synthetic key event per character from
+Python and slows down (and drops characters) on long strings, so short
+strings are typed by ``xdotool type --delay 0`` (X11) or ``ydotool type``
+(Wayland) in a single process, and long ones are pasted: the clipboard
+is swapped for the text, Ctrl+V is sent and the original clipboard is
+restored. ``pyautogui`` remains the last resort. The next strategy is
+only tried when the previous one sent nothing, so text is never typed
+twice.
 """
 
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import clipboard
+
+METHODS = ("auto", "xdotool", "ydotool", "paste", "pyautogui")
+
+# Linux input event codes understood by ``ydotool key``.
+_YDOTOOL_KEYS = {"ctrl": 29, "shift": 42, "alt": 56, "super": 125, "v": 47, "insert": 110}
+
+
+def _which(cmd: str) -> bool:
+    return shutil.which(cmd) is not None
+
+
 class KeyboardInjector:
-    """Simulate keyboard input using ``pyautogui``."""
+    """Simulate keyboard input.
+
+    Recognized ``keyboard`` config keys are ``method`` (one of
+    :data:`METHODS`, default ``"auto"``), ``paste_threshold`` (texts at
+    least this long are pasted, default 200 characters; ``0`` never
+    pastes), ``paste_keys`` (default ``["ctrl", "v"]``; terminals may
+    need ``["ctrl", "shift", "v"]``) and ``restore_delay_s`` (how long
+    the pasted text stays on the clipboard before the original is put
+    back, default 0.3).
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        self.xdotool = _which("xdotool")
+        self.ydotool = _which("ydotool")
         try:
             import pyautogui
 
             self.pg = pyautogui
         except Exception:
             self.pg = None
+        self.reconfigure(config or {})
 
-    def type_text(self, text: str) -> None:
-        """Simulate typing text on the keyboard."""
-        if not self.pg:
-            return
-        try:
-            self.pg.write(text)
-        except Exception:
-            pass
+    def reconfigure(self, config: Dict[str, Any]) -> None:
+        """Apply new ``keyboard`` settings."""
+        cfg = config.get("keyboard", {})
+        self.method = cfg.get("method", "auto")
+        self.paste_threshold = cfg.get("paste_threshold", 200)
+        self.paste_keys = [k.lower() for k in cfg.get("paste_keys", ["ctrl", "v"])]
+        self.restore_delay = cfg.get("restore_delay_s", 0.3)
+
+    # ------------------------------------------------------------------
+    def strategies(self, text: str) -> List[str]:
+        """Return the available strategies for ``text``, best first."""
+        # Under Wayland xdotool only reaches XWayland windows.
+        wayland = bool(os.environ.get("WAYLAND_DISPLAY"))
+        typers = ["ydotool", "xdotool"] if wayland else ["xdotool", "ydotool"]
+        order = typers + ["pyautogui"]
+        if self.method == "auto":
+            if self.paste_threshold and len(text) >= self.paste_threshold:
+                order.insert(0, "paste")
+        elif self.method in METHODS:
+            order = [self.method] + [m for m in order if m != self.method]
+        available = {
+            "xdotool": self.xdotool,
+            "ydotool": self.ydotool,
+            "paste": self.xdotool or self.ydotool or self.pg is not None,
+            "pyautogui": self.pg is not None,
+        }
+        return [m for m in order if available[m]]
+
+    def type_text(self, text: str) -> Optional[str]:
+        """Type ``text`` into the focused window.
+
+        Returns the strategy that succeeded, or ``None`` if none did.
+        Strategies return ``True`` when done, ``False`` when they sent
+        nothing (the next one is tried) and ``None`` when they failed
+        after input may have been sent (nothing else is tried).
+        """
+        if not text:
+            return None
+        for method in self.strategies(text):
+            try:
+                result = getattr(self, f"_type_{method}")(text)
+            except OSError:
+                continue  # the tool could not be started
+            except Exception:
+                return None
+            if result:
+                return method
+            if result is None:
+                return None
+        return None
 
     def send_hotkey(self, *keys: str) -> None:
         """Send a keyboard shortcut."""
@@ -33,3 +113,55 @@ class KeyboardInjector:
             self.pg.hotkey(*keys)
         except Exception:
             pass
+
+    # Strategies -------------------------------------------------------
+    def _run(self, cmd: Sequence[str], text: Optional[str] = None) -> bool:
+        # Text goes through stdin: no argv length limit and not visible in ps.
+        timeout = 10 + (len(text) / 100 if text else 0)
+        result = subprocess.run(
+            list(cmd), input=text, text=True, timeout=timeout,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        return result.returncode == 0
+
+    # A typing tool that ran but failed may have typed part of the text.
+    def _type_xdotool(self, text: str) -> Optional[bool]:
+        return self._run(["xdotool", "type", "--clearmodifiers", "--delay", "0", "--file", "-"], text) or None
+
+    def _type_ydotool(self, text: str) -> Optional[bool]:
+        return self._run(["ydotool", "type", "--key-delay", "0", "--file", "-"], text) or None
+
+    def _type_pyautogui(self, text: str) -> bool:
+        self.pg.write(text)
+        return True
+
+    def _type_paste(self, text: str) -> bool:
+        saved = clipboard.snapshot()  # text or image
+        pasted = False
+        try:
+            clipboard.set_clipboard(text)
+            if clipboard.get_clipboard() != text:
+                return False  # no working clipboard; fall back to typing
+            pasted = self._hotkey(self.paste_keys)
+            return pasted
+        finally:
+            if pasted:
+                # The target reads the clipboard asynchronously after the key press.
+                time.sleep(self.restore_delay)
+            clipboard.restore(saved)
+
+    def _hotkey(self, keys: List[str]) -> bool:
+        try:
+            if self.xdotool and self._run(["xdotool", "key", "--clearmodifiers", "+".join(keys)]):
+                return True
+            if self.ydotool and all(k in _YDOTOOL_KEYS for k in keys):
+                codes = [_YDOTOOL_KEYS[k] for k in keys]
+                events = [f"{c}:1" for c in codes] + [f"{c}:0" for c in reversed(codes)]
+                if self._run(["ydotool", "key", *events]):
+                    return True
+            if self.pg:
+                self.pg.hotkey(*keys)
+                return True
+        except Exception:
+            pass
+        return False
@@ -2,95 +2,544 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import asyncio
+import logging
+import os
+import queue
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, InvalidStateError
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import httpx
 
+from .cancel import Cancelled, CancelToken
+from .governor import get_governor
+from .query_cache import QueryCache
+from .router import ModelRouter
 from .security import sanitize_text
 
 
+def _parse_keep_alive(value: Union[str, int, float, None]) -> Optional[float]:
+    """Return ``value`` (Ollama ``keep_alive`` syntax) in seconds.
+
+    Numbers are seconds, strings may carry an ``s``/``m``/``h`` suffix.
+    Negative values mean "keep loaded forever" and are returned as
+    ``float('inf')``. ``None`` is returned for unparsable input.
+    """
+
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = re.fullmatch(r"\s*(-?\d+(?:\.\d+)?)\s*([smh]?)\s*", str(value))
+        if not match:
+            return None
+        seconds = float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+    return float("inf") if seconds < 0 else seconds
+
+
+def _shutdown_stream(stream: Any) -> None:
+    """Shut down the socket behind an httpcore network stream.
+
+    ``shutdown`` (unlike ``close``) wakes a thread blocked reading it.
+    """
+
+    try:
+        sock = stream.get_extra_info("socket")
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+    except Exception:
+        pass
+
+
+_FAILURES = {
+    "openai": "OpenAI API request failed",
+    "local": "Local LLM request failed",
+    "fallback": "Local fallback model request failed",
+}
+
+
+class AsyncTokenBucket:
+    """Token-bucket rate limiter for coroutines.
+
+    Parameters
+    ----------
+    rate:
+        Tokens added per second.
+    burst:
+        Bucket capacity, i.e. the largest burst allowed after idling.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until ``tokens`` are available and take them."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
 class LLMClient:
     """Minimal client for remote or local LLM backends."""
 
     def __init__(self, config: Dict[str, Any]) -> None:
-        self.config = config.get("llm", {})
         self.client = httpx.Client(timeout=30)
+        self.logger = logging.getLogger("lma")
+        self._client_used = False
         self.retries = 3
+        # Local model name -> when it last answered (it stays loaded for keep_alive)
+        self._last_local_use: Dict[str, float] = {}
+        self.reconfigure(config)
+        self._preload_thread: Optional[threading.Thread] = None
+        self._payloads: "OrderedDict[str, Tuple[int, Tuple[str, bytes]]]" = OrderedDict()
+        self.payload_cache_size = 4
+        self.aclient: Optional[httpx.AsyncClient] = None
+        self.rate_limits: Dict[str, AsyncTokenBucket] = {}
+        self.router = ModelRouter()
+        self._hedge_credit = 1.0
+        self._hedge_lock = threading.Lock()
+        self.configure_cache(config)
 
-    def send_prompt(self, prompt: str, image_path: Optional[str] = None) -> str:
-        """Send ``prompt`` to the configured language model."""
+    def configure_cache(self, config: Dict[str, Any]) -> None:
+        """(Re)build the near-duplicate answer cache from ``query_cache``."""
+        self.cache: Optional[QueryCache] = QueryCache.from_config(config)
 
-        mode = self.config.get("mode", "gpt-4o")
+    def reconfigure(self, config: Dict[str, Any]) -> None:
+        """Apply a new ``llm`` section while keeping open connections."""
+        self.config = config.get("llm", {})
+        self.keep_alive = self.config.get("keep_alive", "5m")
+        self._keep_alive_s = _parse_keep_alive(self.keep_alive)
 
+    def send_prompt(
+        self,
+        prompt: str,
+        image_path: Optional[str] = None,
+        token: Optional[CancelToken] = None,
+        latency_target: Optional[float] = None,
+    ) -> str:
+        """Send ``prompt`` to the configured language model.
+
+        The model is chosen by :class:`~lma.router.ModelRouter`;
+        ``latency_target`` (seconds) overrides the configured target for
+        this request. With ``llm.hedge`` enabled a slow first choice is
+        raced against the other backend (see :meth:`_hedged`).
+        Cancelling ``token`` aborts the request in flight and makes this
+        return an empty string immediately, without trying fallbacks.
+        When the query cache is enabled, a near-duplicate of an earlier
+        prompt (about the same screen) is answered from it.
+        """
+
+        if self.cache is not None:
+            cached = self.cache.get(prompt, image_path)
+            if cached is not None:
+                return cached
+
+        route = self._route(prompt, image_path, latency_target)
+        response, tried = "", []
         try:
-            if mode == "gpt-4o":
-                response = self._call_openai(prompt, image_path)
-            elif mode == "local":
-                response = self._call_local(prompt, image_path)
-            else:  # auto
-                if image_path:
-                    response = self._call_openai(prompt, image_path)
-                else:
-                    response = self._call_local(prompt, image_path)
+            if self._hedge_partner(route) is not None:
+                response, tried = self._hedged(route, prompt, image_path, token)
+            for backend in route:
+                if response:
+                    break
+                if backend in tried:
+                    continue
+                try:
+                    response = self._attempt(backend, prompt, image_path, token)
+                except Cancelled:
+                    raise
+                except Exception:
+                    # fall back to the next backend in the route
+                    continue
+        except Cancelled:
+            return ""
+
+        response = sanitize_text(response)
+        if self.cache is not None and response:
+            self.cache.put(prompt, response, image_path)
+        return response
+
+    def holds_idle_state(self) -> bool:
+        """Whether pooled connections or image buffers could be released."""
+        return self._client_used or bool(self._payloads)
+
+    def payload_bytes(self) -> int:
+        return sum(len(payload[1]) for _, payload in self._payloads.values())
+
+    def release_idle_state(self) -> None:
+        """Drop cached image payloads and close pooled HTTP connections.
+
+        A fresh client is created so the next request simply reconnects.
+        """
+        self._payloads.clear()
+        if self._client_used:
+            old, self.client = self.client, httpx.Client(timeout=30)
+            self._client_used = False
+            old.close()
+
+    def _attempt(
+        self, backend: str, prompt: str, image_path: Optional[str], token: Optional[CancelToken]
+    ) -> str:
+        """:meth:`_call` ``backend`` and record its latency and outcome."""
+        start = time.monotonic()
+        try:
+            response = self._call(backend, prompt, image_path, token)
+        except Cancelled:
+            raise
         except Exception:
-            # fallback to whichever backend was not tried first
+            self.router.record(backend, time.monotonic() - start, False)
+            raise
+        self.router.record(backend, time.monotonic() - start, True)
+        return response
+
+    def _hedge_partner(self, route: List[str]) -> Optional[str]:
+        """Return the target to hedge ``route[0]`` with, if hedging applies.
+
+        Hedging is opt-in (``llm.hedge.enabled``), only used in ``auto``
+        mode and always races a local model against the remote one.
+        """
+        if not self.config.get("hedge", {}).get("enabled", False):
+            return None
+        if self.config.get("mode") != "auto" or not route:
+            return None
+        remote = route[0] == "openai"
+        return next((t for t in route[1:] if (t == "openai") != remote), None)
+
+    def _hedge_delay(self, target: str) -> float:
+        cfg = self.config.get("hedge", {})
+        if cfg.get("delay_s") is not None:
+            return float(cfg["delay_s"])
+        p90 = self.router.latency(target, 0.9)
+        delay = p90 if p90 is not None else cfg.get("default_delay_s", 2.0)
+        return max(delay, cfg.get("min_delay_s", 0.25))
+
+    def _take_hedge_budget(self) -> bool:
+        """Spend one hedge from the budget of ``hedge.budget_pct`` % of requests."""
+        with self._hedge_lock:
+            if self._hedge_credit >= 1.0:
+                self._hedge_credit -= 1.0
+                return True
+            return False
+
+    def _earn_hedge_budget(self) -> None:
+        pct = self.config.get("hedge", {}).get("budget_pct", 10)
+        with self._hedge_lock:
+            self._hedge_credit = min(1.0, self._hedge_credit + pct / 100.0)
+
+    def _hedged(
+        self, route: List[str], prompt: str, image_path: Optional[str], token: Optional[CancelToken]
+    ) -> Tuple[str, List[str]]:
+        """Race ``route[0]`` against a backup started after a delay.
+
+        The first choice gets a head start of ``hedge.delay_s`` (default:
+        its observed p90 latency). If it has not answered by then and the
+        hedge budget allows, the same request goes to the other backend;
+        the first successful answer wins and the slower request is
+        cancelled, which closes its connection. Returns the answer ("" if
+        every started request failed) and the targets that were tried.
+        """
+
+        primary, backup = route[0], self._hedge_partner(route)
+        self._earn_hedge_budget()
+        results: "queue.Queue[Tuple[str, Optional[str]]]" = queue.Queue()
+        legs: Dict[str, CancelToken] = {}
+
+        def run(target: str) -> None:
+            leg = legs[target]
             try:
-                if mode == "local":
-                    response = self._call_openai(prompt, image_path)
-                else:
-                    response = self._call_local(prompt, image_path)
+                results.put((target, self._attempt(target, prompt, image_path, leg)))
             except Exception:
-                response = ""
+                results.put((target, None))
+
+        def start(target: str) -> None:
+            legs[target] = CancelToken()
+            if token is not None:
+                unregister.append(token.on_cancel(legs[target].cancel))
+            threading.Thread(target=run, args=(target,), name=f"lma-hedge-{target}", daemon=True).start()
+
+        unregister: List[Callable[[], None]] = []
+        try:
+            start(primary)
+            pending = 1
+            try:
+                first: Optional[Tuple[str, Optional[str]]] = results.get(timeout=self._hedge_delay(primary))
+            except queue.Empty:
+                first = None
+                if self._take_hedge_budget():
+                    start(backup)
+                    pending += 1
+            while True:
+                if first is None:
+                    first = results.get()
+                target, response = first
+                pending -= 1
+                if response is not None:
+                    for other, leg in legs.items():
+                        if other != target:
+                            leg.cancel()
+                    return response, list(legs)
+                if token is not None:
+                    token.raise_if_cancelled()
+                if not pending:
+                    return "", list(legs)
+                first = None
+        finally:
+            for remove in unregister:
+                remove()
+
+    async def asend_prompt(self, prompt: str, image_path: Optional[str] = None) -> str:
+        """Asynchronous :meth:`send_prompt` sharing routing and sanitization.
+
+        Requests go through a lazily created ``httpx.AsyncClient`` and
+        wait on the per-backend :attr:`rate_limits`, if any.
+        """
+
+        response = ""
+        for backend in self._route(prompt, image_path):
+            start = time.monotonic()
+            try:
+                response = await self._acall(backend, prompt, image_path)
+                self.router.record(backend, time.monotonic() - start, True)
+                break
+            except Exception:
+                self.router.record(backend, time.monotonic() - start, False)
+                continue
 
         return sanitize_text(response)
 
-    # ------------------------------------------------------------------
-    def _call_openai(self, prompt: str, image_path: Optional[str] = None) -> str:
-        headers = {"Authorization": f"Bearer {self.config.get('openai_api_key', '')}"}
+    async def aclose(self) -> None:
+        """Close the asynchronous HTTP client, if one was created."""
+        if self.aclient is not None:
+            await self.aclient.aclose()
+            self.aclient = None
+
+    def _route(
+        self, prompt: str, image_path: Optional[str], latency_target: Optional[float] = None
+    ) -> List[str]:
+        """Return the targets to try, in order, for a request."""
+        return self.router.order(self.config, prompt, image_path, latency_target)
+
+    def preload(self, block: bool = False, with_image: bool = False) -> Optional[threading.Thread]:
+        """Ask the local backend to load the model the next request will use.
+
+        That is the first target :meth:`_route` picks for a short prompt
+        (with an image when ``with_image``): ``fallback_model`` when it
+        leads, else ``primary_local_model``. The request is an empty
+        Ollama generate call carrying ``keep_alive``, which loads the
+        weights without producing tokens. It runs in a daemon thread so
+        the load overlaps with audio capture. Nothing is sent when
+        preloading is disabled, when a remote model would answer first,
+        when the model was used within its ``keep_alive`` window or when
+        a preload is already in flight. Returns the worker thread, if any.
+        """
+
+        if not self.config.get("preload_on_hotkey", True):
+            return None
+        if self._preload_thread is not None and self._preload_thread.is_alive():
+            return self._preload_thread
+        # Only the presence of an image is routed on; the prompt is not known yet.
+        target = self._route("", "<screenshot>" if with_image else None)[0]
+        if target == "openai":
+            return None
+        model = self._local_model(target)
+        last = self._last_local_use.get(model)
+        if self._keep_alive_s and last is not None and time.monotonic() - last < self._keep_alive_s:
+            return None
+
+        thread = threading.Thread(target=self._send_preload, args=(model,), name="lma-preload", daemon=True)
+        self._preload_thread = thread
+        thread.start()
+        if block:
+            thread.join()
+        return thread
+
+    def _send_preload(self, model: str) -> None:
         payload = {
-            "model": "gpt-4o",
-            "messages": [{"role": "user", "content": prompt}],
+            "model": model,
+            "keep_alive": self.keep_alive,
+            **self._local_options(),
         }
-        def make_request(files: Optional[dict]) -> str:
-            for _ in range(self.retries):
-                try:
-                    resp = self.client.post(
-                        "https://api.openai.com/v1/chat/completions",
-                        headers=headers,
-                        json=payload,
-                        files=files,
-                    )
-                    resp.raise_for_status()
-                    data = resp.json()
-                    return data["choices"][0]["message"]["content"]
-                except httpx.HTTPError:
-                    continue
-            raise RuntimeError("OpenAI API request failed")
+        timeout = self.config.get("preload_timeout", 120)
+        try:
+            resp = self.client.post(self._local_generate_url(), json=payload, timeout=timeout)
+            resp.raise_for_status()
+            self._last_local_use[model] = time.monotonic()
+        except Exception as e:
+            # The request itself still works (or reports its own error).
+            self.logger.debug("Preloading %s failed: %s", model, e)
+
+    def _local_model(self, backend: str) -> str:
+        """Return the Ollama model name of the ``local`` or ``fallback`` target."""
+        model_key = "fallback_model" if backend == "fallback" else "primary_local_model"
+        return self.config.get(model_key, "llava")
+
+    @staticmethod
+    def _local_options() -> Dict[str, Any]:
+        # Ollama reloads the model when runner options change, so the
+        # preload must carry the same options as the requests.
+        threads = get_governor().threads("llm")
+        return {"options": {"num_thread": threads}} if threads else {}
 
+    def _local_generate_url(self) -> str:
+        url = self.config.get("local_endpoint", "http://localhost:11434").rstrip("/")
+        if url.endswith("/api/generate"):
+            return url
+        return f"{url}/api/generate"
+
+    # ------------------------------------------------------------------
+    def _request(self, backend: str, prompt: str, image_path: Optional[str]) -> Dict[str, Any]:
+        """Return the ``post`` keyword arguments for a ``backend`` request."""
+        if backend == "openai":
+            request: Dict[str, Any] = {
+                "url": "https://api.openai.com/v1/chat/completions",
+                "headers": {"Authorization": f"Bearer {self.config.get('openai_api_key', '')}"},
+                "json": {
+                    "model": "gpt-4o",
+                    "messages": [{"role": "user", "content": prompt}],
+                },
+            }
+            field = "file"
+        else:
+            request = {
+                "url": self.config.get("local_endpoint", "http://localhost:11434"),
+                "json": {
+                    "model": self._local_model(backend),
+                    "prompt": prompt,
+                    "keep_alive": self.keep_alive,
+                    **self._local_options(),
+                },
+            }
+            field = "image"
         if image_path:
-            with open(image_path, "rb") as fh:
-                return make_request({"file": fh})
-        return make_request(None)
-        raise RuntimeError("OpenAI API request failed")
+            request["files"] = {field: self._image_payload(image_path)}
+        return request
 
-    def _call_local(self, prompt: str, image_path: Optional[str] = None) -> str:
-        url = self.config.get("local_endpoint", "http://localhost:11434")
-        payload = {
-            "model": self.config.get("primary_local_model", "llava"),
-            "prompt": prompt,
-        }
-        def make_request(files: Optional[dict]) -> str:
-            for _ in range(self.retries):
+    def _parse(self, backend: str, data: Dict[str, Any]) -> str:
+        if backend == "openai":
+            return data["choices"][0]["message"]["content"]
+        if backend in ("local", "fallback"):
+            self._last_local_use[self._local_model(backend)] = time.monotonic()
+        return data.get("response", "")
+
+    def _call(
+        self,
+        backend: str,
+        prompt: str,
+        image_path: Optional[str] = None,
+        token: Optional[CancelToken] = None,
+    ) -> str:
+        request = self._request(backend, prompt, image_path)
+        self._client_used = True
+        for _ in range(self.retries):
+            try:
+                if token is None:
+                    resp = self.client.post(**request)
+                else:
+                    resp = self._cancellable_post(request, token)
+                resp.raise_for_status()
+                return self._parse(backend, resp.json())
+            except httpx.HTTPError:
+                continue
+        raise RuntimeError(_FAILURES[backend])
+
+    def _cancellable_post(self, request: Dict[str, Any], token: CancelToken) -> httpx.Response:
+        """POST ``request`` in a helper thread that ``token`` can abort.
+
+        The caller is released as soon as the token is cancelled. The
+        connection's socket is captured when it is opened (or, for a
+        pooled connection, when the response headers arrive) and shut
+        down on cancellation, which also stops the server generating.
+        """
+
+        token.raise_if_cancelled()
+        streams: List[Any] = []
+        result: "Future[httpx.Response]" = Future()
+
+        def trace(event: str, info: Dict[str, Any]) -> None:
+            if event in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+                streams.append(info.get("return_value"))
+                if token.cancelled:
+                    _shutdown_stream(info.get("return_value"))
+
+        def abort() -> None:
+            result.cancel()
+            for stream in list(streams):
+                _shutdown_stream(stream)
+
+        def send() -> None:
+            try:
+                with self.client.stream("POST", extensions={"trace": trace}, **request) as resp:
+                    streams.append(resp.extensions.get("network_stream"))
+                    resp.read()
+                result.set_result(resp)
+            except InvalidStateError:
+                pass  # cancelled while finishing
+            except BaseException as exc:
                 try:
-                    resp = self.client.post(url, json=payload, files=files)
-                    resp.raise_for_status()
-                    data = resp.json()
-                    return data.get("response", "")
-                except httpx.HTTPError:
-                    continue
-            raise RuntimeError("Local LLM request failed")
+                    result.set_exception(exc)
+                except InvalidStateError:
+                    pass
 
-        if image_path:
-            with open(image_path, "rb") as fh:
-                return make_request({"image": fh})
-        return make_request(None)
+        unregister = token.on_cancel(abort)
+        try:
+            threading.Thread(target=send, name="lma-llm-request", daemon=True).start()
+            return result.result()
+        except CancelledError:
+            raise Cancelled() from None
+        finally:
+            unregister()
+
+    async def _acall(self, backend: str, prompt: str, image_path: Optional[str] = None) -> str:
+        request = self._request(backend, prompt, image_path)
+        if self.aclient is None:
+            self.aclient = httpx.AsyncClient(timeout=30)
+        limiter = self.rate_limits.get("local" if backend == "fallback" else backend)
+        for _ in range(self.retries):
+            if limiter is not None:
+                await limiter.acquire()
+            try:
+                resp = await self.aclient.post(**request)
+                resp.raise_for_status()
+                return self._parse(backend, resp.json())
+            except httpx.HTTPError:
+                continue
+        raise RuntimeError(_FAILURES[backend])
+
+    def _image_payload(self, image_path: str) -> Tuple[str, bytes]:
+        """Return the upload tuple for ``image_path``, reusing recent reads.
+
+        Repeated requests about an unchanged screen pass the same path, so
+        the encoded bytes are kept for the last few images and only
+        re-read when the file's modification time changes.
+        """
+
+        mtime = os.stat(image_path).st_mtime_ns
+        cached = self._payloads.get(image_path)
+        if cached and cached[0] == mtime:
+            self._payloads.move_to_end(image_path)
+            return cached[1]
+
+        with open(image_path, "rb") as fh:
+            payload = (os.path.basename(image_path), fh.read())
+        self._payloads[image_path] = (mtime, payload)
+        while len(self._payloads) > self.payload_cache_size:
+            self._payloads.popitem(last=False)
+        return payload
@@ -0,0 +1,232 @@
+"""Idle-time memory management for a long-running assistant.
+
+Subsystems register the resources they keep in memory (transcription
+models, pooled HTTP connections and image buffers, caches) with a
+:class:`MemoryManager` together with a function that releases them and,
+optionally, one that loads them again. A background thread releases a
+resource once it has been idle for its configured period, and releases
+the least recently used resources first while the process is above a
+resident-memory ceiling. When the user starts a new interaction,
+:meth:`MemoryManager.wake` reloads released resources in the background
+so the load overlaps with recording instead of delaying the answer.
+
+Footprints are measured as the change in process RSS around each
+release and reload, which is what :meth:`MemoryManager.report` returns
+per subsystem.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import gc
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from .governor import get_governor
+
+
+def rss_bytes() -> int:
+    """Return the resident set size of this process in bytes (0 if unknown)."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _trim_heap() -> None:
+    """Collect garbage and hand freed heap pages back to the OS (glibc only)."""
+    gc.collect()
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+        libc.malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+@dataclass
+class Resource:
+    """A releasable in-memory resource owned by one subsystem."""
+
+    name: str
+    release: Callable[[], None]
+    reload: Optional[Callable[[], Any]] = None
+    is_loaded: Callable[[], bool] = lambda: True  # replace for anything reloadable
+    size: Optional[Callable[[], int]] = None
+    idle_after: float = 1800.0
+    last_used: float = field(default_factory=time.monotonic)
+    measured: int = 0
+    releases: int = 0
+    released: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class MemoryManager:
+    """Release idle resources and keep the process under a memory ceiling.
+
+    Parameters
+    ----------
+    ceiling_bytes:
+        Resident size above which the least recently used loaded
+        resources are released. ``0`` disables the ceiling.
+    interval:
+        Seconds between background checks.
+    prewarm:
+        Whether :meth:`wake` reloads released resources.
+    """
+
+    def __init__(self, ceiling_bytes: int = 0, interval: float = 60.0, prewarm: bool = True) -> None:
+        self.ceiling_bytes = ceiling_bytes
+        self.interval = interval
+        self.prewarm = prewarm
+        self.resources: Dict[str, Resource] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "MemoryManager":
+        """Build a manager from the ``memory`` section of ``config``."""
+        cfg = config.get("memory", {})
+        return cls(
+            ceiling_bytes=int(cfg.get("ceiling_mb", 0) * 1024 * 1024),
+            interval=cfg.get("interval_s", 60.0),
+            prewarm=cfg.get("prewarm", True),
+        )
+
+    def register(self, name: str, release: Callable[[], None], **kwargs: Any) -> Resource:
+        """Track a resource; ``kwargs`` are :class:`Resource` fields."""
+        resource = Resource(name, release, **kwargs)
+        with self._lock:
+            self.resources[name] = resource
+        return resource
+
+    def touch(self, name: str) -> None:
+        """Mark ``name`` as just used."""
+        with self._lock:
+            resource = self.resources.get(name)
+            if resource is not None:
+                resource.last_used = time.monotonic()
+
+    # ------------------------------------------------------------------
+    def release(self, name: str) -> Optional[int]:
+        """Release ``name`` now and return the RSS it gave back in bytes.
+
+        Returns ``None`` when nothing was released: the resource was not
+        loaded or its release callback failed.
+        """
+        with self._lock:
+            resource = self.resources[name]
+        with resource.lock:
+            if not resource.is_loaded():
+                return None
+            before = rss_bytes()
+            try:
+                resource.release()
+            except Exception:
+                return None
+            _trim_heap()
+            freed = max(0, before - rss_bytes())
+            resource.measured = max(resource.measured, freed)
+            resource.releases += 1
+            resource.released = True
+            return freed
+
+    def sweep(self, now: Optional[float] = None) -> List[str]:
+        """Release idle resources, then enforce the ceiling; return what was released."""
+        now = time.monotonic() if now is None else now
+        released = []
+        with self._lock:
+            resources = list(self.resources.values())
+        for resource in resources:
+            idle = now - resource.last_used
+            if resource.idle_after and idle >= resource.idle_after and resource.is_loaded():
+                if self.release(resource.name) is not None:
+                    released.append(resource.name)
+        if self.ceiling_bytes:
+            loaded = sorted((r for r in resources if r.is_loaded()), key=lambda r: r.last_used)
+            for resource in loaded:
+                if rss_bytes() <= self.ceiling_bytes:
+                    break
+                # A resource that fails to release stays loaded; try the next one.
+                if self.release(resource.name) is not None:
+                    released.append(resource.name)
+        return released
+
+    def wake(self) -> Optional[threading.Thread]:
+        """Reload released resources in a background thread.
+
+        Called when an interaction starts so models are back in memory
+        by the time they are needed. Returns the worker thread, if any.
+        """
+
+        if not self.prewarm:
+            return None
+        with self._lock:
+            pending = [r for r in self.resources.values() if r.reload is not None and r.released]
+        if not pending:
+            return None
+        thread = threading.Thread(target=self._reload, args=(pending,), name="lma-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def _reload(self, resources: List[Resource]) -> None:
+        for resource in resources:
+            with resource.lock:
+                if not resource.released:
+                    continue
+                resource.released = False
+                if resource.is_loaded():
+                    continue  # reloaded on demand already
+                before = rss_bytes()
+                try:
+                    resource.reload()
+                except Exception:
+                    continue
+                resource.measured = max(resource.measured, rss_bytes() - before)
+                resource.last_used = time.monotonic()
+
+    def report(self) -> Dict[str, Any]:
+        """Return process RSS and per-subsystem footprint, in MiB."""
+        now = time.monotonic()
+        mib = 1024.0 * 1024.0
+        with self._lock:
+            subsystems = {}
+            for name, r in self.resources.items():
+                size = r.size() if r.size is not None and r.is_loaded() else None
+                subsystems[name] = {
+                    "loaded": r.is_loaded(),
+                    "idle_s": round(now - r.last_used, 1),
+                    "rss_mb": round(r.measured / mib, 1),
+                    "size_mb": round(size / mib, 2) if size is not None else None,
+                    "releases": r.releases,
+                }
+        return {"rss_mb": round(rss_bytes() / mib, 1), "subsystems": subsystems}
+
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        """Start the background checker thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="lma-memory", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background checker and wait for it to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            get_governor().background()  # garbage collection can stall a request
+            try:
+                self.sweep()
+            except Exception:
+                pass
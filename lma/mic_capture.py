@@ -1,14 +1,34 @@
-"""Microphone audio capture utilities."""
+"""Microphone audio capture utilities.
+
+:func:`record_audio` opens the device for every recording. When
+``audio.resident_mic`` is enabled, :class:`ResidentMic` instead keeps
+an input stream open into a :class:`RingBuffer`, so a recording starts
+without device-open latency and includes a short pre-roll from before
+the hotkey was pressed.
+"""
 
 from __future__ import annotations
 
+import os
 import shutil
 import subprocess
 import tempfile
-from typing import Optional
+import threading
+import wave
+from typing import Any, Dict, Optional
+
+try:  # optional dependency
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None
 
 
-def record_audio(duration: int = 5, samplerate: int = 16000, channels: int = 1) -> Optional[str]:
+def record_audio(
+    duration: int = 5,
+    samplerate: int = 16000,
+    channels: int = 1,
+    path: Optional[str] = None,
+) -> Optional[str]:
     """Record audio from the default microphone.
 
     Parameters
@@ -19,6 +39,8 @@ def record_audio(duration: int = 5, samplerate: int = 16000, channels: int = 1)
         Target sample rate.
     channels:
         Number of audio channels.
+    path:
+        Destination WAV file. A temporary file is created when omitted.
 
     Returns
     -------
@@ -26,7 +48,9 @@ def record_audio(duration: int = 5, samplerate: int = 16000, channels: int = 1)
         Path to the recorded WAV file or ``None`` on failure.
     """
 
-    path = tempfile.mkstemp(suffix=".wav")[1]
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
 
     try:
         import sounddevice as sd  # imported lazily for optional dependency
@@ -81,3 +105,159 @@ def record_audio(duration: int = 5, samplerate: int = 16000, channels: int = 1)
             pass
 
     return None
+
+
+class RingBuffer:
+    """Fixed-size circular buffer of int16 audio frames.
+
+    Frames are addressed by their absolute index since the buffer was
+    created (:attr:`position` is the index of the next frame to be
+    written), so a reader can remember where a recording started and
+    fetch exactly that span later, as long as it has not been
+    overwritten yet.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1) -> None:
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.zeros((capacity, channels), dtype=np.int16)
+        self.position = 0
+        self.cond = threading.Condition()
+
+    def write(self, frames: "np.ndarray") -> None:
+        """Append ``frames`` (shape ``(n, channels)``), overwriting the oldest."""
+        n = len(frames)
+        if n >= self.capacity:
+            frames = frames[-self.capacity :]
+        with self.cond:
+            start = (self.position + n - len(frames)) % self.capacity
+            first = min(len(frames), self.capacity - start)
+            self.data[start : start + first] = frames[:first]
+            self.data[: len(frames) - first] = frames[first:]
+            self.position += n
+            self.cond.notify_all()
+
+    def read(self, start: int, end: int) -> "np.ndarray":
+        """Return frames ``[start, end)``; the oldest still held if ``start`` is too old.
+
+        Only the requested span is copied.
+        """
+        with self.cond:
+            start = max(start, self.position - self.capacity, 0)
+            end = min(end, self.position)
+            if end <= start:
+                return np.zeros((0, self.channels), dtype=np.int16)
+            a, b = start % self.capacity, end % self.capacity
+            if a < b:
+                return self.data[a:b].copy()
+            return np.concatenate([self.data[a:], self.data[:b]])
+
+    def wait_for(self, position: int, timeout: Optional[float] = None) -> bool:
+        """Block until ``position`` frames have been written."""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.position >= position, timeout)
+
+
+class ResidentMic:
+    """Keep the microphone open and serve recordings from a ring buffer.
+
+    Parameters
+    ----------
+    samplerate:
+        Capture rate in Hz.
+    channels:
+        Number of input channels.
+    buffer_seconds:
+        Audio kept in the ring buffer; bounds the pre-roll plus the
+        longest recording.
+    pre_roll_ms:
+        Audio from before :meth:`record` was called that is included
+        at the start of every recording.
+    """
+
+    def __init__(
+        self,
+        samplerate: int = 16000,
+        channels: int = 1,
+        buffer_seconds: float = 30.0,
+        pre_roll_ms: int = 300,
+    ) -> None:
+        self.samplerate = samplerate
+        self.channels = channels
+        self.pre_roll = int(samplerate * pre_roll_ms / 1000)
+        self.ring = RingBuffer(int(samplerate * buffer_seconds), channels)
+        self.stream: Any = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ResidentMic":
+        audio = config.get("audio", {})
+        return cls(
+            samplerate=audio.get("samplerate", 16000),
+            buffer_seconds=audio.get("ring_seconds", 30.0),
+            pre_roll_ms=audio.get("pre_roll_ms", 300),
+        )
+
+    @property
+    def running(self) -> bool:
+        return self.stream is not None
+
+    def start(self) -> bool:
+        """Open the input stream; return ``False`` if no device is usable."""
+        if self.stream is not None:
+            return True
+        if np is None:
+            return False
+        try:
+            import sounddevice as sd  # imported lazily for optional dependency
+
+            stream = sd.InputStream(
+                samplerate=self.samplerate,
+                channels=self.channels,
+                dtype="int16",
+                callback=self._callback,
+            )
+            stream.start()
+        except Exception:
+            return False
+        self.stream = stream
+        return True
+
+    def stop(self) -> None:
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            try:
+                stream.stop()
+                stream.close()
+            except Exception:
+                pass
+
+    def _callback(self, indata: "np.ndarray", frames: int, time_info: Any, status: Any) -> None:
+        self.ring.write(indata)
+
+    def record(self, duration: float = 5, path: Optional[str] = None) -> Optional[str]:
+        """Record ``duration`` seconds of live audio plus the pre-roll.
+
+        Returns the WAV path, or ``None`` if the stream is not running or
+        stalls.
+        """
+
+        if self.stream is None:
+            return None
+        now = self.ring.position
+        start = now - self.pre_roll
+        end = now + int(duration * self.samplerate)
+        # Allow for device latency before declaring the stream stalled.
+        if not self.ring.wait_for(end, timeout=duration + 2.0):
+            return None
+        return self._write(self.ring.read(start, end), path)
+
+    def _write(self, frames: "np.ndarray", path: Optional[str]) -> str:
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(self.channels)
+            wf.setsampwidth(2)
+            wf.setframerate(self.samplerate)
+            wf.writeframes(frames.astype("<i2", copy=False).tobytes())
+        return path
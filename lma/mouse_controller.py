@@ -4,6 +4,9 @@ from __future__ import annotations
 
 import shutil
 import subprocess
+from typing import Optional, Tuple
+
+from .screenshot import virtual_screen
 
 
 def _which(cmd: str) -> bool:
@@ -22,6 +25,53 @@ class MouseController:
         except Exception:  # pragma: no cover - optional dependency
             self.pg = None
 
+    def position(self) -> Optional[Tuple[int, int]]:
+        """Return the current pointer position, if it can be queried."""
+        if self.xdotool:
+            try:
+                out = subprocess.run(
+                    ["xdotool", "getmouselocation", "--shell"],
+                    check=True, capture_output=True, text=True, timeout=2,
+                ).stdout
+                values = dict(line.split("=", 1) for line in out.splitlines() if "=" in line)
+                return int(values["X"]), int(values["Y"])
+            except Exception:
+                pass
+        if self.pg:
+            try:
+                pos = self.pg.position()
+                return int(pos[0]), int(pos[1])
+            except Exception:
+                pass
+        return None
+
+    def screen_bounds(self) -> Tuple[int, int, int, int]:
+        """Return ``(left, top, width, height)`` of the whole desktop.
+
+        Spans all monitors when ``mss`` is available; otherwise the
+        display size reported by ``xdotool`` or ``pyautogui`` is used,
+        falling back to 1920x1080.
+        """
+        screen = virtual_screen()
+        if screen is not None:
+            return screen.left, screen.top, screen.width, screen.height
+        if self.xdotool:
+            try:
+                out = subprocess.run(
+                    ["xdotool", "getdisplaygeometry"],
+                    check=True, capture_output=True, text=True, timeout=2,
+                ).stdout.split()
+                return 0, 0, int(out[0]), int(out[1])
+            except Exception:
+                pass
+        if self.pg:
+            try:
+                width, height = self.pg.size()
+                return 0, 0, int(width), int(height)
+            except Exception:
+                pass
+        return 0, 0, 1920, 1080
+
     def move(self, x: int, y: int) -> None:
         """Move the mouse to the given coordinates."""
         if self.xdotool:
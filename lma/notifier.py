@@ -2,50 +2,238 @@
 
 This module provides functionality for displaying desktop notifications,
 speaking responses via TTS, and showing confirmation dialogs.
+
+Nothing here blocks the caller. Notifications are shown by a
+:class:`NotificationService` thread that holds one D-Bus connection and
+updates a single notification bubble in place (its replaces-id) instead
+of stacking a new one per message; bursts of messages are merged and
+updates are rate-limited. Speech runs on its own worker, errors are
+notifications rather than modal dialogs, and confirmations return a
+:class:`~concurrent.futures.Future` (or can be awaited with
+:meth:`Notifier.aconfirm`).
 """
 
+from __future__ import annotations
+
+import asyncio
+import queue
 import subprocess
 import shutil
-from typing import Optional
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cancel import CancelToken
+from .governor import get_governor
+
+
+class NotificationService:
+    """Show notifications from a background thread, one bubble updated in place.
+
+    Parameters
+    ----------
+    coalesce:
+        Seconds to wait for further messages after the first of a burst;
+        a burst is shown as one update listing its messages.
+    min_interval:
+        Minimum seconds between two updates of the bubble.
+    timeout_ms:
+        How long the bubble stays visible after an update.
+    max_lines:
+        Most recent messages of a burst that are shown.
+    """
+
+    def __init__(
+        self, coalesce: float = 0.25, min_interval: float = 1.0, timeout_ms: int = 5000, max_lines: int = 5
+    ) -> None:
+        self.coalesce = coalesce
+        self.min_interval = min_interval
+        self.timeout_ms = timeout_ms
+        self.max_lines = max_lines
+        self.updates = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, str]]]" = queue.Queue()
+        self._last_shown = 0.0
+        self._bubble: Any = None
+        self._replaces_id: Optional[str] = None
+        self._replace_in_place = True  # notify-send -p/-r, since libnotify 0.7.9
+        self._backend = self._connect()
+        self._thread = threading.Thread(target=self._run, name="lma-notify", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _connect() -> str:
+        try:
+            import notify2
+
+            notify2.init("LMA")  # opens the session bus connection once
+            return "notify2"
+        except Exception:
+            pass
+        return "notify-send" if shutil.which("notify-send") else "print"
+
+    def post(self, message: str, urgency: str = "normal") -> None:
+        """Queue ``message`` for display and return immediately."""
+        self._queue.put((message, urgency))
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Show what is still queued and stop the thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = max(time.monotonic() + self.coalesce, self._last_shown + self.min_interval)
+            stop = False
+            while not stop:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    batch.append(item)
+            try:
+                self._show(batch)
+            except Exception:
+                pass
+            self._last_shown = time.monotonic()
+            if stop:
+                return
+
+    def _show(self, batch: List[Tuple[str, str]]) -> None:
+        messages = list(dict.fromkeys(message for message, _ in batch))[-self.max_lines :]
+        critical = any(urgency == "critical" for _, urgency in batch)
+        summary = "Assistant error" if critical else "Assistant"
+        body = "\n".join(messages)
+        self.updates += 1
+        if self._backend == "notify2":
+            import notify2
+
+            if self._bubble is None:
+                self._bubble = notify2.Notification(summary, body)
+            else:
+                self._bubble.update(summary, body)  # keeps its id, so the bubble is replaced
+            self._bubble.set_urgency(notify2.URGENCY_CRITICAL if critical else notify2.URGENCY_NORMAL)
+            self._bubble.set_timeout(self.timeout_ms)
+            self._bubble.show()
+            return
+        if self._backend == "notify-send":
+            cmd = ["notify-send", "-u", "critical" if critical else "normal", "-t", str(self.timeout_ms)]
+            if self._replace_in_place:
+                replace = ["-p"] + (["-r", self._replaces_id] if self._replaces_id else [])
+                result = subprocess.run(
+                    cmd + replace + ["--", summary, body], capture_output=True, text=True, timeout=5
+                )
+                if result.returncode == 0:
+                    self._replaces_id = result.stdout.strip() or None
+                    return
+                # Too old for -p/-r: stack bubbles instead of updating one
+                self._replace_in_place = False
+                self._replaces_id = None
+            result = subprocess.run(cmd + ["--", summary, body], capture_output=True, text=True, timeout=5)
+            if result.returncode == 0:
+                return
+        print(f"[{summary}] {body}")
 
 
 class Notifier:
     """Display desktop notifications and speak responses."""
 
     def __init__(self, config: dict = None) -> None:
-        self.config = config or {}
+        self.reconfigure(config or {})
+        self._speech: List[subprocess.Popen] = []
+        self._speech_lock = threading.Lock()
+        self._terminal_lock = threading.Lock()
+        self._closed = False
+        self._speaker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lma-tts")
+        self._dialogs = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lma-dialog")
+        cfg = self.config.get("notifications", {})
+        self.service = NotificationService(
+            coalesce=cfg.get("coalesce_ms", 250) / 1000,
+            min_interval=cfg.get("min_interval_ms", 1000) / 1000,
+            timeout_ms=cfg.get("timeout_ms", 5000),
+            max_lines=cfg.get("max_lines", 5),
+        )
+
+    def reconfigure(self, config: dict) -> None:
+        """Apply new TTS and notification settings; the D-Bus connection is kept."""
+        self.config = config
         self.tts_config = self.config.get("tts", {})
-        
-        # Initialize desktop notifications
-        try:
-            import notify2
-            notify2.init("LMA")
-            self.notify_backend = notify2
-        except Exception:
-            self.notify_backend = None
+        service = getattr(self, "service", None)
+        if service is not None:
+            cfg = config.get("notifications", {})
+            service.coalesce = cfg.get("coalesce_ms", 250) / 1000
+            service.min_interval = cfg.get("min_interval_ms", 1000) / 1000
+            service.timeout_ms = cfg.get("timeout_ms", 5000)
+            service.max_lines = cfg.get("max_lines", 5)
+
+    def send(self, message: str, token: Optional[CancelToken] = None) -> "Future[None]":
+        """Send a notification to the user.
+
+        Returns at once. The returned future completes when the message
+        has been spoken (immediately if TTS is off); cancelling ``token``
+        stops the spoken message mid-sentence or drops it if queued.
+        """
+        done: "Future[None]" = Future()
+        if token is not None and token.cancelled:
+            done.set_result(None)
+            return done
 
-    def send(self, message: str) -> None:
-        """Send a notification to the user."""
         # Show desktop notification
-        self._show_notification(message)
-        
+        self.service.post(message)
+
         # Speak response if TTS is enabled
         if self.tts_config.get("enabled", True):
+            return self._speaker.submit(self._speak_unless_cancelled, message, token)
+        done.set_result(None)
+        return done
+
+    def _speak_unless_cancelled(self, message: str, token: Optional[CancelToken]) -> None:
+        if self._closed or (token is not None and token.cancelled):
+            return
+        unregister = token.on_cancel(self.stop_speaking) if token is not None else None
+        try:
             self._speak(message)
+        finally:
+            if unregister is not None:
+                unregister()
 
-    def _show_notification(self, message: str) -> None:
-        """Display a desktop notification."""
-        if self.notify_backend:
+    def stop_speaking(self) -> None:
+        """Kill any running TTS or audio player processes."""
+        with self._speech_lock:
+            procs, self._speech = self._speech, []
+        for proc in procs:
             try:
-                n = self.notify_backend.Notification("Assistant", message)
-                n.set_timeout(3000)
-                n.show()
-                return
-            except Exception:
+                proc.kill()
+            except OSError:
                 pass
-        
-        # Fallback to print
-        print(f"[Assistant] {message}")
+
+    def _track(self, proc: subprocess.Popen) -> subprocess.Popen:
+        get_governor().place(proc.pid, "tts")
+        with self._speech_lock:
+            self._speech.append(proc)
+        return proc
+
+    def _untrack(self, *procs: subprocess.Popen) -> None:
+        with self._speech_lock:
+            self._speech = [p for p in self._speech if p not in procs]
+
+    def close(self) -> None:
+        """Stop speaking and shut the background workers down."""
+        self._closed = True
+        self.stop_speaking()
+        self._speaker.shutdown(wait=False)
+        self._dialogs.shutdown(wait=False)
+        self.service.close()
 
     def _speak(self, text: str) -> None:
         """Speak text using TTS."""
@@ -70,15 +258,28 @@ class Notifier:
             # depending on the specific piper-tts installation
             if shutil.which("piper"):
                 cmd = ["piper", "--model", voice, "--output-raw"]
-                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
-                proc.stdin.write(text.encode())
-                proc.stdin.close()
+                proc = self._track(subprocess.Popen(
+                    cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=get_governor().env("tts")
+                ))
                 
-                # Play the audio output (simplified - you might need aplay/paplay)
-                if shutil.which("aplay"):
-                    subprocess.run(["aplay", "-"], input=proc.stdout.read())
-                elif shutil.which("paplay"):
-                    subprocess.run(["paplay", "-"], input=proc.stdout.read())
+                # Play the audio output (simplified - you might need aplay/paplay).
+                # The player reads piper's stdout directly so it can be killed
+                # mid-sentence.
+                player = None
+                for name in ("aplay", "paplay"):
+                    if shutil.which(name):
+                        player = self._track(subprocess.Popen([name, "-"], stdin=proc.stdout))
+                        break
+                proc.stdout.close()
+                try:
+                    proc.stdin.write(text.encode())
+                    proc.stdin.close()
+                except OSError:
+                    pass  # killed by stop_speaking
+                proc.wait()
+                if player is not None:
+                    player.wait()
+                self._untrack(proc, player)
                 
                 return True
         except Exception:
@@ -90,48 +291,76 @@ class Notifier:
         """Speak using espeak as fallback."""
         if shutil.which("espeak"):
             try:
-                subprocess.run(["espeak", text], check=True, 
-                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                proc = self._track(subprocess.Popen(
+                    ["espeak", text], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                    env=get_governor().env("tts"),
+                ))
+                proc.wait()
+                self._untrack(proc)
             except Exception:
                 pass
 
     def confirm(self, message: str, title: str = "Confirmation") -> bool:
-        """Show a confirmation dialog."""
+        """Show a confirmation dialog and wait for the answer."""
+        return self.confirm_async(message, title).result()
+
+    def confirm_async(
+        self, message: str, title: str = "Confirmation", token: Optional[CancelToken] = None
+    ) -> "Future[bool]":
+        """Show a confirmation dialog without waiting for the answer.
+
+        The future resolves to the user's choice. Cancelling ``token``
+        closes the dialog and resolves it to ``False``.
+        """
+        return self._dialogs.submit(self._ask, message, title, token)
+
+    async def aconfirm(
+        self, message: str, title: str = "Confirmation", token: Optional[CancelToken] = None
+    ) -> bool:
+        """Awaitable form of :meth:`confirm_async`."""
+        return await asyncio.wrap_future(self.confirm_async(message, title, token))
+
+    def _ask(self, message: str, title: str, token: Optional[CancelToken]) -> bool:
+        if token is None:
+            return self._ask_user(message, title, None)
+        with token.user_wait():
+            return self._ask_user(message, title, token)
+
+    def _ask_user(self, message: str, title: str, token: Optional[CancelToken]) -> bool:
+        if token is not None and token.cancelled:
+            return False
         if shutil.which("zenity"):
             try:
-                result = subprocess.run([
-                    "zenity", "--question", 
+                proc = subprocess.Popen([
+                    "zenity", "--question",
                     "--title", title,
                     "--text", message,
                     "--width", "400"
-                ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                return result.returncode == 0
-            except subprocess.CalledProcessError:
+                ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except OSError:
                 return False
-        
-        # Fallback to terminal prompt
-        try:
-            response = input(f"{title}: {message} (y/N): ").strip().lower()
-            return response in ['y', 'yes']
-        except (EOFError, KeyboardInterrupt):
-            return False
+            unregister = token.on_cancel(proc.kill) if token is not None else None
+            try:
+                return proc.wait() == 0 and not (token is not None and token.cancelled)
+            finally:
+                if unregister is not None:
+                    unregister()
 
-    def error(self, message: str) -> None:
-        """Show an error dialog."""
-        if shutil.which("zenity"):
+        # Fallback to terminal prompt, one question at a time
+        with self._terminal_lock:
             try:
-                subprocess.run([
-                    "zenity", "--error",
-                    "--title", "Error",
-                    "--text", message,
-                    "--width", "400"
-                ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                return
-            except Exception:
-                pass
-        
-        # Fallback to notification
-        self._show_notification(f"Error: {message}")
+                response = input(f"{title}: {message} (y/N): ").strip().lower()
+                return response in ['y', 'yes']
+            except (EOFError, KeyboardInterrupt):
+                return False
+
+    def show(self, message: str) -> None:
+        """Show a desktop notification without speaking it."""
+        self.service.post(message)
+
+    def error(self, message: str) -> None:
+        """Show an error notification without waiting for the user."""
+        self.service.post(f"Error: {message}", urgency="critical")
 
     def input_dialog(self, prompt: str, title: str = "Input") -> Optional[str]:
         """Show an input dialog."""
@@ -0,0 +1,211 @@
+"""Compiled shell command policy.
+
+:class:`CommandPolicy` is built once from the ``security`` config
+section and decides whether a candidate command line may run, needs
+confirmation or must be rejected. Candidates are tokenized with
+:mod:`shlex` and split on ``|``, ``&&``, ``||``, ``;`` and ``&`` so that
+every command in a pipeline or chain is vetted, not just the first
+word. Multi-line candidates and unquoted ``$`` expansions are rejected
+outright, since the shell would run or expand text the rules never
+saw. Allowed commands are stored in a token trie, which lets entries
+such as ``"git status"`` allow a subcommand without allowing ``git``.
+Verdicts are memoized, so re-vetting repeated lines of a long response
+is a dictionary lookup.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import re
+import shlex
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+ALLOW = "allow"
+CONFIRM = "confirm"
+DENY = "deny"
+
+_SEPARATORS = {"|", "||", "&&", ";", "&", ";;", "|&"}
+_REDIRECTS = {">", ">>", "&>", ">&", ">|"}
+_SUBSTITUTION = re.compile(r"`|\$\(|<\(|>\(")
+_ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+
+def _expands(command: str) -> bool:
+    """Whether ``command`` has a ``$`` the shell would expand.
+
+    Only single quotes and a backslash outside them keep ``$`` literal.
+    """
+    quoted = escaped = False
+    for ch in command:
+        if escaped:
+            escaped = False
+        elif quoted:
+            quoted = ch != "'"
+        elif ch == "\\":
+            escaped = True
+        elif ch == "'":
+            quoted = True
+        elif ch == "$":
+            return True
+    return False
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """Decision for one candidate command line."""
+
+    action: str
+    reason: str = ""
+
+    @property
+    def allowed(self) -> bool:
+        return self.action != DENY
+
+
+def _compile_patterns(patterns: Iterable[str]) -> Optional[Pattern[str]]:
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(p)})" for p in patterns))
+
+
+class _Trie:
+    """Token trie mapping command prefixes such as ``git status``."""
+
+    _END = object()
+
+    def __init__(self, entries: Iterable[str]) -> None:
+        self.root: Dict[Any, Any] = {}
+        self.first_tokens = set()
+        for entry in entries:
+            tokens = entry.split()
+            if not tokens:
+                continue
+            self.first_tokens.add(tokens[0])
+            node = self.root
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[self._END] = entry
+
+    def longest_match(self, tokens: List[str]) -> Optional[str]:
+        node, match = self.root, None
+        for token in tokens:
+            node = node.get(token)
+            if node is None:
+                break
+            match = node.get(self._END, match)
+        return match
+
+
+class CommandPolicy:
+    """Allow/confirm/deny decisions compiled from the ``security`` config.
+
+    Recognized keys are ``allow_commands`` and ``confirm_required``
+    (command names or multi-word prefixes), ``deny_commands`` and
+    ``argument_rules``, which maps a command to ``deny_args`` and
+    ``confirm_args`` lists of glob patterns matched against each
+    argument. A command line runs only if every command in it is
+    allowed; it needs confirmation if any command or argument word is
+    in ``confirm_required``, matches a ``confirm_args`` rule or the line
+    redirects output to a file.
+    """
+
+    def __init__(self, security: Dict[str, Any], cache_size: int = 1024) -> None:
+        self.allow = _Trie(security.get("allow_commands", []))
+        self.confirm_words = frozenset(security.get("confirm_required", []))
+        self.deny_words = frozenset(security.get("deny_commands", []))
+        self.arg_rules: Dict[str, Tuple[Optional[Pattern[str]], Optional[Pattern[str]]]] = {
+            name: (_compile_patterns(rule.get("deny_args", [])), _compile_patterns(rule.get("confirm_args", [])))
+            for name, rule in security.get("argument_rules", {}).items()
+        }
+        self.known_first = self.allow.first_tokens | self.confirm_words
+        self.check = lru_cache(maxsize=cache_size)(self._check)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CommandPolicy":
+        security = config.get("security", {})
+        return cls(security, security.get("policy_cache_size", 1024))
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def split(command: str) -> List[List[str]]:
+        """Tokenize ``command`` and split it into simple commands.
+
+        Raises ``ValueError`` for unbalanced quotes.
+        """
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=";&|<>")
+        lexer.whitespace_split = True
+        lexer.commenters = ""
+        segments: List[List[str]] = [[]]
+        for token in lexer:
+            if token in _SEPARATORS:
+                segments.append([])
+            else:
+                segments[-1].append(token)
+        return [seg for seg in segments if seg]
+
+    def _check(self, command: str) -> Verdict:
+        command = command.strip()
+        if not command:
+            return Verdict(DENY, "empty")
+        if "\n" in command or "\r" in command:
+            return Verdict(DENY, "multi-line command")
+
+        # Fast path: prose lines in a response start with an unknown word.
+        first = command.split(None, 1)[0]
+        if first not in self.known_first and not _ASSIGNMENT.match(first):
+            return Verdict(DENY, f"{first} is not an allowed command")
+        if _SUBSTITUTION.search(command):
+            return Verdict(DENY, "command substitution")
+        if _expands(command):
+            return Verdict(DENY, "parameter expansion")
+
+        try:
+            segments = self.split(command)
+        except ValueError:
+            return Verdict(DENY, "unparsable")
+
+        needs_confirm = ""
+        for tokens in segments:
+            verdict = self._check_segment(tokens)
+            if verdict.action == DENY:
+                return verdict
+            if verdict.action == CONFIRM and not needs_confirm:
+                needs_confirm = verdict.reason
+
+        if needs_confirm:
+            return Verdict(CONFIRM, needs_confirm)
+        return Verdict(ALLOW)
+
+    def _check_segment(self, tokens: List[str]) -> Verdict:
+        if _ASSIGNMENT.match(tokens[0]):
+            return Verdict(DENY, "environment assignment")
+
+        name = tokens[0]
+        if name in self.deny_words:
+            return Verdict(DENY, f"{name} is denied")
+        if self.allow.longest_match(tokens) is None:
+            return Verdict(DENY, f"{name} is not an allowed command")
+
+        reason = ""
+        deny_args, confirm_args = self.arg_rules.get(name, (None, None))
+        for token in tokens[1:]:
+            if deny_args is not None and deny_args.match(token):
+                return Verdict(DENY, f"argument {token} not allowed for {name}")
+            if token in self.deny_words:
+                return Verdict(DENY, f"{token} is denied")
+            if not reason:
+                if token in _REDIRECTS:
+                    reason = "writes to a file"
+                elif confirm_args is not None and confirm_args.match(token):
+                    reason = f"argument {token} of {name}"
+                elif token in self.confirm_words:
+                    reason = f"uses {token}"
+
+        if name in self.confirm_words:
+            return Verdict(CONFIRM, f"{name} requires confirmation")
+        if reason:
+            return Verdict(CONFIRM, reason)
+        return Verdict(ALLOW)
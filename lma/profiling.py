@@ -0,0 +1,220 @@
+"""On-demand profiling of hotkey interactions.
+
+A running assistant can be told to profile its next few interactions,
+either by setting ``profiling.interactions`` in ``config.json`` (picked
+up by the config watcher) or by sending it ``SIGUSR1``. For each
+profiled interaction a directory is written with
+
+* ``profile.pstats``: cProfile statistics of the interaction thread,
+  readable by :mod:`pstats` and ``snakeviz``, plus a ``profile.txt``
+  summary sorted by cumulative time;
+* ``memory.txt``: the top allocating lines after the interaction and
+  the difference from before it (tracemalloc), with the raw snapshot in
+  ``memory.tracemalloc`` for :meth:`tracemalloc.Snapshot.load`;
+* ``stacks.folded``: stacks of every thread sampled during the
+  interaction, in the folded format flame graph tools read, so time
+  spent in helper threads (HTTP, TTS, commands) is visible too;
+* ``summary.json``: wall and CPU time and peak traced memory.
+
+Nothing is measured while no interactions are pending.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from .utils import cache_dir
+
+
+class StackSampler:
+    """Sample the stacks of all threads at a fixed interval.
+
+    Parameters
+    ----------
+    interval:
+        Seconds between samples.
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lma-stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Samples as ``frame;frame;frame count`` lines."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class InteractionProfiler:
+    """Profile the next N interactions and write their dumps.
+
+    Parameters
+    ----------
+    directory:
+        Where one sub-directory per profiled interaction is written.
+    top:
+        Lines kept in the text summaries.
+    sample_interval:
+        Seconds between thread stack samples.
+    trace_frames:
+        Frames tracemalloc keeps per allocation.
+    """
+
+    def __init__(
+        self, directory: Path, top: int = 30, sample_interval: float = 0.01, trace_frames: int = 10
+    ) -> None:
+        self.directory = Path(directory)
+        self.top = top
+        self.sample_interval = sample_interval
+        self.trace_frames = trace_frames
+        self.signal_count = 1
+        self.pending = 0
+        self._requested = 0
+        self._lock = threading.Lock()
+        self._active = False
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "InteractionProfiler":
+        """Build a profiler from the ``profiling`` section of ``config``."""
+        profiler = cls(cache_dir() / "profiles")
+        profiler.reconfigure(config)
+        return profiler
+
+    def reconfigure(self, config: Dict[str, Any]) -> None:
+        """Apply the ``profiling`` section.
+
+        ``interactions`` arms that many interactions when it changes, so
+        editing it in a running assistant starts profiling (editing
+        other keys does not); ``signal_interactions`` is how many
+        ``SIGUSR1`` arms.
+        """
+        cfg = config.get("profiling", {})
+        self.directory = Path(cfg.get("dir") or cache_dir() / "profiles")
+        self.top = cfg.get("top", 30)
+        self.sample_interval = cfg.get("sample_interval_ms", 10) / 1000
+        self.signal_count = cfg.get("signal_interactions", 1)
+        requested = cfg.get("interactions", 0)
+        if requested != self._requested:
+            self._requested = requested
+            self.arm(requested)
+
+    def arm(self, count: int) -> None:
+        """Profile the next ``count`` interactions (in addition to pending ones)."""
+        with self._lock:
+            self.pending += max(0, count)
+
+    def _claim(self) -> bool:
+        # tracemalloc is process-wide, so one interaction is profiled at a time.
+        with self._lock:
+            if self.pending <= 0 or self._active:
+                return False
+            self.pending -= 1
+            self._active = True
+            return True
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[Optional[Path]]:
+        """Profile the enclosed interaction if one is pending.
+
+        Yields the dump directory (written on exit), or ``None`` when
+        this interaction is not profiled.
+        """
+        if not self._claim():
+            yield None
+            return
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        out = self.directory / f"profile_{stamp}_{name}"
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.trace_frames)
+        if hasattr(tracemalloc, "reset_peak"):  # Python 3.9+
+            tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        sampler = StackSampler(self.sample_interval)
+        profiler = cProfile.Profile()
+        wall, cpu = time.perf_counter(), time.process_time()
+        sampler.start()
+        profiler.enable()
+        try:
+            yield out
+        finally:
+            try:
+                profiler.disable()
+                sampler.stop()
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                summary = {"wall_s": wall, "cpu_s": cpu, "peak_bytes": peak}
+                self._write(out, profiler, before, after, sampler, summary)
+            except Exception:
+                pass  # a failed dump must not break the interaction
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+                with self._lock:
+                    self._active = False
+
+    def _write(
+        self,
+        out: Path,
+        profiler: cProfile.Profile,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        sampler: StackSampler,
+        summary: Dict[str, Any],
+    ) -> None:
+        out.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(out / "profile.pstats"))
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(self.top)
+        (out / "profile.txt").write_text(text.getvalue(), encoding="utf-8")
+
+        # The tracer's own frames would dominate the statistics.
+        ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+        after.dump(str(out / "memory.tracemalloc"))
+        lines = ["Top allocations after the interaction:"]
+        lines += [str(stat) for stat in after.statistics("lineno")[: self.top]]
+        lines += ["", "Change from before the interaction:"]
+        lines += [str(stat) for stat in after.compare_to(before, "lineno")[: self.top]]
+        (out / "memory.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        (out / "stacks.folded").write_text(sampler.folded(), encoding="utf-8")
+        summary["stack_samples"] = sum(sampler.samples.values())
+        (out / "summary.json").write_text(json.dumps(summary, indent=1), encoding="utf-8")
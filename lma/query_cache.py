@@ -0,0 +1,337 @@
+"""Near-duplicate cache for LLM answers.
+
+Spoken questions are rarely repeated word for word ("what's on my
+screen" vs "what is on the screen"), so raw exact-match caching almost
+never hits. :class:`QueryCache` normalizes each prompt, takes a MinHash
+signature of its character trigrams and indexes it with
+locality-sensitive hashing (LSH). By default a lookup only returns an
+answer whose normalized prompt is identical; with ``match="similar"``
+it also accepts an estimated Jaccard similarity of ``threshold``. In
+both modes the numbers and paths in the two prompts must be the same
+("12 times 14" is not "12 times 13"), and for image requests the
+screenshot's dHash must be within a few bits of the cached one.
+
+Answers that click, move the mouse, type, press keys or contain shell
+commands the policy would run are never cached, since replaying them
+would act on the screen or the system.
+Everything runs locally on NumPy; the index is bounded, expires old
+answers and is persisted between runs as JSON readable only by the user
+(prompts include clipboard contents).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+try:  # optional dependency
+    import numpy as np
+except Exception:  # pragma: no cover
+    np = None
+
+from .policy import DENY, CommandPolicy
+from .screenshot import hamming_distance, image_hash
+from .security import extract_commands, has_automation
+from .utils import cache_dir
+
+_PRIME = (1 << 61) - 1
+_CONTRACTIONS = {
+    "what's": "what is",
+    "where's": "where is",
+    "who's": "who is",
+    "how's": "how is",
+    "it's": "it is",
+    "that's": "that is",
+    "there's": "there is",
+    "can't": "cannot",
+    "don't": "do not",
+    "doesn't": "does not",
+    "isn't": "is not",
+    "i'm": "i am",
+}
+# Words that change the phrasing of a request but not what is asked.
+_FILLER = {"a", "an", "the", "my", "please", "can", "could", "would", "you", "me", "just"}
+_WORD = re.compile(r"[a-z0-9']+")
+# Tokens with digits or path characters; these must match exactly.
+_ANCHOR = re.compile(r"\S*[0-9/.~_\\-]\S*")
+# Command syntax the shell would run even on a line the policy denies.
+_SHELL_SYNTAX = re.compile(r"`|\$\(|^\s*\$\s", re.MULTILINE)
+MATCH_MODES = ("exact", "similar")
+
+
+def normalize(text: str) -> str:
+    """Lower-case ``text``, expand contractions and drop filler words."""
+    words = []
+    for word in _WORD.findall(text.lower()):
+        word = _CONTRACTIONS.get(word, word).replace("'", "")
+        words.extend(w for w in word.split() if w not in _FILLER)
+    return " ".join(words)
+
+
+def anchors(text: str) -> FrozenSet[str]:
+    """Return the numbers and paths in ``text``."""
+    tokens = (t.strip(".,;:!?\"'()") for t in _ANCHOR.findall(text.lower()))
+    return frozenset(t for t in tokens if t)
+
+
+def actionable(response: str, policy: Optional[CommandPolicy] = None) -> bool:
+    """Whether the assistant would act on ``response`` when it is replayed.
+
+    That is the automation phrases of
+    :meth:`lma.assistant.Assistant._handle_automation_commands`, shell
+    syntax, and, given the ``policy``, any line of
+    :func:`lma.security.extract_commands` it would not deny.
+    """
+    if _SHELL_SYNTAX.search(response) or has_automation(response):
+        return True
+    if policy is None:
+        return False
+    return any(policy.check(cmd).action != DENY for cmd in extract_commands(response))
+
+
+@dataclass
+class CacheEntry:
+    """A cached answer and the signature of the prompt it answered."""
+
+    prompt: str
+    response: str
+    signature: "np.ndarray"
+    image: Optional[int]
+    created: float
+
+
+class QueryCache:
+    """Bounded MinHash/LSH index from prompts to LLM responses.
+
+    Parameters
+    ----------
+    match:
+        ``"exact"`` returns only answers to the same normalized prompt;
+        ``"similar"`` also accepts near-duplicates.
+    threshold:
+        With ``match="similar"``, the minimum estimated Jaccard
+        similarity of the normalized prompts' character trigrams.
+    max_entries:
+        Entries kept; the least recently used are evicted first.
+    ttl:
+        Seconds an answer stays valid.
+    image_distance:
+        Maximum dHash distance between the screenshots of two image
+        requests for them to be considered the same screen.
+    path:
+        JSON file the index is persisted to; ``None`` keeps it in memory.
+    num_perm, bands:
+        MinHash signature length and number of LSH bands. More bands
+        find more candidates at a lower similarity.
+    policy:
+        Command policy of the assistant; answers with a command it would
+        run or confirm are not stored (see :func:`actionable`).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        max_entries: int = 256,
+        ttl: float = 3600.0,
+        image_distance: int = 4,
+        path: Optional[Path] = None,
+        num_perm: int = 64,
+        bands: int = 16,
+        match: str = "exact",
+        policy: Optional[CommandPolicy] = None,
+    ) -> None:
+        self.match = match if match in MATCH_MODES else "exact"
+        self.policy = policy
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.image_distance = image_distance
+        self.path = Path(path) if path else None
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(0x4C4D41)
+        # a, b < 2**32 so that a * h + b never overflows uint64 for 32-bit h
+        self._a = rng.integers(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self.entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self.buckets: Dict[Tuple[int, bytes], Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self._last_image: Tuple[Optional[Tuple[str, int]], Optional[int]] = (None, None)
+        self._load_lock = threading.Lock()
+        self.loaded = False
+        self.load()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["QueryCache"]:
+        """Build the cache from the ``query_cache`` section, or ``None`` if disabled."""
+        cfg = config.get("query_cache", {})
+        if not cfg.get("enabled", False) or np is None:
+            return None
+        return cls(
+            threshold=cfg.get("threshold", 0.8),
+            max_entries=cfg.get("max_entries", 256),
+            ttl=cfg.get("ttl_s", 3600.0),
+            image_distance=cfg.get("image_distance", 4),
+            path=cfg.get("path") or cache_dir() / "query_cache.json",
+            match=cfg.get("match", "exact"),
+            policy=CommandPolicy.from_config(config),
+        )
+
+    # ------------------------------------------------------------------
+    def signature(self, text: str) -> "np.ndarray":
+        """Return the MinHash signature of ``text``'s normalized trigrams."""
+        norm = normalize(text)
+        padded = f" {norm} "
+        shingles = {padded[i : i + 3] for i in range(max(1, len(padded) - 2))}
+        hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1)
+
+    def _band_keys(self, sig: "np.ndarray") -> List[Tuple[int, bytes]]:
+        return [(i, sig[i * self.rows : (i + 1) * self.rows].tobytes()) for i in range(self.bands)]
+
+    def _image_hash(self, path: str) -> Optional[int]:
+        # get() and put() see the same screenshot; hash it only once.
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            return None
+        if self._last_image[0] != key:
+            self._last_image = (key, image_hash(path))
+        return self._last_image[1]
+
+    def get(self, prompt: str, image_path: Optional[str] = None) -> Optional[str]:
+        """Return a cached response for (a near-duplicate of) ``prompt``."""
+        image = self._image_hash(image_path) if image_path else None
+        if image_path and image is None:
+            return None
+        self.load()
+        sig = self.signature(prompt)
+        norm, keys = normalize(prompt), anchors(prompt)
+        now = time.time()
+        with self._lock:
+            candidates: Set[int] = set()
+            for key in self._band_keys(sig):
+                candidates |= self.buckets.get(key, set())
+            best, best_score = None, self.threshold
+            for entry_id in candidates:
+                entry = self.entries[entry_id]
+                if now - entry.created > self.ttl:
+                    self._remove(entry_id)
+                    continue
+                if not self._same_screen(image, entry.image) or anchors(entry.prompt) != keys:
+                    continue
+                if self.match == "exact" and normalize(entry.prompt) != norm:
+                    continue
+                score = float(np.mean(entry.signature == sig))
+                if score >= best_score:
+                    best, best_score = entry_id, score
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(best)
+            return self.entries[best].response
+
+    def put(self, prompt: str, response: str, image_path: Optional[str] = None) -> None:
+        """Store ``response`` as the answer to ``prompt`` (and screenshot)."""
+        image = self._image_hash(image_path) if image_path else None
+        if not response or actionable(response, self.policy) or (image_path and image is None):
+            return
+        self.load()  # save() must not drop entries released to disk
+        self._insert(CacheEntry(prompt, response, self.signature(prompt), image, time.time()))
+        self.save()
+
+    def _same_screen(self, a: Optional[int], b: Optional[int]) -> bool:
+        if a is None or b is None:
+            return a is b
+        return hamming_distance(a, b) <= self.image_distance
+
+    def _insert(self, entry: CacheEntry) -> None:
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self.entries[entry_id] = entry
+            for key in self._band_keys(entry.signature):
+                self.buckets.setdefault(key, set()).add(entry_id)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self.entries.pop(entry_id)
+        for key in self._band_keys(entry.signature):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def clear(self) -> None:
+        """Drop the in-memory index; it is read back from disk on next use."""
+        with self._load_lock, self._lock:
+            self.entries.clear()
+            self.buckets.clear()
+            self.loaded = self.path is None
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the index."""
+        with self._lock:
+            return sum(
+                len(e.prompt) + len(e.response) + e.signature.nbytes for e in self.entries.values()
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+    # ------------------------------------------------------------------
+    def load(self) -> None:
+        """Read the index from :attr:`path` unless it is already in memory."""
+        with self._load_lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            if self.path is None:
+                return
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                return
+            now = time.time()
+            with self._lock:
+                seen = {(e.prompt, e.image) for e in self.entries.values()}
+            for item in data.get("entries", []):
+                key = (item["prompt"], item.get("image"))
+                if now - item.get("created", 0) > self.ttl or key in seen:
+                    continue
+                seen.add(key)
+                sig = self.signature(item["prompt"])
+                self._insert(CacheEntry(item["prompt"], item["response"], sig, item.get("image"), item["created"]))
+
+    def save(self) -> None:
+        """Atomically write the index to :attr:`path`."""
+        if self.path is None:
+            return
+        with self._lock:
+            items = [
+                {"prompt": e.prompt, "response": e.response, "image": e.image, "created": e.created}
+                for e in self.entries.values()
+            ]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                os.fchmod(fh.fileno(), 0o600)  # an older tmp file may exist
+                json.dump({"entries": items}, fh)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
@@ -0,0 +1,341 @@
+"""Replay of recorded interaction traces.
+
+Each archive written by :class:`lma.trace.TraceRecorder` is fed back
+through the real :class:`~lma.assistant.Assistant` pipeline. The
+recorded audio is preprocessed and transcribed again, the prompt is
+rebuilt and the response is acted on, but every device is stubbed.
+The screenshot, clipboard and microphone come from the archive; mouse,
+keyboard, notifications and shell commands are not executed, and
+confirmation dialogs get the answers the user gave originally. The LLM
+is either the recorded response (deterministic, the default) or a live
+backend such as a local model.
+
+For every trace the outputs (transcript, prompt, response, actions) and
+per-stage timings are compared with the recording, which turns a
+directory of traces into a regression corpus for real workloads.
+"""
+
+from __future__ import annotations
+
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from .assistant import Assistant
+from .config import Config
+from .executor import CommandResult
+from .llm_client import LLMClient
+from .screenshot import Capture, Region
+from .trace import TraceRecorder, find_archives, read_archive
+
+HANDLERS = {
+    "multimodal": "handle_multimodal_input",
+    "voice": "handle_voice_only",
+    "text_selection": "handle_text_selection",
+}
+COMPARED = ("transcript", "prompt", "response", "final", "actions")
+
+
+class RecordedLLM(LLMClient):
+    """LLM client answering with the response stored in the current trace."""
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        super().__init__(config)
+        self.recorded: Dict[str, Any] = {}
+
+    def send_prompt(self, prompt: str, image_path: Optional[str] = None, **kwargs: Any) -> str:
+        return self.recorded.get("response", "")
+
+    def preload(self, block: bool = False, with_image: bool = False) -> None:
+        return None
+
+
+def _done(value: Any) -> Future:
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
+class _Devices:
+    """Stand-ins for the notifier, mouse, keyboard and executor."""
+
+    def __init__(self) -> None:
+        self.recorded = {}
+
+    @property
+    def recorded(self) -> Dict[str, Any]:
+        return self._recorded
+
+    @recorded.setter
+    def recorded(self, recorded: Dict[str, Any]) -> None:
+        # Each recorded answer is given once, in the order it was asked
+        self._recorded = recorded
+        self._confirms = [a for a in recorded.get("actions", []) if a["type"] == "confirm"]
+
+    # Notifier
+    def send(self, message: str, token: Any = None) -> "Future[None]":
+        return _done(None)
+
+    def show(self, message: str) -> None:
+        pass
+
+    def error(self, message: str) -> None:
+        pass
+
+    def confirm_async(self, message: str, title: str = "Confirmation", token: Any = None) -> "Future[bool]":
+        for i, action in enumerate(self._confirms):
+            if message == f"Execute command: {action['command']}?":
+                del self._confirms[i]
+                return _done(action["approved"])
+        return _done(False)
+
+    def stop_speaking(self) -> None:
+        pass
+
+    def reconfigure(self, config: Dict[str, Any]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    # Mouse and keyboard
+    def position(self) -> Optional[Tuple[int, int]]:
+        return None
+
+    def screen_bounds(self) -> Tuple[int, int, int, int]:
+        return tuple(self.recorded.get("screen_bounds") or (0, 0, 1920, 1080))
+
+    def move(self, x: int, y: int) -> None:
+        pass
+
+    def click(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def type_text(self, text: str) -> None:
+        pass
+
+    def send_hotkey(self, *keys: str) -> None:
+        pass
+
+    # Executor
+    def submit(self, command: str, token: Any = None) -> "Future[CommandResult]":
+        return _done(CommandResult(command, 0, ""))
+
+    def submit_sequence(self, commands: List[str], token: Any = None) -> "Future[List[CommandResult]]":
+        return _done([CommandResult(command, 0, "") for command in commands])
+
+    def shutdown(self, wait: bool = False) -> None:
+        pass
+
+
+class ReplayAssistant(Assistant):
+    """Assistant whose inputs come from a trace and whose outputs go nowhere.
+
+    Parameters
+    ----------
+    config:
+        Configuration to replay with. Background services (janitor,
+        memory manager, resident microphone, trace recording, answer
+        cache) are switched off and artifacts go to a scratch directory.
+    llm:
+        ``"recorded"`` answers with the traced response; ``"live"``
+        uses the configured backends and ``"local"`` forces the local
+        model.
+    recorded_transcript:
+        Skip transcription and use the traced transcript.
+    """
+
+    def __init__(self, config: Dict[str, Any], llm: str = "recorded", recorded_transcript: bool = False) -> None:
+        self.workdir = tempfile.mkdtemp(prefix="lma-replay-")
+        super().__init__(config=Config(_replay_config(config, self.workdir, llm)))
+        self.recorded_transcript = recorded_transcript
+        self.executor.shutdown()
+        self.notifier.close()
+        self.devices = _Devices()
+        self.notifier = self.mouse = self.keyboard = self.executor = self.devices
+        if llm == "recorded":
+            self.llm = RecordedLLM(self.config)
+        self.tracer = TraceRecorder()
+        self.recorded: Dict[str, Any] = {}
+
+    def replay(self, archive: str) -> Dict[str, Any]:
+        """Replay one archive and return its comparison record."""
+        scratch = tempfile.mkdtemp(dir=self.workdir)
+        try:
+            self.recorded = read_archive(archive, extract_to=scratch)
+            self.devices.recorded = self.recorded
+            if isinstance(self.llm, RecordedLLM):
+                self.llm.recorded = self.recorded
+            self.screens = type(self.screens).from_config(self.config)
+            kind = self.recorded.get("kind")
+            if kind not in HANDLERS:
+                return {"trace": archive, "error": f"unknown trace kind {kind!r}"}
+            getattr(self, HANDLERS[kind])()
+            return compare(archive, self.recorded, self.tracer.last.data)
+        except Exception as exc:
+            return {"trace": archive, "error": str(exc) or type(exc).__name__}
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    def close(self) -> None:
+        super().close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    # Stubbed inputs ---------------------------------------------------
+    def _recorded_file(self, prefix: str) -> Optional[str]:
+        for name, path in self.recorded.get("paths", {}).items():
+            if name.startswith(prefix):
+                return path
+        return None
+
+    def _capture_screen(self) -> Optional[Capture]:
+        path = self._recorded_file("screenshot")
+        if path is None:
+            return None
+        region = self.recorded.get("region")
+        on_screen = self.recorded.get("image_source") != "clipboard"
+        return Capture(path, Region(**region) if region else None, on_screen)
+
+    def _clipboard_image_digest(self) -> Optional[str]:
+        return None
+
+    def _clipboard_image(self) -> Optional[Capture]:
+        return None  # a traced clipboard image is the traced screenshot
+
+    def _read_clipboard(self, selection: str = "clipboard") -> Optional[str]:
+        clip = self.recorded.get("clipboard")
+        self._note("clipboard", clip)
+        return clip
+
+    def _record_audio_to(self, path: str) -> Optional[str]:
+        source = self._recorded_file("audio")
+        if source is None:
+            return None
+        shutil.copyfile(source, path)
+        return path
+
+    def _transcribe_file(self, audio: str) -> str:
+        if self.recorded_transcript:
+            return self.recorded.get("transcript") or ""
+        return super()._transcribe_file(audio)
+
+
+def _replay_config(config: Dict[str, Any], workdir: str, llm: str) -> Dict[str, Any]:
+    cfg = dict(config)
+
+    def section(name: str, **overrides: Any) -> None:
+        cfg[name] = dict(cfg.get(name, {}), **overrides)
+
+    cfg["screenshot_dir"] = workdir
+    section("artifacts", janitor=False, use_tmpfs=False, audio_dir=workdir)
+    section("audio", resident_mic=False)
+    section("memory", enabled=False)
+    section("trace", enabled=False)
+    section("query_cache", enabled=False)
+    section("config", watch=False)
+    section("transcription", probe_on_startup=False)  # a probe would skew the timings
+    if llm == "local":
+        section("llm", mode="local")
+    return cfg
+
+
+def compare(archive: str, recorded: Dict[str, Any], replayed: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the comparison record for one replayed trace."""
+    mismatches = [key for key in COMPARED if recorded.get(key) != replayed.get(key)]
+    stages = sorted(set(recorded.get("timings", {})) | set(replayed.get("timings", {})))
+    timings = {
+        stage: {"recorded": recorded["timings"].get(stage), "replayed": replayed["timings"].get(stage)}
+        for stage in stages
+    }
+    record: Dict[str, Any] = {
+        "trace": archive,
+        "kind": recorded.get("kind"),
+        "ok": not mismatches,
+        "mismatches": mismatches,
+        "timings": timings,
+    }
+    for key in mismatches:
+        record.setdefault("diff", {})[key] = {"recorded": recorded.get(key), "replayed": replayed.get(key)}
+    return record
+
+
+def _delta(record: Dict[str, Any], stage: str) -> Optional[float]:
+    timing = record.get("timings", {}).get(stage) or {}
+    if timing.get("recorded") is None or timing.get("replayed") is None:
+        return None
+    return timing["replayed"] - timing["recorded"]
+
+
+def replay_traces(
+    config: Dict[str, Any],
+    inputs: List[str],
+    output: Optional[str] = None,
+    llm: str = "recorded",
+    recorded_transcript: bool = False,
+    progress: Optional[TextIO] = sys.stderr,
+) -> Dict[str, Any]:
+    """Replay every trace archive in ``inputs`` and summarize the results.
+
+    Parameters
+    ----------
+    config:
+        Configuration to replay with.
+    inputs:
+        Trace archives or directories containing them.
+    output:
+        Optional JSONL file receiving one comparison record per trace.
+    llm:
+        ``"recorded"``, ``"live"`` or ``"local"`` (see
+        :class:`ReplayAssistant`).
+    recorded_transcript:
+        Reuse the traced transcripts instead of transcribing again.
+    progress:
+        Stream for progress lines, or ``None`` to stay quiet.
+
+    Returns
+    -------
+    dict
+        Counts of matching, mismatching and failed traces and the median
+        change in latency per stage (replayed minus recorded, seconds).
+    """
+
+    archives = find_archives(inputs)
+    assistant = ReplayAssistant(config, llm=llm, recorded_transcript=recorded_transcript)
+    records = []
+    out = open(output, "w", encoding="utf-8") if output else None
+    try:
+        for archive in archives:
+            record = assistant.replay(archive)
+            records.append(record)
+            if out is not None:
+                out.write(json.dumps(record) + "\n")
+            if progress is not None:
+                status = "error" if "error" in record else ("ok" if record["ok"] else "MISMATCH")
+                detail = record.get("error") or ", ".join(record.get("mismatches", []))
+                progress.write(f"{status:8} {archive} {detail}\n")
+    finally:
+        if out is not None:
+            out.close()
+        assistant.close()
+
+    compared = [r for r in records if "error" not in r]
+    stages = sorted({stage for r in compared for stage in r["timings"]})
+    deltas = {}
+    for stage in stages:
+        values = [d for d in (_delta(r, stage) for r in compared) if d is not None]
+        if values:
+            deltas[stage] = round(statistics.median(values), 4)
+    summary = {
+        "traces": len(records),
+        "matched": sum(1 for r in compared if r["ok"]),
+        "mismatched": sum(1 for r in compared if not r["ok"]),
+        "failed": len(records) - len(compared),
+        "median_delta_s": deltas,
+    }
+    if progress is not None:
+        progress.write(json.dumps(summary) + "\n")
+    return summary
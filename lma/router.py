@@ -0,0 +1,164 @@
+"""Latency-aware choice between the remote and local models.
+
+Three targets can answer a prompt: ``openai`` (the remote model),
+``local`` (``llm.primary_local_model``) and ``fallback``
+(``llm.fallback_model``, a smaller local model). :class:`ModelRouter`
+keeps rolling latency and error statistics for each of them and orders
+the targets for a request from its prompt length, whether it carries an
+image and its latency target. Short text-only commands therefore go to
+the fast small model, while long or visual requests go to a model that
+can handle them.
+
+A target whose error rate is too high is only used as a last resort,
+but not forever: once ``llm.retry_after_s`` has passed since its last
+failure it is tried again in its normal place, and a success there
+clears its record of failures.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+TARGETS = ("openai", "local", "fallback")
+
+
+class ModelStats:
+    """Rolling latency and outcome record for one target.
+
+    Parameters
+    ----------
+    window:
+        Number of recent requests kept.
+    """
+
+    def __init__(self, window: int = 20) -> None:
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self.last_failure: Optional[float] = None
+        self.probing = False
+
+    def record(self, seconds: float, ok: bool) -> None:
+        if ok and self.probing:
+            self.samples.clear()  # recovered: forget the bad window
+        self.probing = False
+        if not ok:
+            self.last_failure = time.monotonic()
+        self.samples.append((seconds, ok))
+
+    @property
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the ``q`` quantile of successful request latencies."""
+        times = sorted(seconds for seconds, ok in self.samples if ok)
+        if not times:
+            return None
+        return times[min(len(times) - 1, int(q * len(times)))]
+
+
+class ModelRouter:
+    """Order the LLM targets for each request.
+
+    Recognized ``llm`` keys are ``mode``, ``fallback_model``,
+    ``latency_target_s`` (default target, 8), ``short_prompt_chars``
+    (200) with ``short_latency_target_s`` (2) for short text-only
+    prompts, ``long_prompt_chars`` (4000) above which the small model
+    is not used, ``fallback_vision`` (whether the fallback model accepts
+    images), ``max_error_rate`` (0.5) above which a target is only
+    used as a last resort and ``retry_after_s`` (60) after which such a
+    target is given another chance.
+
+    In ``auto`` mode every target competes on estimated latency. In
+    ``gpt-4o`` mode the remote model always comes first and in
+    ``local`` mode it always comes last, so latency never overrides an
+    explicit choice between remote and local.
+    """
+
+    def __init__(self, window: int = 20) -> None:
+        self.stats: Dict[str, ModelStats] = {name: ModelStats(window) for name in TARGETS}
+        self._lock = threading.Lock()
+
+    def record(self, target: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.stats[target].record(seconds, ok)
+
+    def latency(self, target: str, q: float) -> Optional[float]:
+        """The ``q`` quantile of ``target``'s latency, or ``None`` if never used."""
+        with self._lock:
+            return self.stats[target].quantile(q)
+
+    def estimate(self, target: str) -> Optional[float]:
+        """Median observed latency of ``target``, or ``None`` if never used."""
+        return self.latency(target, 0.5)
+
+    def error_rate(self, target: str) -> float:
+        with self._lock:
+            return self.stats[target].error_rate
+
+    def healthy(self, target: str, max_errors: float, retry_after: float) -> bool:
+        """Whether ``target`` may be used in its normal place.
+
+        An unhealthy target is retried once ``retry_after`` seconds have
+        passed since its last failure; its next result decides whether
+        it has recovered.
+        """
+        with self._lock:
+            stats = self.stats[target]
+            if stats.error_rate <= max_errors:
+                return True
+            if stats.last_failure is not None and time.monotonic() - stats.last_failure >= retry_after:
+                stats.probing = True
+                return True
+            return False
+
+    def order(
+        self,
+        config: Dict[str, Any],
+        prompt: str,
+        image_path: Optional[str] = None,
+        latency_target: Optional[float] = None,
+    ) -> List[str]:
+        """Return the targets to try, best first, for one request."""
+        mode = config.get("mode", "gpt-4o")
+        short = not image_path and len(prompt) <= config.get("short_prompt_chars", 200)
+        if latency_target is None:
+            if short:
+                latency_target = config.get("short_latency_target_s", 2.0)
+            else:
+                latency_target = config.get("latency_target_s", 8.0)
+
+        local = ["local"]
+        if config.get("fallback_model") and (not image_path or config.get("fallback_vision", False)):
+            if len(prompt) <= config.get("long_prompt_chars", 4000):
+                # The small model leads for short commands; otherwise it is a fallback.
+                local = ["fallback", "local"] if short else ["local", "fallback"]
+
+        if mode == "auto":
+            preferred = local + ["openai"] if not image_path else ["openai"] + local
+        elif mode == "local":
+            preferred = local + ["openai"]
+        else:
+            preferred = ["openai"] + local
+
+        max_errors = config.get("max_error_rate", 0.5)
+        retry_after = config.get("retry_after_s", 60.0)
+
+        def rank(target: str) -> Tuple[int, int, float, int]:
+            healthy = self.healthy(target, max_errors, retry_after)
+            estimate = self.estimate(target)
+            pinned = 0
+            if mode == "gpt-4o":
+                pinned = 0 if target == "openai" else 1
+            elif mode == "local":
+                pinned = 1 if target == "openai" else 0
+            # Healthy targets meeting the latency target (or not measured
+            # yet) keep their preference order; the rest go fastest first.
+            slow = estimate if estimate is not None and estimate > latency_target else 0.0
+            return (pinned, 0 if healthy else 1, slow, preferred.index(target))
+
+        return sorted(preferred, key=rank)
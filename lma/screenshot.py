@@ -1,13 +1,23 @@
-"""Utilities for capturing screenshots."""
+"""Utilities for capturing screenshots.
+
+Besides full-desktop capture, :func:`capture` can restrict the image to
+the monitor under the cursor, the focused window or a region around the
+cursor, and optionally downscale it. The returned :class:`Region`
+records where the image came from so coordinates read off the image
+can be mapped back to real screen positions.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import os
 import shutil
 import subprocess
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Deque, List, Optional, Tuple
 
 try:  # optional dependency
     import mss
@@ -15,21 +25,30 @@ try:  # optional dependency
 except Exception:  # pragma: no cover - fallback when mss unavailable
     mss = None
 
+try:  # optional dependencies for perceptual hashing
+    import numpy as np
+    from PIL import Image
+except Exception:  # pragma: no cover
+    np = None
+    Image = None
+
 
 def _timestamped_name(prefix: str = "shot", ext: str = "png") -> str:
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     return f"{prefix}_{ts}.{ext}"
 
 
-def take_screenshot(config: dict) -> Optional[str]:
+def take_screenshot(config: dict, directory: Optional[str] = None) -> Optional[str]:
     """Capture a screenshot using available backends.
 
     The function attempts to use ``flameshot`` or ``grim`` if available.
     If neither command is found, it falls back to the ``mss`` Python
-    library. The resulting image path is returned or ``None`` on failure.
+    library. The image is written to ``directory`` (``screenshot_dir``
+    from ``config`` by default). The resulting image path is returned or
+    ``None`` on failure.
     """
 
-    directory = Path(config.get("screenshot_dir", "."))
+    directory = Path(directory or config.get("screenshot_dir", "."))
     directory.mkdir(parents=True, exist_ok=True)
     output = directory / _timestamped_name()
 
@@ -60,3 +79,310 @@ def take_screenshot(config: dict) -> Optional[str]:
     except Exception:
         output.touch()
         return str(output)
+
+
+@dataclass
+class Region:
+    """Screen rectangle captured into an image, and the image's scale.
+
+    ``scale`` is image pixels per screen pixel (``< 1`` after
+    downscaling).
+    """
+
+    left: int
+    top: int
+    width: int
+    height: int
+    scale: float = 1.0
+
+    def contains(self, x: int, y: int) -> bool:
+        return self.left <= x < self.left + self.width and self.top <= y < self.top + self.height
+
+    def to_screen(self, x: float, y: float) -> Tuple[int, int]:
+        """Map image coordinates ``(x, y)`` to absolute screen coordinates."""
+        return (
+            self.left + int(round(x / self.scale)),
+            self.top + int(round(y / self.scale)),
+        )
+
+    def clamp_into(self, outer: "Region") -> "Region":
+        """Shift (and if needed shrink) this region to lie inside ``outer``."""
+        width = min(self.width, outer.width)
+        height = min(self.height, outer.height)
+        left = min(max(self.left, outer.left), outer.left + outer.width - width)
+        top = min(max(self.top, outer.top), outer.top + outer.height - height)
+        return Region(left, top, width, height, self.scale)
+
+
+@dataclass
+class Capture:
+    """A captured image and the screen region it shows, if known.
+
+    ``on_screen`` is unset for images that did not come from the screen
+    (such as a copied image), whose coordinates mean nothing on it.
+    """
+
+    path: str
+    region: Optional[Region]
+    on_screen: bool = True
+
+
+def _mss_region(monitor: dict) -> Region:
+    return Region(monitor["left"], monitor["top"], monitor["width"], monitor["height"])
+
+
+def virtual_screen() -> Optional[Region]:
+    """Return the bounding box of all monitors, if it can be determined."""
+    if mss is None:
+        return None
+    try:
+        with mss.mss() as sct:
+            return _mss_region(sct.monitors[0])
+    except Exception:
+        return None
+
+
+def monitors() -> List[Region]:
+    """Return the geometry of each physical monitor."""
+    if mss is None:
+        return []
+    try:
+        with mss.mss() as sct:
+            return [_mss_region(m) for m in sct.monitors[1:]]
+    except Exception:
+        return []
+
+
+def active_window() -> Optional[Region]:
+    """Return the focused window's geometry using ``xdotool`` (X11 only)."""
+    if not shutil.which("xdotool"):
+        return None
+    try:
+        out = subprocess.run(
+            ["xdotool", "getactivewindow", "getwindowgeometry", "--shell"],
+            check=True, capture_output=True, text=True, timeout=2,
+        ).stdout
+    except Exception:
+        return None
+    values = dict(line.split("=", 1) for line in out.splitlines() if "=" in line)
+    try:
+        return Region(int(values["X"]), int(values["Y"]), int(values["WIDTH"]), int(values["HEIGHT"]))
+    except (KeyError, ValueError):
+        return None
+
+
+def _monitor_at(cursor: Optional[Tuple[int, int]]) -> Optional[Region]:
+    screens = monitors()
+    if not screens:
+        return None
+    if cursor is not None:
+        for screen in screens:
+            if screen.contains(*cursor):
+                return screen
+    return screens[0]
+
+
+def capture_region(config: dict, cursor: Optional[Tuple[int, int]] = None) -> Optional[Region]:
+    """Return the screen area selected by ``screenshot.mode``.
+
+    Modes are ``full`` (all monitors), ``monitor`` (the monitor under
+    the cursor), ``window`` (the focused window) and ``cursor`` (a
+    ``cursor_region`` sized box centred on the cursor, kept inside its
+    monitor). ``None`` means the geometry could not be determined.
+    """
+
+    cfg = config.get("screenshot", {})
+    mode = cfg.get("mode", "full")
+    if mode == "monitor":
+        return _monitor_at(cursor)
+    if mode == "window":
+        window = active_window()
+        screen = virtual_screen()
+        return window.clamp_into(screen) if window and screen else window
+    if mode == "cursor" and cursor is not None:
+        screen = _monitor_at(cursor)
+        width, height = cfg.get("cursor_region", [800, 600])
+        box = Region(cursor[0] - width // 2, cursor[1] - height // 2, width, height)
+        return box.clamp_into(screen) if screen else box
+    return virtual_screen()
+
+
+def _grab(region: Region, output: Path) -> bool:
+    if mss is not None:
+        try:
+            with mss.mss() as sct:
+                img = sct.grab(
+                    {"left": region.left, "top": region.top, "width": region.width, "height": region.height}
+                )
+                mss.tools.to_png(img.rgb, img.size, output=str(output))
+                return True
+        except Exception:
+            pass
+    if shutil.which("grim"):
+        geometry = f"{region.left},{region.top} {region.width}x{region.height}"
+        try:
+            subprocess.run(["grim", "-g", geometry, str(output)], check=True)
+            return True
+        except Exception:
+            pass
+    return False
+
+
+def _downscale(path: str, region: Region, max_width: int) -> Region:
+    if Image is None or not max_width or region.width <= max_width:
+        return region
+    scale = max_width / float(region.width)
+    try:
+        with Image.open(path) as img:
+            small = img.resize((max_width, max(1, int(round(img.height * scale)))), Image.LANCZOS)
+        small.save(path, format="PNG")
+    except Exception:
+        return region
+    return Region(region.left, region.top, region.width, region.height, scale * region.scale)
+
+
+def capture(
+    config: dict,
+    directory: Optional[str] = None,
+    cursor: Optional[Tuple[int, int]] = None,
+) -> Optional[Capture]:
+    """Capture the area selected by ``screenshot.mode`` and describe it.
+
+    The ``full`` mode uses :func:`take_screenshot` unchanged. Other modes
+    grab just their region (via ``mss`` or ``grim -g``) and fall back to
+    a full capture when the geometry or the grab is unavailable. Images
+    wider than ``screenshot.max_width`` are downscaled; the returned
+    region's ``scale`` reflects that.
+    """
+
+    cfg = config.get("screenshot", {})
+    region = None
+    path = None
+    if cfg.get("mode", "full") != "full":
+        region = capture_region(config, cursor)
+        if region is not None and region.width > 0 and region.height > 0:
+            out_dir = Path(directory or config.get("screenshot_dir", "."))
+            out_dir.mkdir(parents=True, exist_ok=True)
+            output = out_dir / _timestamped_name()
+            if _grab(region, output):
+                path = str(output)
+
+    if path is None:
+        path = take_screenshot(config, directory)
+        if path is None:
+            return None
+        # flameshot's interactive selection has no known geometry
+        region = None if shutil.which("flameshot") else virtual_screen()
+
+    if region is not None:
+        region = _downscale(path, region, cfg.get("max_width", 0))
+    return Capture(path, region)
+
+
+def image_hash(path: str, hash_size: int = 8) -> Optional[int]:
+    """Return a difference hash (dHash) of the image at ``path``.
+
+    The image is reduced to a ``(hash_size + 1) x hash_size`` grayscale
+    thumbnail and each bit records whether a pixel is brighter than its
+    right-hand neighbour. Visually identical screens produce hashes a few
+    bits apart at most. ``None`` is returned when NumPy/Pillow are
+    missing or the file cannot be decoded.
+    """
+
+    if np is None or Image is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+            pixels = np.asarray(small, dtype=np.int16)
+    except Exception:
+        return None
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def pixel_digest(path: str) -> Optional[str]:
+    """Return a digest of the decoded pixels of the image at ``path``.
+
+    Unlike :func:`image_hash` this changes with any pixel, such as a few
+    edited lines of text, but not with the file's encoding.
+    """
+
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as img:
+            rgb = img.convert("RGB")
+            return hashlib.sha1(repr(rgb.size).encode() + rgb.tobytes()).hexdigest()
+    except Exception:
+        return None
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Return the number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class CachedShot:
+    """A previously captured screenshot and what is known about it."""
+
+    path: str
+    hash: int
+    digest: str
+    region: Optional[Region] = None
+
+
+class ScreenshotCache:
+    """Remember recent captures so an unchanged screen can be reused.
+
+    Captures whose dHashes are close are only treated as the same
+    screen if their pixels are identical, since a few changed lines of
+    text barely move a 64-bit hash.
+
+    Parameters
+    ----------
+    max_entries:
+        Number of recent captures to compare against.
+    threshold:
+        Maximum Hamming distance between hashes for two captures to be
+        compared pixel by pixel.
+    """
+
+    def __init__(self, max_entries: int = 8, threshold: int = 4) -> None:
+        self.threshold = threshold
+        self.entries: Deque[CachedShot] = deque(maxlen=max_entries)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ScreenshotCache":
+        cfg = config.get("screenshot", {})
+        return cls(cfg.get("dedup_history", 8), cfg.get("dedup_threshold", 4))
+
+    def match(self, path: str, region: Optional[Region] = None) -> Optional[CachedShot]:
+        """Return a cached capture matching ``path`` or remember ``path``.
+
+        Only a capture of exactly the same ``region`` matches, since
+        coordinates on the reused image are mapped through its region.
+        When no earlier capture is close enough, ``path`` is added to
+        the history and ``None`` is returned.
+        """
+
+        value, digest = image_hash(path), pixel_digest(path)
+        if value is None or digest is None:
+            return None
+
+        for entry in self.entries:
+            if (
+                entry.region == region
+                and hamming_distance(entry.hash, value) <= self.threshold
+                and entry.digest == digest
+                and os.path.exists(entry.path)
+            ):
+                # Move to the front so frequently revisited screens stay cached.
+                self.entries.remove(entry)
+                self.entries.appendleft(entry)
+                return entry
+
+        self.entries.appendleft(CachedShot(path, value, digest, region))
+        return None
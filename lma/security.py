@@ -59,9 +59,20 @@ def requires_confirmation(command: str, config: dict) -> bool:
     return base_cmd in confirm_required
 
 
-def validate_coordinates(x: int, y: int, screen_width: int = 1920, screen_height: int = 1080) -> bool:
-    """Validate mouse coordinates are within reasonable bounds."""
-    return (0 <= x <= screen_width and 0 <= y <= screen_height)
+def validate_coordinates(
+    x: int,
+    y: int,
+    screen_width: int = 1920,
+    screen_height: int = 1080,
+    left: int = 0,
+    top: int = 0,
+) -> bool:
+    """Validate mouse coordinates are within reasonable bounds.
+
+    ``left``/``top`` give the origin of the screen area, which is not
+    ``(0, 0)`` for every monitor in a multi-monitor layout.
+    """
+    return (left <= x <= left + screen_width and top <= y <= top + screen_height)
 
 
 def extract_commands(text: str) -> List[str]:
@@ -84,6 +95,41 @@ def extract_commands(text: str) -> List[str]:
     return commands
 
 
+# Automation phrases the assistant acts on in a response; each pattern's
+# groups capture the coordinates, text or keys.
+# Mouse click commands: "click at (x, y)" or "click coordinates x,y"
+CLICK_PATTERNS = [
+    r'click\s+(?:at\s+)?\(?(\d+),\s*(\d+)\)?',
+    r'click\s+coordinates\s+(\d+),\s*(\d+)',
+    r'move\s+to\s+(\d+),\s*(\d+)\s+and\s+click'
+]
+# Mouse move commands: "move to (x, y)" or "move mouse to x,y"
+MOVE_PATTERNS = [
+    r'move\s+(?:mouse\s+)?to\s+\(?(\d+),\s*(\d+)\)?',
+    r'move\s+cursor\s+to\s+(\d+),\s*(\d+)'
+]
+# Typing commands: "type text 'hello world'" or "enter text: hello world"
+TYPE_PATTERNS = [
+    r'type\s+(?:text\s+)?["\']([^"\']+)["\']',
+    r'enter\s+text:\s*(.+?)(?:\n|$)',
+    r'input\s+text\s+["\']([^"\']+)["\']'
+]
+# Hotkey commands: "press ctrl+c" or "send hotkey alt+tab"
+HOTKEY_PATTERNS = [
+    r'press\s+((?:\w+\+)*\w+)',
+    r'send\s+hotkey\s+((?:\w+\+)*\w+)',
+    r'use\s+keyboard\s+shortcut\s+((?:\w+\+)*\w+)'
+]
+
+
+def has_automation(text: str) -> bool:
+    """Whether ``text`` asks to click, move the mouse, type or press keys."""
+    return any(
+        re.search(pattern, text, re.IGNORECASE)
+        for pattern in CLICK_PATTERNS + MOVE_PATTERNS + TYPE_PATTERNS + HOTKEY_PATTERNS
+    )
+
+
 def sanitize_input(text: str, config: dict) -> str:
     """Sanitize input text according to security settings."""
     if not config.get("security", {}).get("sanitize_inputs", True):
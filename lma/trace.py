@@ -0,0 +1,171 @@
+"""Recording of interactions for debugging and replay.
+
+With ``trace.enabled`` set, every hotkey interaction is saved as a
+single ZIP archive holding ``trace.json`` (clipboard, transcript,
+sanitized prompt, raw and final response, the actions taken and
+per-stage timings) plus the recorded audio and the screenshot that was
+sent. ``lma replay`` (:mod:`lma.replay`) feeds these archives back
+through the pipeline.
+
+Traces contain whatever the user said, copied and showed on screen, so
+recording is off by default and archives are written to a private
+directory.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .utils import cache_dir
+
+TRACE_VERSION = 1
+
+
+class Trace:
+    """Data collected about one interaction."""
+
+    def __init__(self, kind: str) -> None:
+        self.data: Dict[str, Any] = {
+            "version": TRACE_VERSION,
+            "kind": kind,
+            "started": datetime.now().isoformat(timespec="milliseconds"),
+            "timings": {},
+            "actions": [],
+        }
+        self.files: Dict[str, str] = {}
+        self._start = time.perf_counter()
+
+    def set(self, key: str, value: Any) -> None:
+        self.data[key] = value
+
+    def attach(self, name: str, path: Optional[str]) -> None:
+        """Include the file at ``path`` in the archive as ``name`` (plus its suffix)."""
+        if path:
+            self.files[name + Path(path).suffix] = path
+
+    def action(self, kind: str, **details: Any) -> None:
+        self.data["actions"].append({"type": kind, **details})
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.data["timings"][name] = round(time.perf_counter() - start, 4)
+
+    def finish(self) -> None:
+        self.data["timings"]["total"] = round(time.perf_counter() - self._start, 4)
+
+
+class TraceRecorder:
+    """Start traces for interactions and archive them.
+
+    Parameters
+    ----------
+    directory:
+        Where archives are written; ``None`` keeps only :attr:`last` in
+        memory (used by replay).
+    max_traces:
+        Oldest archives beyond this count are deleted.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_traces: int = 200) -> None:
+        self.directory = Path(directory) if directory else None
+        self.max_traces = max_traces
+        self.last: Optional[Trace] = None
+        self._local = threading.local()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            os.chmod(self.directory, 0o700)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["TraceRecorder"]:
+        """Build a recorder from the ``trace`` section, or ``None`` if disabled."""
+        cfg = config.get("trace", {})
+        if not cfg.get("enabled", False):
+            return None
+        return cls(cfg.get("dir") or cache_dir() / "traces", cfg.get("max_traces", 200))
+
+    @property
+    def current(self) -> Optional[Trace]:
+        """The trace of the interaction running on this thread."""
+        return getattr(self._local, "trace", None)
+
+    def begin(self, kind: str) -> Trace:
+        trace = Trace(kind)
+        self._local.trace = trace
+        return trace
+
+    def end(self) -> Optional[Path]:
+        """Finish this thread's trace and archive it; return the archive path."""
+        trace, self._local.trace = self.current, None
+        if trace is None:
+            return None
+        trace.finish()
+        self.last = trace
+        if self.directory is None:
+            return None
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        path = self.directory / f"trace_{stamp}_{trace.data['kind']}.zip"
+        try:
+            write_archive(path, trace)
+        except OSError:
+            return None
+        self._prune()
+        return path
+
+    def _prune(self) -> None:
+        archives = sorted(self.directory.glob("trace_*.zip"))
+        for old in archives[: max(0, len(archives) - self.max_traces)]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+
+def write_archive(path: Path, trace: Trace) -> None:
+    """Write ``trace`` and its files to the ZIP archive ``path``."""
+    tmp = path.with_suffix(".tmp")
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        data = dict(trace.data, files=sorted(trace.files))
+        zf.writestr("trace.json", json.dumps(data, indent=1, default=str))
+        for name, source in trace.files.items():
+            if os.path.isfile(source):
+                # Audio and images are already dense; store them as-is.
+                zf.write(source, name, compress_type=zipfile.ZIP_STORED)
+    os.replace(tmp, path)
+
+
+def read_archive(path: str, extract_to: Optional[str] = None) -> Dict[str, Any]:
+    """Return the ``trace.json`` of archive ``path``.
+
+    With ``extract_to`` set, attached files are extracted there and
+    their paths are returned under ``"paths"``.
+    """
+    with zipfile.ZipFile(path) as zf:
+        data = json.loads(zf.read("trace.json"))
+        if extract_to is not None:
+            data["paths"] = {
+                name: zf.extract(name, extract_to) for name in data.get("files", []) if name in zf.namelist()
+            }
+    return data
+
+
+def find_archives(inputs: List[str]) -> List[str]:
+    """Expand directories in ``inputs`` to the trace archives they contain."""
+    found: List[str] = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found.extend(str(p) for p in sorted(Path(item).glob("trace_*.zip")))
+        elif os.path.isfile(item):
+            found.append(item)
+    return found
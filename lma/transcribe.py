@@ -1,47 +1,346 @@
-"""Audio transcription utilities."""
+"""Audio transcription utilities.
 
-from __future__ import annotations
+Several speech-to-text backends are supported. Rather than trying them
+in a fixed order on every call, the order is taken from a
+:class:`BackendRanking` which can be produced by :func:`probe_backends`:
+each installed backend transcribes a short fixture clip, is timed and
+scored against the reference transcript, and the fastest accurate one
+is tried first from then on. Backends that fail at runtime are demoted
+for the rest of the process; only probe results are persisted, so one
+transient failure does not outlive a restart.
+"""
 
-from typing import Optional
+from __future__ import annotations
 
+import json
+import os
+import re
 import shutil
 import subprocess
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
+from .governor import get_governor
+from .utils import cache_dir
 
-def transcribe_audio(path: str) -> str:
-    """Transcribe ``path`` using available backends."""
+PROBE_TEXT = "the quick brown fox jumps over the lazy dog while the assistant listens"
+
+
+def _load_whispercpp() -> Any:
+    from whispercpp import WhisperCPP
+
+    return WhisperCPP()
+
+
+def _load_faster_whisper() -> Any:
+    from faster_whisper import WhisperModel
+
+    threads = get_governor().threads("transcription")
+    return WhisperModel("base", device="cpu", cpu_threads=threads or 0)
+
+
+LOADERS: Dict[str, Callable[[], Any]] = {
+    "whispercpp": _load_whispercpp,
+    "faster_whisper": _load_faster_whisper,
+}
+
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(name: str) -> Any:
+    """Return the in-process model for backend ``name``, loading it once."""
+    with _models_lock:
+        model = _models.get(name)
+        if model is None:
+            model = LOADERS[name]()
+            _models[name] = model
+        return model
+
+
+def loaded_models() -> List[str]:
+    """Return the backends whose models are currently in memory."""
+    with _models_lock:
+        return list(_models)
+
+
+def unload_models() -> None:
+    """Drop every in-process model; the next use loads it again."""
+    with _models_lock:
+        _models.clear()
 
-    try:
-        from whispercpp import WhisperCPP
 
-        model = WhisperCPP()
-        return model.transcribe(path)
-    except Exception:
-        pass
+def warm_up() -> Optional[str]:
+    """Load the model of the best-ranked backend that keeps one in memory.
 
-    if shutil.which("whisper"):
+    Returns the backend name, or ``None`` if no model could be loaded.
+    """
+
+    for name in get_ranking().snapshot():
+        if name not in LOADERS:
+            continue
         try:
-            result = subprocess.check_output(["whisper", path, "--model", "base", "--output", "-"], text=True)
-            return result.strip()
+            get_model(name)
+            return name
         except Exception:
+            continue
+    return None
+
+
+def _whispercpp(path: str) -> str:
+    return get_model("whispercpp").transcribe(path)
+
+
+def _whisper_cli(path: str) -> str:
+    if not shutil.which("whisper"):
+        raise RuntimeError("whisper CLI not installed")
+    governor = get_governor()
+    proc = subprocess.Popen(
+        ["whisper", path, "--model", "base", "--output", "-"],
+        stdout=subprocess.PIPE,
+        text=True,
+        env=governor.env("transcription"),
+    )
+    governor.place(proc.pid, "transcription")
+    out, _ = proc.communicate()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+    return out.strip()
+
+
+def _faster_whisper(path: str) -> str:
+    segments, _ = get_model("faster_whisper").transcribe(path)
+    return " ".join(text for _, text in segments)
+
+
+def _sphinx(path: str) -> str:
+    import speech_recognition as sr
+
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(path) as source:
+        audio = recognizer.record(source)
+    return recognizer.recognize_sphinx(audio)
+
+
+BACKENDS: Dict[str, Callable[[str], str]] = {
+    "whispercpp": _whispercpp,
+    "whisper_cli": _whisper_cli,
+    "faster_whisper": _faster_whisper,
+    "sphinx": _sphinx,
+}
+
+
+class BackendRanking:
+    """Order in which transcription backends are tried, persisted as JSON.
+
+    Parameters
+    ----------
+    path:
+        File the ranking and the last probe results are stored in.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = Path(path) if path else cache_dir() / "transcribe_ranking.json"
+        self.order: List[str] = list(BACKENDS)
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.probed = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        known = [name for name in data.get("order", []) if name in BACKENDS]
+        self.order = known + [name for name in BACKENDS if name not in known]
+        self.results = data.get("results", {})
+        self.probed = bool(known)
+
+    def save(self) -> None:
+        """Atomically write the ranking, so concurrent readers never see half a file."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"order": self.order, "results": self.results}, indent=2))
+            os.replace(tmp, self.path)
+        except OSError:
             pass
 
-    try:
-        from faster_whisper import WhisperModel
+    def snapshot(self) -> List[str]:
+        with self._lock:
+            return list(self.order)
+
+    def update(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """Re-rank from probe ``results`` and persist the new order."""
+        working = [name for name, res in results.items() if res.get("ok")]
+        working.sort(key=lambda name: results[name]["rtf"])
+        failed = [name for name in BACKENDS if name not in working]
+        with self._lock:
+            self.order = working + failed
+            self.results = results
+            self.probed = True
+        self.save()
+
+    def demote(self, name: str) -> None:
+        """Move ``name`` to the end of the order after a runtime failure.
+
+        The demotion is kept in memory only; the next probe (or restart)
+        ranks the backend on its merits again.
+        """
+        with self._lock:
+            if name not in self.order or self.order[-1] == name:
+                return
+            self.order.remove(name)
+            self.order.append(name)
+
+
+_ranking: Optional[BackendRanking] = None
+_probe_thread: Optional[threading.Thread] = None
+
+
+def get_ranking() -> BackendRanking:
+    """Return the process-wide backend ranking, loading it on first use."""
+    global _ranking
+    if _ranking is None:
+        _ranking = BackendRanking()
+    return _ranking
 
-        model = WhisperModel("base", device="cpu")
-        segments, _ = model.transcribe(path)
-        return " ".join(text for _, text in segments)
-    except Exception:
-        pass
 
-    try:
-        import speech_recognition as sr
+def configure(config: Dict[str, Any], probe: bool = True) -> Optional[threading.Thread]:
+    """Apply the ``transcription`` config section.
+
+    Loads the persisted ranking and, when ``probe`` is allowed,
+    ``probe_on_startup`` is set and no ranking exists yet (or
+    ``reprobe`` is set), starts a background probe. Returns the probe
+    thread, if one was started.
+    """
+
+    global _ranking, _probe_thread
+    cfg = config.get("transcription", {})
+    _ranking = BackendRanking(cfg.get("ranking_path"))
+    if probe and cfg.get("probe_on_startup", False) and (cfg.get("reprobe", False) or not _ranking.probed):
+        thread = threading.Thread(
+            target=probe_backends,
+            kwargs={"clip": cfg.get("probe_clip"), "reference": cfg.get("probe_text")},
+            name="lma-transcribe-probe",
+            daemon=True,
+        )
+        thread.start()
+        _probe_thread = thread
+        return thread
+    return None
+
+
+def wait_for_probe(timeout: Optional[float] = None) -> None:
+    """Wait for a background probe started by :func:`configure` to finish.
+
+    Called before forking worker processes, which must not inherit a
+    half-finished probe.
+    """
+    thread = _probe_thread
+    if thread is not None:
+        thread.join(timeout)
+
+
+def transcribe_audio(path: str) -> str:
+    """Transcribe ``path`` using available backends.
+
+    Backends are tried in ranking order; one that raises is demoted so
+    later calls skip straight past it.
+    """
 
-        recognizer = sr.Recognizer()
-        with sr.AudioFile(path) as source:
-            audio = recognizer.record(source)
-        return recognizer.recognize_sphinx(audio)
-    except Exception:
-        pass
+    ranking = get_ranking()
+    for name in ranking.snapshot():
+        try:
+            return BACKENDS[name](path)
+        except Exception:
+            ranking.demote(name)
     return ""
+
+
+# ----------------------------------------------------------------------
+def _words(text: str) -> List[str]:
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """Return the word error rate of ``hypothesis`` against ``reference``."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def _clip_seconds(path: str) -> float:
+    with wave.open(path, "rb") as wf:
+        return wf.getnframes() / float(wf.getframerate())
+
+
+def _probe_clip(reference: str) -> Optional[str]:
+    """Return the cached fixture clip, synthesizing it with espeak if needed."""
+    path = cache_dir() / "probe.wav"
+    if path.exists():
+        return str(path)
+    for cmd in (["espeak-ng", "-w", str(path), reference], ["espeak", "-w", str(path), reference]):
+        if shutil.which(cmd[0]):
+            try:
+                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                return str(path)
+            except Exception:
+                continue
+    return None
+
+
+def probe_backends(
+    clip: Optional[str] = None,
+    reference: Optional[str] = None,
+    min_accuracy: float = 0.5,
+) -> Dict[str, Dict[str, Any]]:
+    """Benchmark every backend on a fixture clip and re-rank them.
+
+    Each backend transcribes ``clip``; its wall time, real-time factor
+    (seconds of compute per second of audio) and accuracy (``1 - WER``
+    against ``reference``) are recorded. Backends that raise, or score
+    below ``min_accuracy``, are ranked last. The default fixture is
+    :data:`PROBE_TEXT` synthesized once with espeak and cached.
+
+    Returns the per-backend results, or an empty dict when no fixture
+    clip is available.
+    """
+
+    reference = reference or PROBE_TEXT
+    clip = clip or _probe_clip(reference)
+    if not clip:
+        return {}
+    seconds = _clip_seconds(clip)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, backend in BACKENDS.items():
+        get_governor().background()  # let an interactive transcription go first
+        start = time.perf_counter()
+        try:
+            text = backend(clip)
+        except Exception as exc:
+            results[name] = {"ok": False, "error": type(exc).__name__}
+            continue
+        elapsed = time.perf_counter() - start
+        accuracy = max(0.0, 1.0 - word_error_rate(reference, text))
+        results[name] = {
+            "ok": accuracy >= min_accuracy,
+            "seconds": round(elapsed, 3),
+            "rtf": round(elapsed / seconds, 3) if seconds else float("inf"),
+            "accuracy": round(accuracy, 3),
+        }
+
+    get_ranking().update(results)
+    return results
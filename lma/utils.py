@@ -2,11 +2,16 @@
 
 from __future__ import annotations
 
+import atexit
 import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
+
+from .security import redact_sensitive_data
 try:  # optional
     from PIL import Image
 except Exception:  # pragma: no cover
@@ -39,6 +44,15 @@ def load_config(path: str = "config.json") -> Dict[str, Any]:
         return {}
 
 
+def cache_dir() -> Path:
+    """Return (and create) the per-user cache directory for LMA."""
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    path = Path(base) / "lma"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 def compress_image(path: str, quality: int = 80) -> None:
     """Compress ``path`` in-place as JPEG with ``quality``."""
 
@@ -51,9 +65,71 @@ def compress_image(path: str, quality: int = 80) -> None:
         pass
 
 
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class RedactingFormatter(logging.Formatter):
+    """Text formatter that redacts secrets when a record is emitted."""
+
+    def __init__(self, config: Dict[str, Any], fmt: Optional[str] = None) -> None:
+        super().__init__(fmt or "%(asctime)s [%(levelname)s] %(message)s")
+        self.config = config
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact_sensitive_data(super().format(record), self.config)
+
+
+class JsonFormatter(RedactingFormatter):
+    """Emit one JSON object per record.
+
+    Besides time, level, logger, thread and the (redacted) message, any
+    ``extra`` fields passed to the logging call, such as ``stage`` or
+    ``duration_ms``, become top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": redact_sensitive_data(record.getMessage(), self.config),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = redact_sensitive_data(self.formatException(record.exc_info), self.config)
+        return json.dumps(payload, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue records untouched so formatting runs on the listener thread.
+
+    The stock :meth:`QueueHandler.prepare` merges arguments into the
+    message in the caller's thread; here the record is queued as-is and
+    message formatting and redaction happen only in :class:`JsonFormatter`
+    or :class:`RedactingFormatter` when the listener writes it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_formatter: Optional[RedactingFormatter] = None
+
+
 def setup_logging(config: Dict[str, Any]) -> logging.Logger:
-    """Configure a rotating file logger from ``config``."""
+    """Configure non-blocking, rotating file logging from ``config``.
+
+    Logging calls only put the record on a queue; a background
+    :class:`~logging.handlers.QueueListener` formats, redacts and writes
+    it to ``assistant.log``. ``logging.format`` selects ``"text"``
+    (default) or ``"json"`` records.
+    """
 
+    global _listener, _formatter
     level_name = config.get("logging", {}).get("level", "INFO")
     level = getattr(logging, level_name.upper(), logging.INFO)
     logger = logging.getLogger("lma")
@@ -63,8 +139,33 @@ def setup_logging(config: Dict[str, Any]) -> logging.Logger:
     log_path = Path("assistant.log")
     max_bytes = config.get("logging", {}).get("max_size_mb", 10) * 1024 * 1024
     handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=1)
-    formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    if config.get("logging", {}).get("format", "text") == "json":
+        _formatter = JsonFormatter(config)
+    else:
+        _formatter = RedactingFormatter(config)
+    handler.setFormatter(_formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    logger.addHandler(_DeferredQueueHandler(log_queue))
     logger.setLevel(level)
     return logger
+
+
+def update_logging(config: Dict[str, Any]) -> None:
+    """Apply a new ``logging`` section (level, redaction) to the live logger."""
+    level_name = config.get("logging", {}).get("level", "INFO")
+    logging.getLogger("lma").setLevel(getattr(logging, level_name.upper(), logging.INFO))
+    if _formatter is not None:
+        _formatter.config = config
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the background log writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,48 @@
+import os
+import time
+
+from lma.artifacts import ArtifactStore
+
+
+def test_cleanup_evicts_least_recently_used(tmp_path):
+    store = ArtifactStore({"audio": tmp_path}, max_bytes=250, max_age=0)
+    paths = []
+    for _ in range(3):
+        path = store.new_path("audio", ".wav")
+        with open(path, "wb") as fh:
+            fh.write(b"x" * 100)
+        paths.append(path)
+
+    old = time.time() - 60
+    for i, path in enumerate(paths):
+        os.utime(path, (old + i, old + i))
+    store._access.clear()
+    store.touch(paths[0])
+
+    assert store.cleanup() == 1
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert os.path.exists(paths[2])
+    assert store.stats()["evicted_files"] == 1
+
+
+def test_cleanup_ignores_foreign_files(tmp_path):
+    keep = tmp_path / "config.json"
+    keep.write_text("{}")
+    os.utime(keep, (0, 0))
+    shot = tmp_path / "shot_20200101_000000.png"
+    shot.write_bytes(b"png")
+    os.utime(shot, (0, 0))
+
+    store = ArtifactStore({"screenshots": tmp_path}, max_bytes=0, max_age=3600)
+    assert store.cleanup() == 1
+    assert keep.exists()
+    assert not shot.exists()
+
+
+def test_cleanup_removes_clipboard_captures(tmp_path):
+    store = ArtifactStore({"screenshots": tmp_path}, max_bytes=0, max_age=3600)
+    copied = store.new_path("screenshots", ".png", prefix="clipboard")
+    os.utime(copied, (0, 0))
+    assert store.cleanup() == 1
+    assert not os.path.exists(copied)
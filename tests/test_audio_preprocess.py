@@ -0,0 +1,68 @@
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lma.audio_preprocess import load_wav, preprocess_audio, spectral_gate, trim_silence, write_wav
+
+
+def test_trim_silence_keeps_speech_only():
+    rate = 16000
+    tone = 0.5 * np.sin(2 * np.pi * 440 * np.arange(rate) / rate).astype(np.float32)
+    silence = np.zeros(rate, dtype=np.float32)
+    clip = np.concatenate([silence, tone, silence])
+
+    trimmed = trim_silence(clip, rate, pad_ms=0)
+    assert abs(trimmed.size - rate) <= rate * 0.02
+
+
+def test_trim_silence_drops_room_noise():
+    rate = 16000
+    noise = np.random.default_rng(0).normal(0, 0.001, rate).astype(np.float32)  # about -60 dBFS
+    assert trim_silence(noise, rate).size == 0
+    assert trim_silence(noise, rate, floor_db=-70).size == rate
+
+
+def test_preprocess_audio_resamples_and_reports_cut(tmp_path):
+    rate = 44100
+    t = np.arange(rate) / rate
+    tone = 0.1 * np.sin(2 * np.pi * 300 * t) + 0.05
+    stereo = np.stack([np.concatenate([np.zeros(rate), tone])] * 2, axis=1)
+    path = tmp_path / "audio_in.wav"
+    pcm = (stereo * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(pcm.tobytes())
+
+    result = preprocess_audio(str(path), {"audio": {}})
+    assert result is not None
+    assert result.original_seconds == pytest.approx(2.0)
+    assert result.seconds_removed > 0.7
+
+    samples, out_rate = load_wav(result.path)
+    assert out_rate == 16000
+    assert samples.shape[1] == 1
+    assert abs(float(samples.mean())) < 0.01
+    assert np.abs(samples).max() == pytest.approx(0.9, abs=0.01)
+
+
+def test_silent_clip_is_empty(tmp_path):
+    path = tmp_path / "audio_silent.wav"
+    write_wav(str(path), np.zeros(16000, dtype=np.float32), 16000)
+    result = preprocess_audio(str(path))
+    assert result.seconds == 0
+
+
+def test_spectral_gate_reduces_stationary_noise():
+    rate = 16000
+    t = np.arange(rate) / rate
+    rng = np.random.default_rng(0)
+    noisy = (0.5 * np.sin(2 * np.pi * 440 * t) * (t > 0.5) + 0.01 * rng.standard_normal(rate)).astype(np.float32)
+
+    gated = spectral_gate(noisy, rate)
+    assert gated.shape == noisy.shape
+    assert np.std(gated[:4000]) < 0.6 * np.std(noisy[:4000])
+    assert np.std(gated[10000:15000]) == pytest.approx(np.std(noisy[10000:15000]), rel=0.05)
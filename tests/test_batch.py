@@ -0,0 +1,51 @@
+import asyncio
+import io
+import json
+
+import httpx
+
+from lma.batch import run_batch
+from lma.llm_client import AsyncTokenBucket, LLMClient
+
+
+def _client(handler):
+    client = LLMClient({"llm": {"mode": "gpt-4o", "openai_api_key": "x"}})
+    client.aclient = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+def test_run_batch_writes_results_and_resumes(tmp_path):
+    prompts = tmp_path / "in.jsonl"
+    prompts.write_text(
+        "\n".join(json.dumps({"id": i, "prompt": f"question {i}"}) for i in range(5)) + "\n"
+    )
+    output = tmp_path / "out.jsonl"
+    seen = []
+
+    def handler(request):
+        prompt = json.loads(request.content)["messages"][0]["content"]
+        seen.append(prompt)
+        return httpx.Response(200, json={"choices": [{"message": {"content": prompt.upper()}}]})
+
+    cfg = {"llm": {"mode": "gpt-4o"}}
+    stats = run_batch(cfg, str(prompts), str(output), concurrency=3, client=_client(handler), progress=None)
+    assert stats["completed"] == 5 and stats["failed"] == 0
+    records = {r["id"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert records["3"]["response"] == "QUESTION 3"
+    assert records["3"]["latency_s"] >= 0
+
+    stats = run_batch(cfg, str(prompts), str(output), client=_client(handler), progress=io.StringIO())
+    assert stats["skipped"] == 5 and stats["completed"] == 0
+    assert len(seen) == 5
+
+
+def test_token_bucket_limits_rate():
+    async def take(n):
+        bucket = AsyncTokenBucket(rate=50, burst=1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(n):
+            await bucket.acquire()
+        return loop.time() - start
+
+    assert asyncio.run(take(6)) >= 0.09
@@ -0,0 +1,36 @@
+import io
+import json
+
+from lma import transcribe
+from lma.batch_transcribe import collect_files, run_batch
+from lma.transcribe import BackendRanking
+
+
+def test_collect_files_expands_directories_and_globs(tmp_path):
+    (tmp_path / "a.wav").write_bytes(b"")
+    (tmp_path / "notes.txt").write_text("x")
+    sub = tmp_path / "sub"
+    sub.mkdir()
+    (sub / "b.flac").write_bytes(b"")
+
+    files = collect_files([str(tmp_path)])
+    assert [f.rsplit("/", 1)[-1] for f in files] == ["a.wav", "b.flac"]
+    assert collect_files([str(tmp_path / "*.wav")]) == [str(tmp_path / "a.wav")]
+
+
+def test_run_batch_streams_and_resumes(tmp_path, monkeypatch):
+    for name in ("one.wav", "two.wav"):
+        (tmp_path / name).write_bytes(b"")
+    monkeypatch.setattr(transcribe, "BACKENDS", {"fake": lambda path: path.rsplit("/", 1)[-1]})
+    monkeypatch.setattr(transcribe, "_ranking", BackendRanking(tmp_path / "ranking.json"))
+    output = str(tmp_path / "out.jsonl")
+
+    summary = run_batch([str(tmp_path)], output, jobs=1, progress=io.StringIO())
+    assert summary["files"] == 2 and summary["failed"] == 0
+    with open(output) as fh:
+        records = [json.loads(line) for line in fh]
+    assert sorted(r["text"] for r in records) == ["one.wav", "two.wav"]
+
+    (tmp_path / "three.wav").write_bytes(b"")
+    summary = run_batch([str(tmp_path)], output, jobs=1, progress=None)
+    assert summary["files"] == 1 and summary["skipped"] == 2
@@ -0,0 +1,51 @@
+import socket
+import threading
+import time
+
+from lma.cancel import CancelToken
+from lma.executor import CommandExecutor
+from lma.llm_client import LLMClient
+
+
+def test_callbacks_run_once_and_late_registration_fires_immediately():
+    token = CancelToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("a"))
+    unregister = token.on_cancel(lambda: calls.append("b"))
+    unregister()
+
+    token.cancel()
+    token.cancel()
+    token.on_cancel(lambda: calls.append("late"))
+    assert calls == ["a", "late"]
+
+
+def test_cancel_kills_running_command():
+    executor = CommandExecutor()
+    token = CancelToken()
+    future = executor.submit("sleep 10", token)
+    time.sleep(0.2)
+    start = time.monotonic()
+    token.cancel()
+    result = future.result(timeout=5)
+    executor.shutdown()
+
+    assert time.monotonic() - start < 1
+    assert result.cancelled and not result.ok
+
+
+def test_cancel_aborts_llm_request_in_flight():
+    # A server that accepts the request and never answers.
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    port = server.getsockname()[1]
+
+    client = LLMClient({"llm": {"mode": "local", "local_endpoint": f"http://127.0.0.1:{port}"}})
+    token = CancelToken()
+    threading.Timer(0.2, token.cancel).start()
+
+    start = time.monotonic()
+    assert client.send_prompt("hi", token=token) == ""
+    assert time.monotonic() - start < 2
+    server.close()
@@ -0,0 +1,54 @@
+import os
+import time
+
+import pytest
+
+from lma import clipboard
+
+PNG = b"PNG fake image data"
+
+
+@pytest.fixture
+def tools(tmp_path, monkeypatch):
+    """Put executable scripts named like clipboard tools first on PATH."""
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("WAYLAND_DISPLAY", "wayland-0")
+
+    def make(name, body):
+        path = tmp_path / name
+        path.write_text("#!/bin/sh\n" + body)
+        path.chmod(0o755)
+
+    yield make
+    clipboard.configure({})
+
+
+def test_wayland_backend_reads_text_primary_and_images(tools, tmp_path):
+    tools("wl-paste", f"""
+case "$*" in
+  *--list-types*) printf 'image/png\\ntext/plain\\n' ;;
+  *--primary*) printf 'highlighted' ;;
+  *image/png*) printf "{PNG.decode()}" ;;
+  *) printf 'copied' ;;
+esac
+""")
+    tools("wl-copy", f"cat > {tmp_path}/copied\n")
+    assert clipboard.configure({}).name == "wl-clipboard"
+    assert clipboard.get_clipboard() == "copied"
+    assert clipboard.get_selection() == "highlighted"
+    assert clipboard.get_image() == ("image/png", PNG)
+    clipboard.set_clipboard("hello")
+    assert (tmp_path / "copied").read_text() == "hello"
+
+
+def test_hung_owner_times_out_and_size_is_capped(tools):
+    tools("wl-paste", "sleep 10\n")
+    clipboard.configure({"clipboard": {"timeout_s": 0.2}})
+    start = time.monotonic()
+    assert clipboard.get_clipboard() == ""
+    assert time.monotonic() - start < 1.0
+
+    tools("wl-paste", "yes abcdefgh\n")
+    clipboard.configure({"clipboard": {"max_text_kb": 1}})
+    assert len(clipboard.get_clipboard()) == 1024
+    assert clipboard.get_image() is None
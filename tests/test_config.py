@@ -0,0 +1,44 @@
+import json
+import threading
+
+import pytest
+
+from lma.config import Config, ConfigError, ConfigWatcher, changed_sections
+
+
+def test_config_validation_reports_key_paths():
+    Config({"llm": {"mode": "auto"}, "hotkeys": {"activate": "Ctrl+Alt+A", "allow_custom": True}})
+    with pytest.raises(ConfigError) as exc:
+        Config({"llm": {"mode": "gpt5"}, "executor": {"timeout": True}})
+    assert "llm.mode" in str(exc.value)
+    assert "executor.timeout" in str(exc.value)
+
+
+def test_strict_load_rejects_half_written_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text('{"llm": ')
+    assert Config.load(str(path)) == {}
+    with pytest.raises(ConfigError):
+        Config.load(str(path), strict=True)
+
+
+def test_changed_sections():
+    old = {"llm": {"mode": "local"}, "tts": {"voice": "a"}}
+    new = {"llm": {"mode": "local"}, "tts": {"voice": "b"}, "security": {}}
+    assert changed_sections(old, new) == {"tts", "security"}
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_fires_on_change(tmp_path, use_inotify):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"tts": {"voice": "a"}}))
+    fired = threading.Event()
+    watcher = ConfigWatcher(path, fired.set, interval=0.05, debounce=0.01, use_inotify=use_inotify)
+    watcher.start()
+    try:
+        (tmp_path / "other.txt").write_text("unrelated")
+        assert not fired.wait(0.3)
+        path.write_text(json.dumps({"tts": {"voice": "b"}, "padding": True}))
+        assert fired.wait(3)
+    finally:
+        watcher.stop()
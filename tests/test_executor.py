@@ -0,0 +1,57 @@
+import time
+
+from lma.executor import CommandExecutor
+
+
+def test_commands_run_concurrently_and_stream_output():
+    lines = []
+    done = []
+    executor = CommandExecutor(
+        {"max_workers": 2},
+        on_output=lambda cmd, line: lines.append(line),
+        on_complete=done.append,
+    )
+    start = time.monotonic()
+    futures = [executor.submit("sleep 0.3; echo one"), executor.submit("sleep 0.3; echo two")]
+    results = [f.result(timeout=5) for f in futures]
+    executor.shutdown(wait=True)
+
+    assert time.monotonic() - start < 0.55
+    assert all(r.ok for r in results)
+    assert sorted(lines) == ["one", "two"]
+    assert len(done) == 2
+
+
+def test_output_is_capped_and_timeout_kills():
+    executor = CommandExecutor({"max_output_bytes": 10, "timeout": 0.5})
+    result = executor.run("yes hello | head -n 1000")
+    assert result.ok and result.truncated
+    assert len(result.output) <= 10
+    result = executor.run("printf 'ééééééééé'")
+    assert result.truncated and len(result.output.encode("utf-8")) <= 10
+
+    result = executor.run("sleep 5")
+    assert result.timed_out and not result.ok
+    assert result.duration < 3
+    executor.shutdown()
+
+
+def test_a_long_line_is_read_in_pieces():
+    pieces = []
+    executor = CommandExecutor({"max_output_bytes": 100}, on_output=lambda cmd, line: pieces.append(len(line)))
+    result = executor.run("head -c 2000000 /dev/zero | tr '\\0' a")
+    assert result.ok and result.truncated
+    assert result.output == "a" * 100
+    assert pieces and max(pieces) <= 8192
+
+
+def test_a_sequence_runs_in_order_and_stops_at_a_failure(tmp_path):
+    done = []
+    executor = CommandExecutor({"max_workers": 4}, on_complete=done.append)
+    steps = [f"sleep 0.2; mkdir {tmp_path}/x", f"test -d {tmp_path}/x", "false", "echo never"]
+    results = executor.submit_sequence(steps).result(timeout=5)
+    executor.shutdown(wait=True)
+
+    assert [r.command for r in results] == steps[:3]
+    assert [r.ok for r in results] == [True, True, False]
+    assert [r.command for r in done] == steps[:3]
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import threading
+import time
+
+from lma.governor import CPUGovernor
+
+
+def test_plan_reserves_cores_for_tts_and_helpers():
+    gov = CPUGovernor(cores=[0, 1, 2, 3, 4, 5, 6, 7], threads={"llm": 4})
+    assert gov.threads("transcription") == 7 and gov.threads("llm") == 4
+    assert gov.affinity("tts") == [7] and gov.affinity("transcription") == list(range(8))
+    assert gov.env("tts")["OMP_NUM_THREADS"] == "1"
+
+    small = CPUGovernor(cores=[0, 1])
+    assert small.threads("transcription") == 2 and small.affinity("helpers") == [0, 1]
+
+    off = CPUGovernor(cores=[0, 1, 2, 3], enabled=False)
+    assert off.threads("llm") is None and off.env("tts") is None
+
+
+def test_commands_use_every_core_unless_confined(monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "3")
+    monkeypatch.delenv("MKL_NUM_THREADS", raising=False)
+    gov = CPUGovernor(cores=[0, 1, 2, 3])
+    assert gov.affinity("commands") == [0, 1, 2, 3] and gov.report()["plan"]["commands"]["nice"] == 0
+    env = gov.env("helpers")
+    assert env["OMP_NUM_THREADS"] == "3" and env["MKL_NUM_THREADS"] == "1"
+
+    confined = CPUGovernor.from_config({"cpu": {"confine_commands": True}})
+    assert confined.affinity("commands") == confined.affinity("helpers")
+    assert confined.report()["plan"]["commands"]["nice"] == 10
+
+
+def test_helpers_are_pinned_and_niced():
+    gov = CPUGovernor()
+    proc = subprocess.Popen(["sleep", "5"])
+    try:
+        gov.place(proc.pid, "helpers")
+        with open(f"/proc/{proc.pid}/stat") as fh:
+            nice = int(fh.read().rsplit(")", 1)[1].split()[16])
+        assert nice >= 10
+        assert sorted(os.sched_getaffinity(proc.pid)) == gov.affinity("helpers")
+    finally:
+        proc.kill()
+        proc.wait()
+    assert gov.report()["plan"]["helpers"]["processes"] == 1
+
+
+def test_background_work_waits_for_the_critical_path():
+    gov = CPUGovernor(background_wait=2.0)
+    order = []
+
+    def background():
+        gov.background()
+        order.append("background")
+
+    with gov.critical("transcribe"):
+        worker = threading.Thread(target=background)
+        worker.start()
+        time.sleep(0.1)
+        order.append("transcribe")
+    worker.join(timeout=2)
+    assert order == ["transcribe", "background"]
+    assert gov.background(timeout=0) is True
+    report = gov.report()
+    assert report["critical_s"]["transcribe"] >= 0.1
+    assert report["background_waited_s"] >= 0.09
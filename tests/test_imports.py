@@ -15,6 +15,21 @@ MODULES = [
     "lma.notifier",
     "lma.security",
     "lma.utils",
+    "lma.artifacts",
+    "lma.audio_preprocess",
+    "lma.batch",
+    "lma.batch_transcribe",
+    "lma.config",
+    "lma.executor",
+    "lma.policy",
+    "lma.cancel",
+    "lma.query_cache",
+    "lma.router",
+    "lma.memory",
+    "lma.trace",
+    "lma.replay",
+    "lma.profiling",
+    "lma.governor",
 ]
 
 
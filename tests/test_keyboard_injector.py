@@ -0,0 +1,90 @@
+import subprocess
+
+from lma import keyboard_injector
+from lma.keyboard_injector import KeyboardInjector
+
+
+def _injector(monkeypatch, tools, config=None):
+    monkeypatch.setattr(keyboard_injector, "_which", lambda cmd: cmd in tools)
+    monkeypatch.delenv("WAYLAND_DISPLAY", raising=False)
+    injector = KeyboardInjector(config)
+    injector.pg = None
+    return injector
+
+
+def test_short_text_is_typed_and_long_text_is_pasted(monkeypatch):
+    injector = _injector(monkeypatch, {"xdotool", "ydotool"}, {"keyboard": {"paste_threshold": 20}})
+    assert injector.strategies("hello") == ["xdotool", "ydotool"]
+    assert injector.strategies("x" * 20) == ["paste", "xdotool", "ydotool"]
+
+    monkeypatch.setenv("WAYLAND_DISPLAY", "wayland-0")
+    assert injector.strategies("hello") == ["ydotool", "xdotool"]
+
+    injector.reconfigure({"keyboard": {"method": "ydotool", "paste_threshold": 20}})
+    assert injector.strategies("x" * 20)[0] == "ydotool"
+
+
+def test_text_goes_through_stdin_with_no_delay(monkeypatch):
+    calls = []
+
+    def run(cmd, input=None, **kwargs):
+        calls.append((cmd, input))
+        return subprocess.CompletedProcess(cmd, 0)
+
+    injector = _injector(monkeypatch, {"xdotool"})
+    monkeypatch.setattr(keyboard_injector.subprocess, "run", run)
+    assert injector.type_text("hello world") == "xdotool"
+    cmd, text = calls[0]
+    assert cmd[:2] == ["xdotool", "type"] and "--delay" in cmd and cmd[-2:] == ["--file", "-"]
+    assert text == "hello world"
+
+
+def test_paste_restores_clipboard_and_falls_back(monkeypatch):
+    board = {"text": "original"}
+    keys = []
+    monkeypatch.setattr(keyboard_injector.clipboard, "get_clipboard", lambda: board["text"])
+    monkeypatch.setattr(keyboard_injector.clipboard, "set_clipboard", lambda t: board.update(text=t))
+    monkeypatch.setattr(keyboard_injector.clipboard, "snapshot", lambda: ("image/png", board["text"]))
+    monkeypatch.setattr(keyboard_injector.clipboard, "restore", lambda saved: board.update(text=saved[1]))
+
+    def run(cmd, input=None, **kwargs):
+        if cmd[1] == "key":
+            keys.append((cmd[-1], board["text"]))
+        return subprocess.CompletedProcess(cmd, 0)
+
+    injector = _injector(monkeypatch, {"xdotool"}, {"keyboard": {"paste_threshold": 5, "restore_delay_s": 0}})
+    monkeypatch.setattr(keyboard_injector.subprocess, "run", run)
+    assert injector.type_text("a long text") == "paste"
+    assert keys == [("ctrl+v", "a long text")]
+    assert board["text"] == "original"
+
+    # A clipboard that does not take the text means typing instead,
+    # and the original contents are put back.
+    monkeypatch.setattr(keyboard_injector.clipboard, "get_clipboard", lambda: "something else")
+    board["text"] = "original"
+    assert injector.type_text("a long text") == "xdotool"
+    assert board["text"] == "original"
+
+
+def test_a_failed_typing_tool_is_not_followed_by_another(monkeypatch):
+    calls = []
+
+    def run(cmd, input=None, **kwargs):
+        calls.append(cmd[0])
+        return subprocess.CompletedProcess(cmd, 1)  # may have typed part of the text
+
+    injector = _injector(monkeypatch, {"xdotool", "ydotool"})
+    monkeypatch.setattr(keyboard_injector.subprocess, "run", run)
+    assert injector.type_text("hello") is None
+    assert calls == ["xdotool"]
+
+    def missing(cmd, input=None, **kwargs):
+        calls.append(cmd[0])
+        if cmd[0] == "xdotool":
+            raise FileNotFoundError(cmd[0])
+        return subprocess.CompletedProcess(cmd, 0)
+
+    calls.clear()
+    monkeypatch.setattr(keyboard_injector.subprocess, "run", missing)
+    assert injector.type_text("hello") == "ydotool"
+    assert calls == ["xdotool", "ydotool"]
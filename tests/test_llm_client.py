@@ -1,5 +1,10 @@
+import json
+import logging
+import time
+
 import httpx
 
+from lma.governor import get_governor
 from lma.llm_client import LLMClient
 
 
@@ -23,3 +28,69 @@ def test_llm_client_openai(monkeypatch):
     result = client.send_prompt("hi")
     assert result == "ok"
     assert called["path"] == "/v1/chat/completions"
+
+
+def test_llm_client_preload_sends_keep_alive():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.url.path, json.loads(request.content)))
+        return httpx.Response(200, json={"response": "", "done": True})
+
+    cfg = {"llm": {"mode": "local", "primary_local_model": "llava", "keep_alive": "10m"}}
+    client = LLMClient(cfg)
+    client.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    client.preload(block=True)
+    threads = get_governor().threads("llm")
+    assert seen == [
+        ("/api/generate", {"model": "llava", "keep_alive": "10m", "options": {"num_thread": threads}})
+    ]
+
+    # Model is still inside its keep_alive window, so no second load.
+    assert client.preload(block=True) is None
+    assert len(seen) == 1
+
+
+def test_failed_preload_is_logged(caplog):
+    client = LLMClient({"llm": {"mode": "local", "primary_local_model": "nope"}})
+    client.client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+    with caplog.at_level(logging.DEBUG, logger="lma"):
+        client.preload(block=True)
+    assert any("Preloading nope failed" in r.getMessage() for r in caplog.records)
+
+
+def test_preload_warms_the_model_that_answers_first():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(json.loads(request.content)["model"])
+        return httpx.Response(200, json={"response": "", "done": True})
+
+    cfg = {"llm": {"mode": "auto", "primary_local_model": "llava", "fallback_model": "tiny"}}
+    client = LLMClient(cfg)
+    client.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    client.preload(block=True)
+    assert client.preload(block=True, with_image=True) is None  # the remote model answers images
+    client.config["mode"] = "local"
+    client.preload(block=True, with_image=True)
+    assert seen == ["tiny", "llava"]
+
+
+def test_hedged_request_races_remote_within_budget():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "api.openai.com":
+            return httpx.Response(200, json={"choices": [{"message": {"content": "remote"}}]})
+        time.sleep(0.5)
+        return httpx.Response(200, json={"response": "local"})
+
+    cfg = {"llm": {"mode": "auto", "hedge": {"enabled": True, "delay_s": 0.1, "budget_pct": 10}}}
+    client = LLMClient(cfg)
+    client.client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    start = time.monotonic()
+    assert client.send_prompt("hi") == "remote"
+    assert time.monotonic() - start < 0.4
+    # The budget is spent, so the next slow request is not hedged.
+    assert client.send_prompt("hi") == "local"
@@ -0,0 +1,58 @@
+import json
+import logging
+import threading
+
+from lma import utils
+from lma.utils import JsonFormatter, setup_logging, shutdown_logging
+
+
+class Recorded:
+    """Argument that notes the threads it was formatted on."""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return "value"
+
+
+def test_json_formatter_redacts_and_keeps_extras():
+    formatter = JsonFormatter({"logging": {"redact_sensitive": True}})
+    record = logging.LogRecord("lma", logging.INFO, __file__, 1, "login %s", ("password: hunter2",), None)
+    record.stage = "transcribe"
+    payload = json.loads(formatter.format(record))
+    assert payload["msg"] == "login password: ***REDACTED***"
+    assert payload["stage"] == "transcribe"
+    assert payload["level"] == "INFO"
+
+
+def test_dropped_records_are_never_formatted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    logger = logging.getLogger("lma")
+    monkeypatch.setattr(logger, "handlers", [])
+    monkeypatch.setattr(logger, "level", logger.level)
+    monkeypatch.setattr(logger, "propagate", False)  # pytest's own capture formats eagerly
+    monkeypatch.setattr(utils, "_formatter", None)
+    formatted = []
+
+    class CountingFormatter(JsonFormatter):
+        def format(self, record):
+            formatted.append(record.getMessage())
+            return super().format(record)
+
+    monkeypatch.setattr(utils, "JsonFormatter", CountingFormatter)
+    setup_logging({"logging": {"level": "INFO", "format": "json"}})
+    dropped, kept = Recorded(), Recorded()
+    try:
+        logger.debug("dropped %s", dropped)
+        logger.info("kept %s", kept)
+    finally:
+        shutdown_logging()
+
+    assert dropped.threads == []
+    # (RotatingFileHandler formats once more to decide on rollover.)
+    assert set(formatted) == {"kept value"}
+    # Formatting happens on the listener thread, not in the caller.
+    assert kept.threads and threading.current_thread() not in kept.threads
+    assert "kept value" in (tmp_path / "assistant.log").read_text()
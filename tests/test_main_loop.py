@@ -0,0 +1,132 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import threading
+import time
+
+import lma.__main__ as main
+from lma.cancel import current_token
+
+
+class _Notifier:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, message):
+        self.errors.append(message)
+
+    def send(self, message):
+        pass
+
+
+class _Assistant:
+    def __init__(self, config_path, config=None):
+        self.logger = logging.getLogger("test_main_loop")
+        self.notifier = _Notifier()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _Listener:
+    def __init__(self, hotkeys, callback):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def _app(monkeypatch, tmp_path, runtime):
+    config = {"hotkeys": {"voice_input": "<ctrl>+<alt>+m"}, "config": {"watch": False}, "runtime": runtime}
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config))
+    monkeypatch.setattr(main, "Assistant", _Assistant)
+    monkeypatch.setattr(main, "HotkeyListener", _Listener)
+    return main.MultimodalAssistant(str(path))
+
+
+def _press_then(app, action, then):
+    def run():
+        while not app.running:
+            time.sleep(0.01)
+        app.handle_hotkey(action)
+        then()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def test_hotkeys_run_as_tasks_until_sigterm(monkeypatch, tmp_path):
+    app = _app(monkeypatch, tmp_path, {})
+    seen = []
+    done = threading.Event()
+
+    def run_action(action):
+        token = current_token.get()
+        seen.append((action, token and not token.cancelled, threading.current_thread().name))
+        done.set()
+
+    app._run_action = run_action
+    _press_then(app, "voice_input", lambda: done.wait(5) and os.kill(os.getpid(), signal.SIGTERM))
+    asyncio.run(asyncio.wait_for(app.run(), 10))
+    app.stop()
+
+    action, live_token, thread = seen[0]
+    assert action == "voice_input" and live_token
+    assert thread.startswith("lma-action")
+    assert app.assistant.closed and not app.tasks and not app.running
+
+
+def test_slow_interactions_are_cancelled(monkeypatch, tmp_path):
+    app = _app(monkeypatch, tmp_path, {"interaction_timeout_s": 0.1})
+    tokens = []
+
+    def run_action(action):
+        token = current_token.get()
+        tokens.append(token)
+        token.wait(5)
+
+    app._run_action = run_action
+    _press_then(app, "activate", lambda: (time.sleep(0.5), app.stop()))
+    asyncio.run(asyncio.wait_for(app.run(), 10))
+    app.stop()
+
+    assert tokens and tokens[0].cancelled
+    assert app.assistant.notifier.errors == ["activate timed out"]
+
+
+
+def test_confirmation_time_does_not_count_towards_the_timeout(monkeypatch, tmp_path):
+    app = _app(monkeypatch, tmp_path, {"interaction_timeout_s": 0.2})
+    tokens = []
+
+    def run_action(action):
+        token = current_token.get()
+        tokens.append(token)
+        with token.user_wait():
+            time.sleep(0.5)
+
+    app._run_action = run_action
+    _press_then(app, "activate", lambda: (time.sleep(0.8), app.stop()))
+    asyncio.run(asyncio.wait_for(app.run(), 10))
+    app.stop()
+
+    assert tokens and not tokens[0].cancelled and tokens[0].user_wait_s >= 0.5
+    assert app.assistant.notifier.errors == []
+
+
+def test_reload_resizes_the_action_pool(monkeypatch, tmp_path):
+    app = _app(monkeypatch, tmp_path, {"max_concurrent": 1})
+    monkeypatch.setattr(app.assistant, "apply_config", lambda config: {"runtime"}, raising=False)
+    old = app.pool
+    (tmp_path / "config.json").write_text(
+        json.dumps({"hotkeys": {"voice_input": "<ctrl>+<alt>+m"}, "runtime": {"max_concurrent": 3}})
+    )
+    app.reload_config()
+    assert app.pool is not old and app.pool._max_workers == 3
+    app.stop()
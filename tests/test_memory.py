@@ -0,0 +1,76 @@
+import time
+
+from lma.memory import MemoryManager
+
+
+class Blob:
+    def __init__(self):
+        self.data = None
+        self.loads = 0
+
+    def load(self):
+        self.data = bytearray(8 * 1024 * 1024)
+        self.loads += 1
+
+    def release(self):
+        self.data = None
+
+
+def _register(manager, name, blob, idle_after):
+    manager.register(
+        name,
+        blob.release,
+        reload=blob.load,
+        is_loaded=lambda: blob.data is not None,
+        size=lambda: len(blob.data),
+        idle_after=idle_after,
+    )
+
+
+def test_idle_resources_are_released_and_prewarmed():
+    manager = MemoryManager()
+    model, cache = Blob(), Blob()
+    model.load()
+    cache.load()
+    _register(manager, "model", model, idle_after=60)
+    _register(manager, "cache", cache, idle_after=600)
+
+    assert manager.sweep(now=time.monotonic() + 120) == ["model"]
+    assert model.data is None and cache.data is not None
+
+    manager.wake().join()
+    assert model.loads == 2
+    report = manager.report()["subsystems"]
+    assert report["model"]["loaded"] and report["model"]["releases"] == 1
+    assert report["cache"]["size_mb"] == 8.0
+
+
+def test_ceiling_releases_least_recently_used_first():
+    manager = MemoryManager(ceiling_bytes=1)  # always above the ceiling
+    old, recent = Blob(), Blob()
+    old.load()
+    recent.load()
+    _register(manager, "old", old, idle_after=0)
+    _register(manager, "recent", recent, idle_after=0)
+    manager.touch("recent")
+
+    assert manager.sweep() == ["old", "recent"]
+    assert manager.wake() is not None
+
+
+def test_failed_releases_are_not_reported():
+    manager = MemoryManager(ceiling_bytes=1)
+    stuck, other = Blob(), Blob()
+    stuck.load()
+    other.load()
+
+    def fail():
+        raise RuntimeError("busy")
+
+    manager.register("stuck", fail, is_loaded=lambda: stuck.data is not None, idle_after=60)
+    _register(manager, "other", other, idle_after=0)
+    manager.touch("other")
+
+    assert manager.sweep(now=time.monotonic() + 120) == ["other"]
+    assert manager.release("stuck") is None and stuck.data is not None
+    assert manager.report()["subsystems"]["stuck"]["releases"] == 0
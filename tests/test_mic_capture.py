@@ -0,0 +1,37 @@
+import threading
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from lma.mic_capture import ResidentMic, RingBuffer
+
+
+def test_ring_buffer_reads_across_wraparound():
+    ring = RingBuffer(8)
+    ring.write(np.arange(6, dtype=np.int16).reshape(-1, 1))
+    ring.write(np.arange(6, 11, dtype=np.int16).reshape(-1, 1))
+
+    assert ring.position == 11
+    assert ring.read(5, 11).ravel().tolist() == [5, 6, 7, 8, 9, 10]
+    # Frames 0-2 were overwritten; the read starts at the oldest kept.
+    assert ring.read(0, 5).ravel().tolist() == [3, 4]
+
+
+def test_resident_mic_includes_pre_roll(tmp_path):
+    mic = ResidentMic(samplerate=1000, buffer_seconds=2, pre_roll_ms=100)
+    mic.stream = object()  # pretend the device is open
+    mic.ring.write(np.full((500, 1), 1, dtype=np.int16))
+
+    def feed():
+        for _ in range(5):
+            mic.ring.write(np.full((100, 1), 2, dtype=np.int16))
+
+    threading.Timer(0.05, feed).start()
+    path = mic.record(0.5, path=str(tmp_path / "audio_1.wav"))
+
+    with wave.open(path, "rb") as wf:
+        frames = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+    assert frames.size == 600
+    assert (frames[:100] == 1).all() and (frames[100:] == 2).all()
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import time
+
+from lma.cancel import CancelToken
+from lma.notifier import NotificationService, Notifier
+
+
+def test_bursts_are_coalesced_into_one_update(capsys):
+    service = NotificationService(coalesce=0.1, min_interval=0.0)
+    service._backend = "print"
+    for i in range(3):
+        service.post(f"message {i}")
+    service.post("message 2")
+    service.post("disk full", urgency="critical")
+    service.close()
+    out = capsys.readouterr().out
+    assert service.updates == 1
+    assert out == "[Assistant error] message 0\nmessage 1\nmessage 2\ndisk full\n"
+
+
+def test_old_notify_send_falls_back_to_plain_notifications(monkeypatch, capsys):
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 1 if "-p" in cmd else 0, "", "")
+
+    monkeypatch.setattr(subprocess, "run", run)
+    service = NotificationService(coalesce=0.0, min_interval=0.0)
+    service._backend = "notify-send"
+    service._show([("first", "normal")])
+    service._show([("second", "normal")])
+    service.close()
+
+    assert ["-p" in cmd for cmd in calls] == [True, False, False]
+    assert calls[-1][-1] == "second"
+    assert capsys.readouterr().out == ""
+
+
+def test_updates_are_rate_limited():
+    service = NotificationService(coalesce=0.0, min_interval=0.3)
+    service._backend = "print"
+    shown = []
+    service._show = lambda batch: shown.append((time.monotonic(), len(batch)))
+    service.post("one")
+    time.sleep(0.05)
+    service.post("two")
+    service.post("three")
+    time.sleep(0.5)
+    service.close()
+    assert [n for _, n in shown] == [1, 2]
+    assert shown[1][0] - shown[0][0] >= 0.29
+
+
+def test_send_and_error_return_immediately_and_confirm_is_cancellable(tmp_path, monkeypatch):
+    zenity = tmp_path / "zenity"
+    zenity.write_text("#!/bin/sh\nsleep 10\n")
+    zenity.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+    notifier = Notifier({"tts": {"enabled": False}})
+    notifier.service._backend = "print"
+    start = time.monotonic()
+    assert notifier.send("hello").result(timeout=1) is None
+    notifier.error("something broke")
+    token = CancelToken()
+    answer = notifier.confirm_async("Execute command: rm x?", token=token)
+    assert time.monotonic() - start < 0.5
+    assert not answer.done()
+    token.cancel()
+    assert answer.result(timeout=2) is False
+    notifier.close()
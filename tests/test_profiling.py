@@ -0,0 +1,62 @@
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+
+from lma.profiling import InteractionProfiler
+
+
+def _work():
+    helper = threading.Thread(target=time.sleep, args=(0.1,), name="helper")
+    helper.start()
+    data = [bytearray(1024) for _ in range(200)]
+    helper.join()
+    return data
+
+
+def test_profiles_only_armed_interactions(tmp_path):
+    profiler = InteractionProfiler.from_config({"profiling": {"dir": str(tmp_path), "interactions": 1}})
+    with profiler.profile("voice_input") as dump:
+        kept = _work()
+    with profiler.profile("voice_input") as second:
+        pass
+
+    assert second is None and not tracemalloc.is_tracing()
+    files = {p.name for p in dump.iterdir()}
+    assert {"profile.pstats", "profile.txt", "memory.txt", "memory.tracemalloc", "stacks.folded"} <= files
+    stats = pstats.Stats(str(dump / "profile.pstats"))
+    assert any(func[2] == "_work" for func in stats.stats)
+    assert "test_profiling.py" in (dump / "memory.txt").read_text()
+    assert "helper;" in (dump / "stacks.folded").read_text()
+    assert json.loads((dump / "summary.json").read_text())["wall_s"] >= 0.1
+    del kept
+
+    profiler.arm(1)
+    with profiler.profile("activate") as third:
+        pass
+    assert third is not None and third.exists()
+
+
+def test_reload_rearms_only_when_interactions_change(tmp_path):
+    config = {"profiling": {"dir": str(tmp_path), "interactions": 1}}
+    profiler = InteractionProfiler.from_config(config)
+    profiler.reconfigure({"profiling": dict(config["profiling"], top=10)})
+    assert profiler.pending == 1
+    profiler.reconfigure({"profiling": dict(config["profiling"], interactions=2)})
+    assert profiler.pending == 3
+
+
+def test_failed_dump_releases_the_profiler(tmp_path, monkeypatch):
+    profiler = InteractionProfiler.from_config({"profiling": {"dir": str(tmp_path), "interactions": 2}})
+
+    def fail(*args):
+        raise ValueError("broken dump")
+
+    monkeypatch.setattr(profiler, "_write", fail)
+    with profiler.profile("activate") as dump:
+        pass
+    assert dump is not None and not tracemalloc.is_tracing()
+    with profiler.profile("activate") as second:
+        pass
+    assert second is not None
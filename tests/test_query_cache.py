@@ -0,0 +1,97 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from lma.policy import CommandPolicy
+from lma.query_cache import QueryCache
+
+
+def test_near_duplicate_prompts_share_an_answer():
+    cache = QueryCache(match="similar")
+    cache.put("What's on my screen?", "A terminal.")
+
+    assert cache.get("what is on the screen") == "A terminal."
+    assert cache.get("open a new terminal window") is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_numbers_paths_and_wording_must_match():
+    for mode in ("exact", "similar"):
+        cache = QueryCache(match=mode)
+        cache.put("what is 12 times 14", "168")
+        cache.put("delete the file report.txt", "It is gone.")
+        assert cache.get("What's 12 times 14?") == "168"
+        assert cache.get("what is 12 times 13") is None
+        assert cache.get("delete the file report2.txt") is None
+
+    exact = QueryCache()
+    exact.put("what is on my screen", "A terminal.")
+    assert exact.get("what is on my screens") is None
+
+
+def test_actionable_answers_are_not_cached(tmp_path):
+    path = tmp_path / "query_cache.json"
+    cache = QueryCache(path=path)
+    cache.put("delete report.txt", "Run `rm report.txt`.")
+    cache.put("press the button", "click at (120, 40)")
+    cache.put("hello", "Hi!")
+
+    assert cache.get("delete report.txt") is None and cache.get("press the button") is None
+    assert len(cache.entries) == 1
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+def test_keyboard_and_bare_command_answers_are_not_cached():
+    policy = CommandPolicy({"allow_commands": ["ls", "rm"], "confirm_required": ["rm"]})
+    cache = QueryCache(policy=policy)
+    cache.put("greet them", "type text 'hello there'")
+    cache.put("fill the form", "enter text: my name")
+    cache.put("copy it", "press ctrl+c")
+    cache.put("list files", "ls -la")
+    cache.put("clean up", "Sure:\nrm -rf build")
+    cache.put("what is ls", "ls lists the files in a directory.")
+    assert list(e.prompt for e in cache.entries.values()) == []
+
+    cache.put("hello", "Hi there!\nHow can I help?")
+    assert cache.get("hello") == "Hi there!\nHow can I help?"
+
+
+def test_image_requests_only_match_the_same_screen(tmp_path):
+    gradient = np.tile(np.arange(256, dtype=np.uint8), (64, 1))
+    same, other = tmp_path / "shot_a.png", tmp_path / "shot_b.png"
+    Image.fromarray(gradient).save(same)
+    Image.fromarray(gradient[:, ::-1].copy()).save(other)
+
+    cache = QueryCache()
+    cache.put("what is on my screen", "Gradient.", image_path=str(same))
+    assert cache.get("what's on the screen", image_path=str(same)) == "Gradient."
+    assert cache.get("what's on the screen", image_path=str(other)) is None
+    assert cache.get("what's on the screen") is None
+
+
+def test_cache_is_bounded_and_persisted(tmp_path):
+    path = tmp_path / "query_cache.json"
+    cache = QueryCache(max_entries=2, path=path)
+    cache.put("first question", "1")
+    cache.put("second question", "2")
+    cache.put("third question", "3")
+
+    reloaded = QueryCache(max_entries=2, path=path)
+    assert reloaded.get("first question") is None
+    assert reloaded.get("third question") == "3"
+    assert len(reloaded.entries) == 2
+
+
+def test_released_entries_survive_the_next_insert(tmp_path):
+    path = tmp_path / "query_cache.json"
+    cache = QueryCache(path=path)
+    cache.put("first question", "1")
+    cache.clear()
+    assert not cache.loaded and not cache.entries
+
+    cache.put("second question", "2")
+    cache.load()  # a late background reload adds nothing twice
+    assert cache.get("first question") == "1"
+    assert len(cache.entries) == 2
+    assert len(QueryCache(path=path).entries) == 2
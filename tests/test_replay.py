@@ -0,0 +1,95 @@
+import wave
+
+from lma import transcribe
+from lma.replay import _Devices, _replay_config, replay_traces
+from lma.trace import Trace, read_archive, write_archive
+
+
+def _archive(tmp_path, response, actions, kind="voice", **notes):
+    audio = tmp_path / "audio_1.wav"
+    with wave.open(str(audio), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(b"\0\0" * 1600)
+
+    trace = Trace(kind)
+    trace.attach("audio", str(audio))
+    for key, value in notes.items():
+        if key == "screenshot":
+            trace.attach(key, value)
+        else:
+            trace.set(key, value)
+    trace.set("transcript", "click the button")
+    trace.set("prompt", "click the button")
+    trace.set("response", response)
+    trace.set("final", response)
+    trace.set("screen_bounds", [0, 0, 1920, 1080])
+    trace.data["actions"] = actions
+    trace.data["timings"] = {"transcribe": 0.5, "llm": 1.0}
+    path = tmp_path / f"trace_1_{kind}.zip"
+    write_archive(path, trace)
+    return path
+
+
+def test_archive_round_trip(tmp_path):
+    path = _archive(tmp_path, "ok", [])
+    data = read_archive(str(path), extract_to=str(tmp_path / "x"))
+    assert data["transcript"] == "click the button"
+    assert open(data["paths"]["audio.wav"], "rb").read(4) == b"RIFF"
+
+
+def test_replay_reproduces_actions_and_flags_regressions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(transcribe, "_probe_thread", None)
+    # As in config.example.json; replay must not probe anyway.
+    config = {"audio": {"preprocess": False}, "transcription": {"probe_on_startup": True, "reprobe": True}}
+    good = _archive(tmp_path, "Sure, click at (10, 20)", [{"type": "click", "x": 10, "y": 20}])
+
+    summary = replay_traces(config, [str(good)], recorded_transcript=True, progress=None)
+    assert summary["matched"] == 1 and summary["failed"] == 0
+    assert transcribe._probe_thread is None
+
+    # The recording claims an action the pipeline no longer takes.
+    bad = _archive(tmp_path, "Done.", [{"type": "click", "x": 1, "y": 1}])
+    report = tmp_path / "report.jsonl"
+    summary = replay_traces(config, [str(bad)], output=str(report), recorded_transcript=True, progress=None)
+    assert summary["mismatched"] == 1
+    assert '"actions"' in report.read_text()
+
+
+def test_copied_images_never_drive_the_mouse(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {"audio": {"preprocess": False}}
+    image = tmp_path / "clipboard_1.png"
+    image.write_bytes(b"not really a png")
+    trace = _archive(
+        tmp_path, "Sure, click at (10, 20)", [], kind="multimodal",
+        screenshot=str(image), image_source="clipboard",
+    )
+
+    summary = replay_traces(config, [str(trace)], recorded_transcript=True, progress=None)
+    assert summary["matched"] == 1 and summary["failed"] == 0
+
+
+def test_recorded_confirmations_match_exactly_and_once():
+    devices = _Devices()
+    devices.recorded = {
+        "actions": [
+            {"type": "confirm", "command": "ls", "approved": False},
+            {"type": "confirm", "command": "ls -la", "approved": True},
+            {"type": "confirm", "command": "ls", "approved": True},
+        ]
+    }
+    answers = [devices.confirm_async(f"Execute command: {cmd}?").result() for cmd in ("ls -la", "ls", "ls", "ls")]
+    assert answers == [True, False, True, False]
+
+    devices.recorded = {"actions": [{"type": "confirm", "command": "ls", "approved": True}]}
+    assert devices.confirm_async("Execute command: ls?").result() is True
+
+
+def test_replay_never_probes_transcription_backends(tmp_path):
+    config = {"transcription": {"probe_on_startup": True, "reprobe": True}}
+    cfg = _replay_config(config, str(tmp_path), "recorded")
+    assert cfg["transcription"] == {"probe_on_startup": False, "reprobe": True}
+    assert config["transcription"]["probe_on_startup"] is True
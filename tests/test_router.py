@@ -0,0 +1,45 @@
+from lma.router import ModelRouter
+
+CFG = {"mode": "auto", "fallback_model": "mistral"}
+
+
+def test_short_text_goes_to_small_model_and_images_skip_it():
+    router = ModelRouter()
+    assert router.order(CFG, "open firefox") == ["fallback", "local", "openai"]
+    assert router.order(CFG, "describe this", image_path="shot.png") == ["openai", "local"]
+    assert router.order(CFG, "x" * 500) == ["local", "fallback", "openai"]
+
+
+def test_slow_or_failing_models_are_demoted():
+    router = ModelRouter()
+    for _ in range(5):
+        router.record("fallback", 3.0, True)
+        router.record("openai", 1.0, True)
+        router.record("local", 0.5, False)
+
+    assert router.order(CFG, "open firefox") == ["openai", "fallback", "local"]
+    # A generous per-request target keeps the preferred small model.
+    assert router.order(CFG, "open firefox", latency_target=5) == ["fallback", "openai", "local"]
+    # local mode never prefers the remote model for speed.
+    assert router.order(dict(CFG, mode="local"), "open firefox")[-1] == "openai"
+
+
+def test_failing_models_are_retried_after_a_cool_down():
+    router = ModelRouter()
+    for _ in range(5):
+        router.record("fallback", 0.5, False)
+    assert router.order(CFG, "open firefox")[-1] == "fallback"
+
+    router.stats["fallback"].last_failure -= 120  # the cool-down has passed
+    assert router.order(CFG, "open firefox")[0] == "fallback"
+    router.record("fallback", 0.4, True)
+    assert router.error_rate("fallback") == 0.0
+    assert router.order(CFG, "open firefox")[0] == "fallback"
+
+    # A failed retry starts a new cool-down.
+    for _ in range(2):
+        router.record("fallback", 0.5, False)
+    router.stats["fallback"].last_failure -= 120
+    router.order(CFG, "open firefox")
+    router.record("fallback", 0.5, False)
+    assert router.order(CFG, "open firefox")[-1] == "fallback"
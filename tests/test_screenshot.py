@@ -1,6 +1,8 @@
 from pathlib import Path
 
-from lma.screenshot import take_screenshot
+import pytest
+
+from lma.screenshot import Region, ScreenshotCache, capture_region, take_screenshot
 
 
 def test_take_screenshot_creates_file(tmp_path, monkeypatch):
@@ -13,3 +15,55 @@ def test_take_screenshot_creates_file(tmp_path, monkeypatch):
     path = take_screenshot(cfg)
     assert Path(path).exists()
     assert path.endswith(".png")
+
+
+def test_screenshot_cache_matches_unchanged_screen(tmp_path):
+    pytest.importorskip("numpy")
+    Image = pytest.importorskip("PIL.Image")
+
+    def save(name, shade):
+        img = Image.new("RGB", (64, 48), "white")
+        img.paste((shade, 0, 0), (0, 0, 32, 48))
+        path = tmp_path / name
+        img.save(path)
+        return str(path)
+
+    first = save("a.png", 0)
+    same = save("b.png", 0)
+    different = str(tmp_path / "c.png")
+    gradient = Image.linear_gradient("L").resize((64, 48)).convert("RGB")
+    gradient.save(different)
+    # A small edit (a changed line of text) keeps the dHash but not the pixels.
+    edited = Image.open(first)
+    edited.putpixel((50, 40), (0, 0, 0))
+    edited.save(tmp_path / "d.png")
+
+    cache = ScreenshotCache(threshold=2)
+    assert cache.match(first) is None
+    hit = cache.match(same)
+    assert hit is not None and hit.path == first
+    assert cache.match(different) is None
+    assert cache.match(str(tmp_path / "d.png")) is None
+
+    # The same pixels captured from another window are another screen.
+    window = Region(100, 50, 64, 48)
+    assert cache.match(same, window) is None
+    hit = cache.match(first, window)
+    assert hit is not None and hit.path == same and hit.region == window
+
+
+def test_region_maps_downscaled_coordinates_back_to_screen():
+    # Second monitor at x=1920, captured at half resolution.
+    region = Region(1920, 0, 2560, 1440, scale=0.5)
+    assert region.to_screen(100, 50) == (2120, 100)
+
+
+def test_cursor_region_is_kept_inside_its_monitor(monkeypatch):
+    screens = [Region(0, 0, 1920, 1080), Region(1920, 0, 2560, 1440)]
+    monkeypatch.setattr("lma.screenshot.monitors", lambda: screens)
+    cfg = {"screenshot": {"mode": "cursor", "cursor_region": [800, 600]}}
+
+    assert capture_region(cfg, cursor=(1950, 20)) == Region(1920, 0, 800, 600)
+    assert capture_region(cfg, cursor=(1000, 500)) == Region(600, 200, 800, 600)
+    cfg["screenshot"]["mode"] = "monitor"
+    assert capture_region(cfg, cursor=(3000, 700)) == screens[1]
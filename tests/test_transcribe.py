@@ -1,4 +1,14 @@
-from lma.transcribe import transcribe_audio
+import pytest
+
+from lma import transcribe
+from lma.transcribe import BackendRanking, transcribe_audio, word_error_rate
+
+
+@pytest.fixture(autouse=True)
+def _cache(tmp_path, monkeypatch):
+    # Keep rankings written by these tests out of the user's cache directory.
+    monkeypatch.setattr(transcribe, "cache_dir", lambda: tmp_path)
+    monkeypatch.setattr(transcribe, "_ranking", None)
 
 
 def test_transcribe_returns_string(tmp_path):
@@ -6,3 +16,67 @@ def test_transcribe_returns_string(tmp_path):
     wav.write_bytes(b"RIFF0000WAVEfmt ")
     result = transcribe_audio(str(wav))
     assert isinstance(result, str)
+
+
+def test_word_error_rate():
+    assert word_error_rate("the quick brown fox", "The quick brown fox.") == 0.0
+    assert word_error_rate("the quick brown fox", "the quick fox") == 0.25
+
+
+def test_probe_ranks_fastest_accurate_backend_first(tmp_path, monkeypatch):
+    import wave
+
+    clip = tmp_path / "probe.wav"
+    with wave.open(str(clip), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes(b"\0\0" * 16000)
+
+    def broken(path):
+        raise RuntimeError("no model")
+
+    backends = {
+        "broken": broken,
+        "wrong": lambda path: "something else entirely",
+        "good": lambda path: "hello world",
+    }
+    monkeypatch.setattr(transcribe, "BACKENDS", backends)
+    ranking = BackendRanking(tmp_path / "ranking.json")
+    monkeypatch.setattr(transcribe, "_ranking", ranking)
+
+    results = transcribe.probe_backends(str(clip), "hello world")
+    assert results["broken"] == {"ok": False, "error": "RuntimeError"}
+    assert not results["wrong"]["ok"]
+    assert ranking.order[0] == "good"
+    assert BackendRanking(tmp_path / "ranking.json").order[0] == "good"
+
+
+def test_failing_backend_is_demoted(tmp_path, monkeypatch):
+    calls = []
+
+    def broken(path):
+        calls.append("broken")
+        raise RuntimeError
+
+    def good(path):
+        calls.append("good")
+        return "ok"
+
+    monkeypatch.setattr(transcribe, "BACKENDS", {"broken": broken, "good": good})
+    monkeypatch.setattr(transcribe, "_ranking", BackendRanking(tmp_path / "ranking.json"))
+
+    assert transcribe_audio("x.wav") == "ok"
+    assert transcribe_audio("x.wav") == "ok"
+    assert calls == ["broken", "good", "good"]
+    # Demotions are not persisted.
+    assert not (tmp_path / "ranking.json").exists()
+
+
+def test_cli_configuration_never_probes_in_the_background(tmp_path):
+    config = {"transcription": {"probe_on_startup": True, "ranking_path": str(tmp_path / "ranking.json")}}
+    assert transcribe.configure(config, probe=False) is None
+    transcribe.wait_for_probe()
+
+    transcribe.get_ranking().update({"good": {"ok": True, "rtf": 0.1}})
+    assert [p.name for p in tmp_path.iterdir()] == ["ranking.json"]